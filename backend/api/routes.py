@@ -3,44 +3,74 @@
 TEMPORARY: Modified to return raw dict instead of ExtractionResult model.
 """
 
-from typing import Any, Dict, Union
+import asyncio
+import time
+from typing import Any, List, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from backend.config import Settings, get_settings
+
 # --- ORIGINAL import (commented out for testing) ---
 # from backend.models.extraction_result import ExtractionResult
 # --- END ORIGINAL ---
-from backend.models.transcript import TranscriptInput
+from backend.models.transcript import TranscriptInput, TranscriptSegment
+from backend.schemas.registry import get_schema_registry
+from backend.services import fast_json, metrics
+from backend.services.fast_json import FastJSONResponse
+from backend.services.batch import extract_batch, iter_batch
+from backend.services.circuit_breaker import CircuitOpenError, ExtractionTimeoutError, circuit_breakers
+from backend.services.compaction import compaction_stats
+from backend.services.hedging import hedging_stats
+from backend.services.json_repair import repair_stats
+from backend.services.job_queue import IdempotencyConflictError, JobQueue
+from backend.services.live_session import LiveExtractionSession
+from backend.services.mock_extractor import mock_stats
+from backend.services.streaming import format_sse, stream_extraction_events, streaming_stats
 from backend.services.gemini_extractor import GeminiExtractor
 from backend.services.openai_extractor import OpenAIExtractor
+from backend.services.rate_limit import rate_limiters
+from backend.services.reference_alignment import alignment_stats
+from backend.services.result_cache import CachedExtractor, get_result_cache
+from backend.services.retry import retry_stats
+from backend.services.usage import usage_stats
+from backend.services.usage_ledger import get_usage_ledger
+from backend.services.vitals import vitals_stats
 
 router = APIRouter(prefix="/api", tags=["extraction"])
 
 
-def get_extractor(settings: Settings = Depends(get_settings)) -> Union[OpenAIExtractor, GeminiExtractor]:
-    """Dependency to get configured extractor based on LLM_PROVIDER setting."""
-    if settings.llm_provider == "openai":
-        if not settings.openai_api_key:
-            raise HTTPException(
-                status_code=500,
-                detail="OPENAI_API_KEY not configured"
-            )
-        return OpenAIExtractor(
-            api_key=settings.openai_api_key,
-            model_name=settings.openai_model
-        )
-    else:
-        if not settings.google_api_key:
-            raise HTTPException(
-                status_code=500,
-                detail="GOOGLE_API_KEY not configured"
-            )
-        return GeminiExtractor(
-            api_key=settings.google_api_key,
-            model_name=settings.gemini_model
-        )
+def get_extractor(request: Request) -> Union[OpenAIExtractor, GeminiExtractor, CachedExtractor]:
+    """Dependency returning the shared extractor created in the app lifespan."""
+    extractor = getattr(request.app.state, "extractor", None)
+    if extractor is None:
+        detail = getattr(request.app.state, "extractor_error", None) or "Extractor not initialized"
+        raise HTTPException(status_code=500, detail=detail)
+    return extractor
+
+
+def get_job_queue(request: Request) -> JobQueue:
+    """Dependency returning the job queue started in the app lifespan."""
+    job_queue = getattr(request.app.state, "job_queue", None)
+    if job_queue is None:
+        detail = getattr(request.app.state, "extractor_error", None) or "Job queue not initialized"
+        raise HTTPException(status_code=500, detail=detail)
+    return job_queue
+
+
+def _metric_labels(extractor: Any, transcript: TranscriptInput) -> tuple:
+    """Provider, model and schema version labels of an extraction request."""
+    version = transcript.schema_version or get_schema_registry().default_version
+    return extractor.provider, extractor.model_name, version
+
+
+def _observe_request_parse(request: Request, labels: tuple) -> None:
+    """Record the time from request arrival (set by the metrics middleware) to the handler."""
+    received_at = getattr(request.state, "received_at", None)
+    if received_at is not None:
+        metrics.observe_stage("request_parse", time.perf_counter() - received_at, *labels)
 
 
 # --- ORIGINAL route (commented out for testing) ---
@@ -52,29 +82,322 @@ def get_extractor(settings: Settings = Depends(get_settings)) -> Union[OpenAIExt
 # --- END ORIGINAL ---
 
 # TEMPORARY: Return raw dict
-@router.post("/extract")
+@router.post("/extract", response_class=FastJSONResponse)
 async def extract_entities(
+    request: Request,
     transcript: TranscriptInput,
-    extractor: Union[OpenAIExtractor, GeminiExtractor] = Depends(get_extractor)
-) -> Dict[str, Any]:
+    extractor: Union[OpenAIExtractor, GeminiExtractor, CachedExtractor] = Depends(get_extractor)
+) -> FastJSONResponse:
     """Extract medical entities from a transcript.
 
+    The result is rendered directly to UTF-8 JSON bytes (no jsonable_encoder pass).
+
     Args:
         transcript: The transcript input containing segments
 
     Returns:
         Raw dict with document and references
     """
+    labels = _metric_labels(extractor, transcript)
+    _observe_request_parse(request, labels)
     try:
         result = await extractor.extract(transcript)
-        return result
+        started = time.perf_counter()
+        response = FastJSONResponse(result)
+        metrics.observe_stage("response_serialize", time.perf_counter() - started, *labels)
+        return response
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(max(1, round(e.retry_after)))}
+        )
+    except ExtractionTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Extraction failed: {e}")
 
 
+@router.post("/extract/stream")
+async def extract_entities_stream(
+    request: Request,
+    transcript: TranscriptInput,
+    extractor: Union[OpenAIExtractor, GeminiExtractor, CachedExtractor] = Depends(get_extractor)
+) -> StreamingResponse:
+    """Extract medical entities, streaming results as server-sent events.
+
+    Each document field and each references entry is sent as soon as the
+    model has finished writing it, followed by 'metrics' and 'done' events.
+    """
+    _observe_request_parse(request, _metric_labels(extractor, transcript))
+
+    async def sse_events():
+        async for event, data in stream_extraction_events(extractor, transcript):
+            yield format_sse(event, data)
+
+    return StreamingResponse(
+        sse_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/extract/stream/stats")
+async def extract_stream_stats() -> dict:
+    """Time-to-first-token, time-to-first-field and total latency of streaming extractions."""
+    return streaming_stats.snapshot()
+
+
+@router.post("/extract/batch")
+async def extract_entities_batch(
+    transcripts: List[TranscriptInput],
+    concurrency: Optional[int] = Query(None, ge=1, description="Extractions in flight (default BATCH_CONCURRENCY)"),
+    stream: bool = Query(False, description="Stream each item as NDJSON as soon as it completes"),
+    extractor: Union[OpenAIExtractor, GeminiExtractor, CachedExtractor] = Depends(get_extractor),
+    settings: Settings = Depends(get_settings),
+):
+    """Extract medical entities from many transcripts with bounded concurrency.
+
+    Args:
+        transcripts: List of transcript inputs
+        concurrency: Maximum number of concurrent extractions
+        stream: If true, return application/x-ndjson lines in completion order
+
+    Returns:
+        Per-item entries ({index, status, result} or {index, status, status_code, error})
+        in input order, or an NDJSON stream of the same entries
+    """
+    if len(transcripts) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(transcripts)} items (max {settings.batch_max_items})"
+        )
+    limit = min(concurrency or settings.batch_concurrency, settings.batch_max_concurrency)
+
+    if stream:
+        async def ndjson_lines():
+            async for entry in iter_batch(extractor, transcripts, limit):
+                yield fast_json.dumps(entry) + b"\n"
+
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+    results = await extract_batch(extractor, transcripts, limit)
+    return FastJSONResponse({"results": results})
+
+
+@router.post("/jobs", status_code=202)
+async def create_job(
+    transcript: TranscriptInput,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    job_queue: JobQueue = Depends(get_job_queue),
+) -> dict:
+    """Queue an extraction and return its job id immediately.
+
+    Retrying with the same Idempotency-Key header returns the existing job
+    instead of queueing a second LLM call.
+
+    Args:
+        transcript: The transcript input containing segments
+        idempotency_key: Optional client-chosen key identifying this request
+
+    Returns:
+        The job (job_id, status, queue_position, timings)
+    """
+    try:
+        job, created = await job_queue.submit(transcript, idempotency_key)
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not created:
+        response.status_code = 200
+    return job
+
+
+@router.get("/jobs/stats")
+async def job_stats(job_queue: JobQueue = Depends(get_job_queue)) -> dict:
+    """Queue depth, job counts by status, queue wait and run time percentiles."""
+    return await job_queue.stats()
+
+
+@router.get("/jobs/{job_id}", response_class=FastJSONResponse)
+async def get_job(job_id: str, job_queue: JobQueue = Depends(get_job_queue)) -> FastJSONResponse:
+    """Status, timings and (once finished) the result or error of a job."""
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return FastJSONResponse(job)
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str, job_queue: JobQueue = Depends(get_job_queue)) -> dict:
+    """Cancel a queued or running job. Finished jobs are returned unchanged."""
+    job = await job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+
 @router.get("/health")
 async def health_check() -> dict:
-    """Health check endpoint."""
-    return {"status": "healthy", "service": "medical-ner-extraction"}
+    """Health check endpoint, including the state of each provider's circuit breaker."""
+    breakers = {name: breaker.snapshot() for name, breaker in circuit_breakers.items()}
+    degraded = any(b["state"] != "closed" for b in breakers.values())
+    return {
+        "status": "degraded" if degraded else "healthy",
+        "service": "medical-ner-extraction",
+        "circuit_breakers": breakers,
+    }
+
+
+@router.websocket("/live")
+async def live_extraction(websocket: WebSocket, schema_version: Optional[str] = None):
+    """Incremental extraction for an ongoing consultation.
+
+    Client messages:
+        {"type": "append", "segments": [TranscriptSegment, ...]}
+        {"type": "flush"}  (extract pending segments now)
+
+    Server messages:
+        {"type": "state", "version": 0, "state": {document, references}}
+        {"type": "ack", "segments": <received so far>}
+        {"type": "patch", "version": n, "ops": [JSON Patch ops on the state], ...}
+        {"type": "error", "status_code": ..., "detail": ...}
+    """
+    await websocket.accept()
+    extractor = getattr(websocket.app.state, "extractor", None)
+    if extractor is None:
+        detail = getattr(websocket.app.state, "extractor_error", None) or "Extractor not initialized"
+        await websocket.send_json({"type": "error", "status_code": 500, "detail": detail})
+        await websocket.close(code=1011)
+        return
+
+    settings = get_settings()
+    try:
+        session = LiveExtractionSession(
+            extractor,
+            websocket.send_json,
+            debounce_seconds=settings.live_debounce_seconds,
+            max_wait_seconds=settings.live_max_wait_seconds,
+            max_pending_segments=settings.live_max_pending_segments,
+            context_segments=settings.live_context_segments,
+            schema_version=schema_version,
+        )
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "status_code": 422, "detail": str(e)})
+        await websocket.close(code=1008)
+        return
+
+    await session.start()
+    try:
+        while True:
+            message = await websocket.receive_json()
+            message_type = message.get("type") if isinstance(message, dict) else None
+            if message_type == "append":
+                try:
+                    segments = [TranscriptSegment.model_validate(s) for s in message.get("segments") or []]
+                except ValidationError as e:
+                    await websocket.send_json({"type": "error", "status_code": 422, "detail": str(e)})
+                    continue
+                await session.append(segments)
+            elif message_type == "flush":
+                await session.flush()
+            else:
+                await websocket.send_json({
+                    "type": "error",
+                    "status_code": 400,
+                    "detail": f"Unknown message type: {message_type}",
+                })
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await session.close()
+
+
+@router.get("/schemas")
+async def list_schemas() -> list:
+    """Available flat schema versions (selectable via TranscriptInput.schema_version)."""
+    return get_schema_registry().describe()
+
+
+@router.get("/cache/stats")
+async def cache_stats() -> dict:
+    """Extraction result cache hit/miss counters."""
+    return get_result_cache().stats()
+
+
+@router.get("/hedging/stats")
+async def hedging_stats_endpoint(request: Request) -> dict:
+    """How often hedged requests fire, which provider wins and the current hedge delay."""
+    stats = hedging_stats.snapshot()
+    extractor = getattr(request.app.state, "extractor", None)
+    while extractor is not None and not hasattr(extractor, "hedge_delay"):
+        extractor = getattr(extractor, "extractor", None)
+    stats["enabled"] = extractor is not None
+    if extractor is not None:
+        stats["hedge_delay_seconds"] = round(extractor.hedge_delay(), 3)
+        stats["primary_latency"] = extractor.primary_latency.snapshot()
+    return stats
+
+
+@router.get("/retries/stats")
+async def retry_stats_endpoint() -> dict:
+    """Retries of transient provider errors: counts, reasons, throttled and exhausted requests."""
+    return retry_stats.snapshot()
+
+
+@router.get("/repair/stats")
+async def repair_stats_endpoint() -> dict:
+    """LLM answers parsed as-is, repaired, returned partial, continued or failed."""
+    return repair_stats.snapshot()
+
+
+@router.get("/compaction/stats")
+async def compaction_stats_endpoint() -> dict:
+    """Segments and characters before/after transcript compaction."""
+    return compaction_stats.snapshot()
+
+
+@router.get("/alignment/stats")
+async def alignment_stats_endpoint() -> dict:
+    """Values aligned to transcript segments locally (REFERENCES_MODE=local) and alignment time."""
+    return alignment_stats.snapshot()
+
+
+@router.get("/vitals/stats")
+async def vitals_stats_endpoint() -> dict:
+    """Vital-sign fields filled by pattern pre-extraction, model corrections and output tokens saved."""
+    return vitals_stats.snapshot()
+
+
+@router.get("/rate-limits/stats")
+async def rate_limit_stats_endpoint() -> dict:
+    """Per-provider RPM/TPM buckets and the current adaptive concurrency limit."""
+    return {name: limiter.snapshot() for name, limiter in rate_limiters.items()}
+
+
+@router.get("/usage/stats")
+async def llm_usage_stats() -> dict:
+    """LLM token totals, prompt-cached tokens and latency split by prompt-cache hit/miss."""
+    return usage_stats.snapshot()
+
+
+@router.get("/usage/ledger")
+async def usage_ledger_summary(
+    group_by: List[str] = Query(["day"], description="Any of day, provider, model, schema_version, field"),
+    since: Optional[str] = Query(None, description="First day included (YYYY-MM-DD, UTC)"),
+    until: Optional[str] = Query(None, description="Last day included (YYYY-MM-DD, UTC)"),
+    settings: Settings = Depends(get_settings),
+) -> list:
+    """Tokens, cost and time of the recorded extractions, or output tokens per field, aggregated."""
+    if not settings.ledger_db_path:
+        raise HTTPException(status_code=404, detail="Usage ledger disabled (LEDGER_DB_PATH is empty)")
+    try:
+        return await asyncio.to_thread(get_usage_ledger().summary, group_by, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@router.get("/mock/stats")
+async def mock_provider_stats() -> dict:
+    """Answers replayed and recorded by the mock provider, cassette misses and injected errors."""
+    return mock_stats.snapshot()
@@ -2,6 +2,7 @@
 
 import os
 from functools import lru_cache
+from typing import Optional
 
 from pydantic_settings import BaseSettings
 
@@ -13,14 +14,144 @@ class Settings(BaseSettings):
     google_api_key: str = ""
     openai_api_key: str = ""
 
-    # LLM Provider: "openai" or "gemini"
+    # LLM Provider: "openai", "gemini" or "mock" (recorded answers, see the mock provider settings)
     llm_provider: str = "openai"
 
     # Gemini settings
     gemini_model: str = "models/gemini-3-pro-preview"
+    gemini_base_url: str = ""  # Empty uses the Google API; set to point at a local stub provider
+    gemini_context_cache: bool = False  # Serve the system prompt from an explicit context cache
+    gemini_context_cache_ttl_seconds: int = 3600
 
     # OpenAI settings
     openai_model: str = "gpt-4o"
+    openai_base_url: str = ""  # Empty uses the OpenAI API; set to point at a local stub provider
+    openai_prompt_cache_key: bool = True  # Route same-schema requests to the same prompt prefix cache
+
+    # Schema settings
+    schema_version: str = "e025_flat_schema"  # Default flat schema file (without .json)
+    gemini_response_schema: bool = False  # Send the compiled schema as Gemini response_json_schema
+
+    # Prompt rendering: "full" (indented schema, all field definitions) or "compact"
+    prompt_mode: str = "full"
+    prompt_strip_prose_described: bool = False  # Compact mode: drop schema descriptions of fields explained in field_definitions
+    references_mode: str = "model"  # "model" (LLM writes references) or "local" (document only, references aligned locally)
+
+    # Shared HTTP connection pool settings (one pool per provider client)
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 120.0
+    http_timeout_seconds: float = 600.0
+    http_connect_timeout_seconds: float = 10.0
+    warmup_connections: int = 2  # Connections opened at startup, 0 disables warmup
+
+    # Per-provider circuit breaker and adaptive timeouts
+    circuit_breaker_enabled: bool = True
+    breaker_failure_threshold: int = 5  # Consecutive provider failures that open the circuit
+    breaker_recovery_seconds: float = 30.0  # Open circuits allow a probe call after this
+    breaker_half_open_max_calls: int = 1
+    fallback_provider: str = ""  # Provider used while the primary's circuit is open (empty: fail with 503)
+    adaptive_timeout_percentile: float = 99.0
+    adaptive_timeout_multiplier: float = 2.0  # Timeout = latency percentile * multiplier
+    adaptive_timeout_min_seconds: float = 30.0
+    adaptive_timeout_min_samples: int = 20  # HTTP_TIMEOUT_SECONDS applies until then (also the upper bound)
+
+    # Retries of transient provider errors (429, 5xx, connection errors, invalid JSON)
+    retry_max_attempts: int = 3  # Attempts per extraction including the first (1 disables retries)
+    retry_base_delay_seconds: float = 0.5  # Exponential backoff with full jitter, at least Retry-After
+    retry_max_delay_seconds: float = 20.0
+    retry_budget_seconds: float = 60.0  # No retry starts once an extraction has taken this long
+    retry_rate_ratio: float = 0.2  # Process-wide cap: retries per request over a 10 s window
+    retry_min_per_second: float = 0.5  # Retries always allowed, even at low traffic
+
+    # Repair of malformed or truncated LLM JSON (kept fields are returned with "partial": true)
+    json_repair_enabled: bool = True
+    json_repair_continuation: bool = False  # Ask the model once for the missing tail of a truncated answer
+    result_validation: bool = False  # Parse and validate answers against the schema in one pydantic-core pass
+
+    # Transcript compaction before prompting (source_segments are mapped back to the original segments)
+    compaction_enabled: bool = False
+    compaction_fillers: list[str] = [
+        "mhm", "aha", "aaa", "mm", "hmm", "nu", "ačiū", "labai ačiū", "ačiū labai", "gerai", "puiku",
+        "supratau", "tvarkoj", "prašom", "prašau", "laba diena", "labas", "sveiki", "viso gero", "iki",
+    ]  # Utterances made only of these are dropped, unless they answer a question
+    compaction_merge_max_chars: int = 400  # Longest merged same-speaker segment, 0 disables merging
+
+    # Pattern-based pre-extraction of vital signs and body measurements
+    vitals_preextract: str = "off"  # "off", "remove" (fields left out of the schema) or "confirm" (model confirms values)
+
+    # Outbound rate limiting per provider: RPM/TPM token buckets (0 = unlimited) and AIMD concurrency
+    rate_limit_enabled: bool = True
+    openai_rpm: int = 0
+    openai_tpm: int = 0  # Input + output tokens; requests are charged an estimate, corrected by actual usage
+    gemini_rpm: int = 0
+    gemini_tpm: int = 0
+    mock_rpm: int = 0
+    mock_tpm: int = 0
+    rate_limit_expected_output_tokens: int = 1500  # Output estimate until actual answers are seen
+    concurrency_initial: int = 8  # Provider calls in flight at startup
+    concurrency_min: int = 1
+    concurrency_max: int = 64
+    concurrency_backoff_factor: float = 0.5  # Multiplicative decrease on 429/503 or latency spikes
+    concurrency_latency_spike_ratio: float = 3.0  # Latency per 1k tokens above this multiple of the median is a spike
+    concurrency_latency_spike_count: int = 3  # Consecutive spikes that count as overload
+
+    # Mock provider (LLM_PROVIDER=mock): record real answers to a cassette, or replay them
+    mock_mode: str = "replay"  # "record" (call MOCK_RECORD_PROVIDER and store its answers) or "replay"
+    mock_cassette_path: str = ".data/mock_cassette.jsonl"
+    mock_record_provider: str = "openai"
+    mock_time_to_first_token: str = "recorded"  # "fixed:<s>", "uniform:<low>,<high>", "normal:<mean>,<sd>", "lognormal:<median>,<p95>" or "recorded"
+    mock_tokens_per_second: str = "recorded"  # Same forms; 0 returns the whole answer at once
+    mock_error_rate: float = 0.0  # Share of replayed calls failing with an injected 500
+    mock_rate_limit_rate: float = 0.0  # Share of replayed calls failing with an injected 429
+    mock_retry_after_seconds: float = 1.0  # Retry-After of injected 429s
+    mock_replay_miss: str = "any"  # Unknown prompt: "any" (a recorded answer chosen by prompt hash) or "error"
+    mock_seed: Optional[int] = None  # Seed of latency and error sampling, for reproducible runs
+
+    # Hedged requests: also ask the secondary provider when the primary is slow
+    hedging_enabled: bool = False
+    hedge_secondary_provider: str = ""  # Empty uses the other provider
+    hedge_percentile: float = 95.0  # Primary latency percentile used as the hedge delay
+    hedge_min_delay_seconds: float = 2.0
+    hedge_max_delay_seconds: float = 60.0
+    hedge_initial_delay_seconds: float = 20.0  # Used until enough latency samples exist
+    hedge_min_samples: int = 20
+
+    # Batch extraction settings
+    batch_concurrency: int = 4  # Default extractions in flight per batch request
+    batch_max_concurrency: int = 16
+    batch_max_items: int = 500
+
+    # Chunked (map-reduce) extraction for long transcripts
+    chunk_window_segments: int = 0  # Segments per window, 0 disables chunking
+    chunk_overlap_segments: int = 10
+    chunk_concurrency: int = 4
+    chunk_scalar_policy: str = "latest"  # "latest", "earliest" or "most_referenced"
+
+    # Live (WebSocket) incremental extraction
+    live_debounce_seconds: float = 3.0
+    live_max_wait_seconds: float = 15.0
+    live_max_pending_segments: int = 30
+    live_context_segments: int = 4
+
+    # Asynchronous job queue
+    job_workers: int = 2
+    jobs_db_path: str = ".data/jobs.sqlite3"
+    job_poll_interval_seconds: float = 1.0
+    job_retention_seconds: int = 7 * 24 * 3600  # Finished jobs older than this are pruned at startup
+    job_max_attempts: int = 3  # Runs of a job (interrupted by restarts or crashes) before it fails
+
+    # Result cache settings
+    cache_enabled: bool = True
+    cache_max_entries: int = 256
+    cache_db_path: str = ""  # Empty disables the on-disk SQLite tier
+    cache_ttl_seconds: int = 7 * 24 * 3600
+    cache_max_bytes: int = 256 * 1024 * 1024
+
+    # Usage ledger: tokens, cost and time of every extraction, with output tokens per field
+    ledger_db_path: str = ".data/usage_ledger.sqlite3"  # Empty disables the ledger
+    # Model -> [input, cached input, output] USD per million tokens (JSON); unpriced models record no cost
+    ledger_prices: dict[str, list[float]] = {}
 
     # CORS settings
     cors_origins: list[str] = ["http://localhost:5173", "http://localhost:3000"]
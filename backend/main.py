@@ -1,17 +1,62 @@
 """FastAPI application entry point."""
 
-from fastapi import FastAPI
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from backend.api.routes import router
 from backend.config import get_settings
+from backend.services import metrics
+from backend.services.extractor_factory import ProviderNotConfiguredError, build_extractor
+from backend.services.job_queue import JobQueue, JobStore
+
+logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the shared extractor and job workers at startup, stop them on shutdown."""
+    app.state.extractor = None
+    app.state.extractor_error = None
+    app.state.job_queue = None
+    try:
+        app.state.extractor = build_extractor(settings)
+    except ProviderNotConfiguredError as e:
+        app.state.extractor_error = str(e)
+        logger.warning(f"Extractor not available: {e}")
+
+    if app.state.extractor is not None and settings.warmup_connections > 0:
+        await app.state.extractor.warmup(settings.warmup_connections)
+
+    if app.state.extractor is not None:
+        app.state.job_queue = JobQueue(
+            JobStore(settings.jobs_db_path),
+            app.state.extractor,
+            workers=settings.job_workers,
+            poll_interval=settings.job_poll_interval_seconds,
+            retention_seconds=settings.job_retention_seconds,
+            max_attempts=settings.job_max_attempts,
+        )
+        await app.state.job_queue.start()
+
+    yield
+
+    if app.state.job_queue is not None:
+        await app.state.job_queue.stop()
+        app.state.job_queue.store.close()
+    if app.state.extractor is not None:
+        await app.state.extractor.aclose()
+
+
 app = FastAPI(
     title="Medical NER Extraction API",
     description="Extract medical entities from Lithuanian doctor-patient transcriptions",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -23,10 +68,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency per route on /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Include API routes
 app.include_router(router)
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics() -> Response:
+    """Prometheus metrics in the text exposition format."""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
@@ -6,11 +6,12 @@ This module contains Pydantic models for the E025 Ambulatorinio apsilankymo apra
 """
 
 from .e025_document import E025Document
-from .transcript import TranscriptSegment, TranscriptInput
+from .transcript import IncrementalContext, TranscriptSegment, TranscriptInput
 from .extraction_result import EntityReference, ExtractionResult
 
 __all__ = [
     "E025Document",
+    "IncrementalContext",
     "TranscriptSegment",
     "TranscriptInput",
     "EntityReference",
@@ -1,8 +1,9 @@
 """Transcript input models."""
 
-from typing import List, Optional
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class TranscriptSegment(BaseModel):
@@ -22,6 +23,35 @@ class TranscriptSegment(BaseModel):
     )
 
 
+class IncrementalContext(BaseModel):
+    """Context for extracting only newly arrived segments of a growing transcript."""
+
+    segment_offset: int = Field(
+        0,
+        ge=0,
+        description="Global index of the first segment in TranscriptInput.transcript"
+    )
+    context_segments: int = Field(
+        0,
+        ge=0,
+        description="Number of leading segments already extracted, sent only as context (e.g. Q&A questions)"
+    )
+    document: Optional[dict] = Field(
+        None,
+        description="Document extracted so far; only facts not already in it should be returned"
+    )
+
+
+@dataclass(frozen=True)
+class PreExtraction:
+    """Values found before the LLM call (see backend.services.vitals)."""
+
+    mode: str  # "remove": fields dropped from the schema, "confirm": values given to the model
+    values: Dict[str, Any]
+    source_segments: Dict[str, List[int]]
+    removed_fields: Tuple[str, ...] = ()
+
+
 class TranscriptInput(BaseModel):
     """Input model for transcript extraction requests."""
 
@@ -33,3 +63,24 @@ class TranscriptInput(BaseModel):
         ...,
         description="Array of transcript segments"
     )
+    schema_version: Optional[str] = Field(
+        None,
+        description="Flat schema version to extract with, e.g. 'e025_flat_schema2' (defaults to SCHEMA_VERSION)"
+    )
+    incremental: Optional[IncrementalContext] = Field(
+        None,
+        description="Set for incremental (live) extraction of new segments only"
+    )
+
+    # Set by the pre-extraction stage only, never from request JSON
+    _pre_extraction: Optional[PreExtraction] = PrivateAttr(default=None)
+
+    @property
+    def pre_extraction(self) -> Optional[PreExtraction]:
+        return self._pre_extraction
+
+    def with_pre_extraction(self, pre_extraction: Optional[PreExtraction]) -> "TranscriptInput":
+        """Copy of this input carrying pre-extracted values for the prompt."""
+        copy = self.model_copy()
+        copy._pre_extraction = pre_extraction
+        return copy
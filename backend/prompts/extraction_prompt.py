@@ -1,7 +1,7 @@
 """Extraction prompts for flat E025 schema (TEMPORARY - testing alternative schema)."""
 
 import json
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 # --- ORIGINAL (Pydantic-based schema) - commented out for testing ---
 # from backend.models.extraction_result import ExtractionResult
@@ -11,7 +11,101 @@ from typing import List, Optional
 
 from backend.schemas.e025_flat import get_extraction_schema_str
 
-from backend.models.transcript import TranscriptSegment
+from backend.models.transcript import IncrementalContext, PreExtraction, TranscriptSegment
+
+# Field definitions, one block per group of schema fields. A block is included in the
+# compact prompt only if the schema contains at least one of its fields.
+_FIELD_DEFINITIONS: List[Tuple[Tuple[str, ...], str]] = [
+    (
+        ("systolic_bp", "diastolic_bp", "pulse", "breathing_rate", "saturation", "temperature", "alcohol_level"),
+        """Vital sign fields (scalar):
+  - systolic_bp: sistolinis kraujospūdis mmHg
+  - diastolic_bp: diastolinis kraujospūdis mmHg
+  - pulse: pulsas k/min
+  - breathing_rate: kvėpavimo dažnis k/min
+  - saturation: SpO2 %
+  - temperature: kūno temperatūra °C
+  - alcohol_level: alkoholio kiekis ‰""",
+    ),
+    (
+        ("weight", "height", "bmi", "chest_circumference", "hip_circumference", "waist_circumference", "head_circumference"),
+        """Body measurements (scalar):
+  - weight, height, bmi, chest/hip/waist/head_circumference""",
+    ),
+    (
+        ("allergies",),
+        """allergies (array of objects):
+  - type: "vaistai" (drugs), "maistas" (food), "kita" (environmental)
+  - description: allergen details
+  - date: when identified (null if unknown)""",
+    ),
+    (
+        ("diagnosis", "diagnosis_code", "diagnosis_certainty"),
+        """diagnosis (array of statements):
+  - Each diagnosis as a separate statement
+  - diagnosis_code: TLK-10-AM code (scalar)
+  - diagnosis_certainty: "+" confirmed, "-" excluded, "0" suspected (scalar)""",
+    ),
+    (
+        ("complaints_anamnesis",),
+        """complaints_anamnesis (array of statements):
+  - Current symptoms with characteristics
+  - Chronic conditions (prefix: "Lėtinė liga:")
+  - Past surgeries (prefix: "Operacija:")
+  - Family history (prefix: "Šeimos anamnezė:")
+  - Negative findings explicitly stated
+  STYLE: Write naturally from the patient's perspective.
+  Good: "Pacientas skundžiasi gerklės skausmu, ypač ryjant"
+  Bad: "Gerklės skausmas" (too terse)""",
+    ),
+    (
+        ("objective_condition",),
+        """objective_condition (array of statements):
+  - Physical examination findings by system
+  STYLE: Write as doctors document - direct clinical observations.
+  Good: "Gerklė parauda, tonzilės padidėjusios"
+  Bad: "Apžiūros metu nustatyta, kad gerklė parauda" (too verbose)""",
+    ),
+    (
+        ("tests_consultations_plan",),
+        """tests_consultations_plan (array of statements):
+  - Planned laboratory tests, imaging, specialist consultations
+  - NOTE: Do NOT put planned tests in treatment fields
+  Good: "Atlikti bendrą kraujo tyrimą\"""",
+    ),
+    (
+        ("performed_tests_consultations",),
+        """performed_tests_consultations (array of statements):
+  - Results of tests already performed
+  Good: "CRB testas neigiamas\"""",
+    ),
+    (
+        ("medication_treatment",),
+        """medication_treatment (array of statements):
+  - Drugs with dosage, route, frequency, duration
+  Good: "Ibuprofenas 400mg po 1 tab. 3k/d 5 dienas\"""",
+    ),
+    (
+        ("non_medication_treatment",),
+        """non_medication_treatment (array of statements):
+  - Procedures, physiotherapy, lifestyle modifications""",
+    ),
+    (
+        ("prescriptions",),
+        """prescriptions (array of statements):
+  - E-prescription details""",
+    ),
+    (
+        ("referrals",),
+        """referrals (array of statements):
+  - Specialist referrals""",
+    ),
+    (
+        ("recommendations",),
+        """recommendations (array of statements):
+  - Patient advice, follow-up instructions""",
+    ),
+]
 
 _SYSTEM_PROMPT_TEMPLATE = """<context>
 You are a medical Named Entity Recognition (NER) system for Lithuanian healthcare. You process doctor-patient conversation transcripts and extract structured data for E025 Ambulatorinio apsilankymo aprašymas (Outpatient Visit Description) documents.
@@ -19,9 +113,7 @@ You are a medical Named Entity Recognition (NER) system for Lithuanian healthcar
 
 <task>
 Extract all medical entities from the provided transcript.
-Return a JSON object with two keys:
-- "document": the extracted E025 flat document
-- "references": an array of objects linking each extracted value to source transcript segment indices
+{output_keys}
 </task>
 
 <constraints>
@@ -34,8 +126,7 @@ DO NOT:
 
 DO:
 - Extract each symptom, finding, or fact as a separate statement object
-- For every extracted value, add a corresponding entry in the "references" array with the matching field_name, value, and source_segments
-- Preserve clinical details (severity, location, timing)
+{references_constraint}- Preserve clinical details (severity, location, timing)
 - Include explicitly stated negative findings ("nėra kosulio")
 - Use Lithuanian medical terminology
 - For array fields with statement objects, each statement should be a single fact
@@ -47,68 +138,7 @@ DO:
 </output_schema>
 
 <field_definitions>
-Vital sign fields (scalar):
-  - systolic_bp: sistolinis kraujospūdis mmHg
-  - diastolic_bp: diastolinis kraujospūdis mmHg
-  - pulse: pulsas k/min
-  - breathing_rate: kvėpavimo dažnis k/min
-  - saturation: SpO2 %
-  - temperature: kūno temperatūra °C
-  - alcohol_level: alkoholio kiekis ‰
-
-Body measurements (scalar):
-  - weight, height, bmi, chest/hip/waist/head_circumference
-
-allergies (array of objects):
-  - type: "vaistai" (drugs), "maistas" (food), "kita" (environmental)
-  - description: allergen details
-  - date: when identified (null if unknown)
-
-diagnosis (array of statements):
-  - Each diagnosis as a separate statement
-  - diagnosis_code: TLK-10-AM code (scalar)
-  - diagnosis_certainty: "+" confirmed, "-" excluded, "0" suspected (scalar)
-
-complaints_anamnesis (array of statements):
-  - Current symptoms with characteristics
-  - Chronic conditions (prefix: "Lėtinė liga:")
-  - Past surgeries (prefix: "Operacija:")
-  - Family history (prefix: "Šeimos anamnezė:")
-  - Negative findings explicitly stated
-  STYLE: Write naturally from the patient's perspective.
-  Good: "Pacientas skundžiasi gerklės skausmu, ypač ryjant"
-  Bad: "Gerklės skausmas" (too terse)
-
-objective_condition (array of statements):
-  - Physical examination findings by system
-  STYLE: Write as doctors document - direct clinical observations.
-  Good: "Gerklė parauda, tonzilės padidėjusios"
-  Bad: "Apžiūros metu nustatyta, kad gerklė parauda" (too verbose)
-
-tests_consultations_plan (array of statements):
-  - Planned laboratory tests, imaging, specialist consultations
-  - NOTE: Do NOT put planned tests in treatment fields
-  Good: "Atlikti bendrą kraujo tyrimą"
-
-performed_tests_consultations (array of statements):
-  - Results of tests already performed
-  Good: "CRB testas neigiamas"
-
-medication_treatment (array of statements):
-  - Drugs with dosage, route, frequency, duration
-  Good: "Ibuprofenas 400mg po 1 tab. 3k/d 5 dienas"
-
-non_medication_treatment (array of statements):
-  - Procedures, physiotherapy, lifestyle modifications
-
-prescriptions (array of statements):
-  - E-prescription details
-
-referrals (array of statements):
-  - Specialist referrals
-
-recommendations (array of statements):
-  - Patient advice, follow-up instructions
+{field_definitions}
 </field_definitions>
 
 <extraction_rules>
@@ -120,7 +150,22 @@ recommendations (array of statements):
    Bad: "Skauda gerklę"
    Good: "Skauda gerklę, ypač ryjant, kaip pjauna peiliu"
 
-3. REFERENCES - for every extracted value, create a reference entry:
+{references_rules}{style_rule_number}. NATURAL WRITING STYLE
+   Write statements as complete, self-contained sentences.
+</extraction_rules>
+"""
+
+
+# Template parts that differ when the model writes the references array and
+# when references are aligned locally (references=False)
+_REFERENCES_PARTS = {
+    True: {
+        "output_keys": """Return a JSON object with two keys:
+- "document": the extracted E025 flat document
+- "references": an array of objects linking each extracted value to source transcript segment indices""",
+        "references_constraint": """- For every extracted value, add a corresponding entry in the "references" array with the matching field_name, value, and source_segments
+""",
+        "references_rules": """3. REFERENCES - for every extracted value, create a reference entry:
    - field_name: the top-level field name (e.g. "complaints_anamnesis", "systolic_bp")
    - value: the extracted value as string
    - source_segments: array of transcript segment indices
@@ -133,29 +178,106 @@ recommendations (array of statements):
      [11] Patient: "No."
      Statement: "Nėra karščiavimo" -> source_segments: [10, 11]
 
-5. NATURAL WRITING STYLE
-   Write statements as complete, self-contained sentences.
-</extraction_rules>
-"""
+""",
+        "style_rule_number": "5",
+    },
+    False: {
+        "output_keys": """Return a JSON object with one key:
+- "document": the extracted E025 flat document (source segments are linked automatically; do not add references)""",
+        "references_constraint": "",
+        "references_rules": "",
+        "style_rule_number": "3",
+    },
+}
+
+_USER_PROMPT_OUTPUT = {
+    True: 'Return only valid JSON with "document" and "references" keys adhering to the provided output_schema.',
+    False: 'Return only valid JSON with a "document" key adhering to the provided output_schema.',
+}
 
 
-def build_system_prompt(schema_str: Optional[str] = None) -> str:
+PROMPT_MODE_FULL = "full"
+PROMPT_MODE_COMPACT = "compact"
+PROMPT_MODES = (PROMPT_MODE_FULL, PROMPT_MODE_COMPACT)
+
+
+def build_system_prompt(schema_str: Optional[str] = None, references: bool = True) -> str:
     """Build the system prompt with the given schema string.
 
     Args:
         schema_str: JSON schema string. If None, loads from file.
+        references: Instruct the model to write the references array
     """
     if schema_str is None:
-        schema_str = get_extraction_schema_str()
-    return _SYSTEM_PROMPT_TEMPLATE.format(schema_str=schema_str)
+        schema_str = get_extraction_schema_str(references=references)
+    field_definitions = "\n\n".join(text for _, text in _FIELD_DEFINITIONS)
+    return _SYSTEM_PROMPT_TEMPLATE.format(
+        schema_str=schema_str, field_definitions=field_definitions, **_REFERENCES_PARTS[references]
+    )
+
+
+def prose_described_fields(document_schema: Dict[str, Any]) -> List[str]:
+    """Schema fields that have a block in field_definitions."""
+    described = {name for names, _ in _FIELD_DEFINITIONS for name in names}
+    return [name for name in document_schema.get("properties", {}) if name in described]
+
+
+def build_compact_system_prompt(
+    document_schema: Dict[str, Any],
+    strip_prose_described: bool = False,
+    references: bool = True,
+) -> str:
+    """Build a smaller system prompt for the given document schema.
+
+    The schema is embedded as minified JSON without descriptions that are
+    repeated elsewhere, and field_definitions only keeps blocks for fields the
+    schema actually contains.
+
+    Args:
+        document_schema: Flat document schema (without the references wrapper)
+        strip_prose_described: Also drop schema descriptions of fields that
+            field_definitions already explains
+        references: Instruct the model to write the references array
+    """
+    fields = set(document_schema.get("properties", {}))
+    drop_descriptions = prose_described_fields(document_schema) if strip_prose_described else ()
+    schema_str = get_extraction_schema_str(
+        document_schema, compact=True, drop_descriptions_for=drop_descriptions, references=references
+    )
+    field_definitions = "\n\n".join(
+        text for names, text in _FIELD_DEFINITIONS if fields.intersection(names)
+    )
+    return _SYSTEM_PROMPT_TEMPLATE.format(
+        schema_str=schema_str, field_definitions=field_definitions, **_REFERENCES_PARTS[references]
+    )
 
 
 # Default system prompt (loaded once at module import for backwards compatibility)
 SYSTEM_PROMPT = build_system_prompt()
 
 
-def build_user_prompt(segments: List[TranscriptSegment]) -> str:
-    """Build the user prompt with transcript segments."""
+def build_user_prompt(
+    segments: List[TranscriptSegment],
+    incremental: Optional[IncrementalContext] = None,
+    pre_extraction: Optional[PreExtraction] = None,
+    references: bool = True,
+) -> str:
+    """Build the user prompt with transcript segments.
+
+    Args:
+        segments: Transcript segments to number and include
+        incremental: If set, segments are numbered from its offset, the leading
+            context segments are marked as already processed and the current
+            document is included so only new facts are extracted.
+        pre_extraction: Values found by pattern matching; in "confirm" mode
+            they are listed for the model to confirm or correct.
+        references: Ask for the references array (False: document only)
+    """
+    pre_extracted = _pre_extracted_block(pre_extraction)
+    output_instruction = _USER_PROMPT_OUTPUT[references]
+    if incremental is not None:
+        return _build_incremental_user_prompt(segments, incremental, pre_extracted, output_instruction)
+
     transcript_lines = []
     for i, seg in enumerate(segments):
         transcript_lines.append(f"[{i}] {seg.time} | {seg.speaker}: {seg.text}")
@@ -166,4 +288,63 @@ def build_user_prompt(segments: List[TranscriptSegment]) -> str:
 {transcript_text}
 </transcript>
 
-Extract all medical entities. Return only valid JSON with "document" and "references" keys adhering to the provided output_schema."""
+{pre_extracted}Extract all medical entities. {output_instruction}"""
+
+
+def _build_incremental_user_prompt(
+    segments: List[TranscriptSegment],
+    incremental: IncrementalContext,
+    pre_extracted: str = "",
+    output_instruction: str = _USER_PROMPT_OUTPUT[True],
+) -> str:
+    """User prompt for extracting only newly arrived segments of a live transcript."""
+    offset = incremental.segment_offset
+    split = min(incremental.context_segments, len(segments))
+    context_lines = [
+        f"[{offset + i}] {seg.time} | {seg.speaker}: {seg.text}"
+        for i, seg in enumerate(segments[:split])
+    ]
+    new_lines = [
+        f"[{offset + split + i}] {seg.time} | {seg.speaker}: {seg.text}"
+        for i, seg in enumerate(segments[split:])
+    ]
+    context_text = "\n".join(context_lines)
+    transcript_text = "\n".join(new_lines)
+    document_json = json.dumps(incremental.document or {}, ensure_ascii=False, separators=(",", ":"))
+
+    return f"""<current_document>
+{document_json}
+</current_document>
+
+<previous_segments>
+{context_text}
+</previous_segments>
+
+<transcript>
+{transcript_text}
+</transcript>
+
+{pre_extracted}The consultation is in progress. current_document holds what was already extracted from earlier segments.
+Extract only NEW medical entities stated in the <transcript> segments that are not already in current_document.
+previous_segments are already processed: use them only as context (e.g. the doctor's question for an answer in <transcript>) and cite their indices in source_segments when needed.
+For fields with nothing new, return null. For a scalar value that changed (e.g. a repeated measurement), return the new value.
+{output_instruction}"""
+
+
+def _pre_extracted_block(pre_extraction: Optional[PreExtraction]) -> str:
+    """Pre-extracted values for the model to confirm ("confirm" mode only)."""
+    if pre_extraction is None or pre_extraction.mode != "confirm" or not pre_extraction.values:
+        return ""
+    values_json = json.dumps(pre_extraction.values, ensure_ascii=False, separators=(",", ":"))
+    return f"""<pre_extracted>
+{values_json}
+</pre_extracted>
+
+pre_extracted holds measurements already read from the transcript by pattern matching.
+Return these fields with the same value and without references entries, unless the transcript clearly states a different value: then return that value with its references entry.
+
+"""
+
+
+CONTINUATION_PROMPT = """Your previous answer was cut off before the JSON was complete.
+Continue it exactly where it stops: output only the remaining characters, without repeating anything already written and without code fences."""
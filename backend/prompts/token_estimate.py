@@ -0,0 +1,58 @@
+"""Local token count estimates for prompts.
+
+Uses tiktoken when it is installed (o200k_base, the GPT-4o encoding) and a
+regex-based approximation otherwise. The estimates are meant for comparing
+prompt variants and sizing requests, not for billing.
+"""
+
+import math
+import re
+from functools import lru_cache
+from typing import Any, Optional
+
+TIKTOKEN_ENCODING = "o200k_base"
+
+# Words, single punctuation characters and whitespace runs that contain a newline
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]|\s*\n\s*", re.UNICODE)
+# Average characters per token for word pieces (lower for non-English text)
+_CHARS_PER_WORD_TOKEN = 3.5
+
+
+@lru_cache
+def _get_encoding() -> Optional[Any]:
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.get_encoding(TIKTOKEN_ENCODING)
+    except Exception:
+        return None
+
+
+def tokenizer_name() -> str:
+    """Name of the tokenizer used by estimate_tokens."""
+    return f"tiktoken:{TIKTOKEN_ENCODING}" if _get_encoding() is not None else "heuristic"
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of input tokens for a piece of text.
+
+    Args:
+        text: Prompt text
+
+    Returns:
+        Token count from tiktoken if available, otherwise a heuristic estimate
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+
+    count = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        piece = match.group()
+        if piece[0].isalnum() or piece[0] == "_":
+            count += max(1, math.ceil(len(piece) / _CHARS_PER_WORD_TOKEN))
+        else:
+            count += 1
+    return count
@@ -8,7 +8,7 @@ Wraps it with a references array for source segment tracking.
 import copy
 import json
 import os
-from typing import Optional
+from typing import Any, Dict, Iterable, Optional
 
 SCHEMA_FILE_PATH = os.path.join(os.path.dirname(__file__), "e025_flat_schema.json")
 
@@ -46,23 +46,36 @@ def _remove_diagnosis(schema: dict) -> dict:
     return schema
 
 
+def prepare_document_schema(schema: dict) -> dict:
+    """Apply the project-wide adjustments to a freshly parsed document schema."""
+    return _remove_diagnosis(schema)
+
+
 def load_document_schema(path: str = SCHEMA_FILE_PATH) -> dict:
     """Load the flat E025 document schema from a JSON file."""
     with open(path, "r", encoding="utf-8") as f:
         schema = json.load(f)
-    schema = _remove_diagnosis(schema)
-    return schema
+    return prepare_document_schema(schema)
 
 
-def build_extraction_schema(doc_schema: Optional[dict] = None) -> dict:
+def build_extraction_schema(doc_schema: Optional[dict] = None, references: bool = True) -> dict:
     """Build the full extraction schema (document + references).
 
     Args:
         doc_schema: Optional pre-loaded document schema. If None, loads from file.
+        references: Include the references array (False when references are
+            aligned locally, see backend.services.reference_alignment)
     """
     if doc_schema is None:
         doc_schema = load_document_schema()
 
+    if not references:
+        return {
+            "type": "object",
+            "properties": {"document": copy.deepcopy(doc_schema)},
+            "required": ["document"],
+            "additionalProperties": False,
+        }
     return {
         "type": "object",
         "properties": {
@@ -74,7 +87,111 @@ def build_extraction_schema(doc_schema: Optional[dict] = None) -> dict:
     }
 
 
-def get_extraction_schema_str(doc_schema: Optional[dict] = None) -> str:
-    """Get the full extraction schema as a formatted JSON string (for prompts)."""
-    schema = build_extraction_schema(doc_schema)
-    return json.dumps(schema, indent=2, ensure_ascii=False)
+def get_extraction_schema_str(
+    doc_schema: Optional[dict] = None,
+    compact: bool = False,
+    drop_descriptions_for: Iterable[str] = (),
+    references: bool = True,
+) -> str:
+    """Get the full extraction schema as a formatted JSON string (for prompts).
+
+    Args:
+        doc_schema: Optional pre-loaded document schema. If None, loads from file.
+        compact: Minify the JSON and drop descriptions repeated elsewhere in the prompt
+        drop_descriptions_for: Document fields whose descriptions are dropped (compact only)
+        references: Include the references array
+    """
+    schema = build_extraction_schema(doc_schema, references)
+    if not compact:
+        return json.dumps(schema, indent=2, ensure_ascii=False)
+    return json.dumps(
+        compact_extraction_schema(schema, drop_descriptions_for),
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+
+
+def compact_extraction_schema(schema: dict, drop_descriptions_for: Iterable[str] = ()) -> dict:
+    """Remove duplicated descriptions from an extraction schema (in place).
+
+    - references item descriptions (the extraction rules already explain them)
+    - 'statement' item descriptions of array fields that have their own description
+    - descriptions of the given document fields
+    """
+    drop = set(drop_descriptions_for)
+    if "references" in schema["properties"]:
+        for prop in schema["properties"]["references"]["items"]["properties"].values():
+            prop.pop("description", None)
+
+    for name, prop in schema["properties"]["document"].get("properties", {}).items():
+        item_props = prop.get("items", {}).get("properties", {})
+        statement = item_props.get("statement")
+        if statement is not None and "description" in prop:
+            statement.pop("description", None)
+        if name in drop:
+            prop.pop("description", None)
+    return schema
+
+
+def make_schema_strict(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Post-process JSON schema (in place) to meet OpenAI Strict Structured Outputs requirements.
+    1. 'additionalProperties': false
+    2. All keys in 'properties' must be in 'required'
+    3. No 'description' or 'title' if '$ref' is present
+    """
+    if "$ref" in schema:
+        # If it's a ref, it cannot have other keywords like description or title
+        keys_to_remove = ["description", "title", "default"]
+        for k in keys_to_remove:
+            if k in schema:
+                del schema[k]
+        # We don't recurse into ref here, the ref definition will be handled in $defs
+        return schema
+
+    if "type" in schema and schema["type"] == "object":
+        schema["additionalProperties"] = False
+
+        properties = schema.get("properties", {})
+        if properties:
+            required = schema.get("required", [])
+            # Add all properties to required
+            for prop_name in properties.keys():
+                if prop_name not in required:
+                    required.append(prop_name)
+            schema["required"] = required
+
+        # Recurse into properties
+        for prop in properties.values():
+            make_schema_strict(prop)
+
+        # Recurse into definitions
+        defs = schema.get("$defs", {})
+        for def_schema in defs.values():
+            make_schema_strict(def_schema)
+
+    elif "type" in schema and schema["type"] == "array":
+        items = schema.get("items", {})
+        make_schema_strict(items)
+
+    elif "anyOf" in schema:
+        for sub_schema in schema["anyOf"]:
+            make_schema_strict(sub_schema)
+
+    return schema
+
+
+def to_gemini_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of the schema usable as Gemini's response_json_schema.
+
+    Gemini does not enforce 'additionalProperties', so it is dropped everywhere.
+    """
+    if isinstance(schema, dict):
+        return {
+            k: to_gemini_schema(v)
+            for k, v in schema.items()
+            if k != "additionalProperties"
+        }
+    if isinstance(schema, list):
+        return [to_gemini_schema(v) for v in schema]
+    return schema
@@ -0,0 +1,269 @@
+"""
+Versioned schema registry.
+
+Loads every flat schema variant in this directory (e025_flat_schema.json,
+e025_flat_schema2.json, ...) once and precomputes everything a request needs:
+the strict OpenAI schema, the Gemini schema, the rendered system prompt and
+(with RESULT_VALIDATION) the compiled answer validator.
+A version is recompiled and atomically swapped in only when its file content
+hash changes, so per-request schema/prompt construction is a dictionary lookup.
+"""
+
+import copy
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.config import get_settings
+from backend.schemas.e025_flat import (
+    build_extraction_schema,
+    get_extraction_schema_str,
+    make_schema_strict,
+    prepare_document_schema,
+    to_gemini_schema,
+)
+from backend.schemas.validation import ResultValidator
+from backend.prompts.token_estimate import estimate_tokens
+
+SCHEMA_DIR = os.path.dirname(__file__)
+SCHEMA_GLOB = "e025_flat_schema*.json"
+DEFAULT_SCHEMA_VERSION = "e025_flat_schema"
+
+
+@dataclass(frozen=True)
+class SchemaArtifacts:
+    """Precompiled, read-only artifacts for one schema version.
+
+    The dict fields are shared between requests and must not be mutated.
+    """
+
+    version: str
+    path: str
+    content_hash: str
+    fingerprint: str
+    document_schema: Dict[str, Any]
+    extraction_schema: Dict[str, Any]
+    openai_schema: Dict[str, Any]
+    gemini_schema: Dict[str, Any]
+    schema_str: str
+    system_prompt: str
+    system_prompt_tokens: int
+    references: bool = True  # False: the model writes the document only, references are aligned locally
+    validator: Optional[ResultValidator] = None  # Set when answers are validated against the schema
+
+
+def compile_schema(
+    version: str,
+    path: str,
+    raw: bytes,
+    prompt_mode: str = "full",
+    strip_prose_described: bool = False,
+    references: bool = True,
+    validate: bool = False,
+) -> SchemaArtifacts:
+    """Compile the artifacts for a schema file's raw content.
+
+    Args:
+        version: Schema version (file stem)
+        path: Schema file path
+        raw: Schema file content
+        prompt_mode: "full" or "compact" system prompt rendering
+        strip_prose_described: Compact mode: drop descriptions of fields explained in prose
+        references: Ask the model for the references array
+        validate: Compile a validator of the model's answers
+    """
+    # Imported here: the prompt module itself imports backend.schemas.e025_flat
+    from backend.prompts.extraction_prompt import (
+        PROMPT_MODE_COMPACT,
+        build_compact_system_prompt,
+        build_system_prompt,
+    )
+
+    content_hash = hashlib.sha256(raw).hexdigest()
+    document_schema = prepare_document_schema(json.loads(raw.decode("utf-8")))
+    extraction_schema = build_extraction_schema(document_schema, references)
+    schema_str = get_extraction_schema_str(document_schema, references=references)
+    if prompt_mode == PROMPT_MODE_COMPACT:
+        system_prompt = build_compact_system_prompt(document_schema, strip_prose_described, references)
+    else:
+        system_prompt = build_system_prompt(schema_str, references)
+    fingerprint = hashlib.sha256(
+        (content_hash + system_prompt).encode("utf-8")
+    ).hexdigest()[:32]
+
+    return SchemaArtifacts(
+        version=version,
+        path=path,
+        content_hash=content_hash,
+        fingerprint=fingerprint,
+        document_schema=document_schema,
+        extraction_schema=extraction_schema,
+        openai_schema=make_schema_strict(copy.deepcopy(extraction_schema)),
+        gemini_schema=to_gemini_schema(extraction_schema),
+        schema_str=schema_str,
+        system_prompt=system_prompt,
+        system_prompt_tokens=estimate_tokens(system_prompt),
+        references=references,
+        validator=ResultValidator(extraction_schema) if validate else None,
+    )
+
+
+class SchemaRegistry:
+    """Registry of compiled schema versions, hot-swapped on file content change."""
+
+    def __init__(
+        self,
+        schema_dir: str = SCHEMA_DIR,
+        default_version: str = DEFAULT_SCHEMA_VERSION,
+        check_interval: float = 1.0,
+        prompt_mode: str = "full",
+        strip_prose_described: bool = False,
+        references: bool = True,
+        validate: bool = False,
+    ):
+        """Initialize the registry.
+
+        Args:
+            schema_dir: Directory containing the flat schema JSON files
+            default_version: Version used when a request does not select one
+            check_interval: Minimum seconds between file change checks per version
+            prompt_mode: "full" or "compact" system prompt rendering
+            strip_prose_described: Compact mode: drop descriptions of fields explained in prose
+            references: Ask the model for the references array (False: aligned locally)
+            validate: Compile a validator of the model's answers per version
+        """
+        from backend.prompts.extraction_prompt import PROMPT_MODES
+
+        if prompt_mode not in PROMPT_MODES:
+            raise ValueError(f"Unknown prompt mode: {prompt_mode} (expected one of {PROMPT_MODES})")
+        self.schema_dir = schema_dir
+        self.default_version = default_version
+        self.check_interval = check_interval
+        self.prompt_mode = prompt_mode
+        self.strip_prose_described = strip_prose_described
+        self.references = references
+        self.validate = validate
+        self._artifacts: Dict[str, SchemaArtifacts] = {}
+        self._variants: Dict[Tuple[str, Tuple[str, ...]], Tuple[str, SchemaArtifacts]] = {}
+        self._stat_keys: Dict[str, tuple] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _path_for(self, version: str) -> str:
+        return os.path.join(self.schema_dir, f"{version}.json")
+
+    def versions(self) -> List[str]:
+        """List the schema versions available on disk."""
+        paths = glob.glob(os.path.join(self.schema_dir, SCHEMA_GLOB))
+        return sorted(os.path.splitext(os.path.basename(p))[0] for p in paths)
+
+    def get(self, version: Optional[str] = None, drop_fields: Tuple[str, ...] = ()) -> SchemaArtifacts:
+        """Return the compiled artifacts for a schema version.
+
+        Args:
+            version: Schema version (file stem). Defaults to the registry default.
+            drop_fields: Document fields to leave out of the schema and prompt
+                (a variant compiled once per version and field set)
+
+        Raises:
+            ValueError: If the version does not exist
+        """
+        version = version or self.default_version
+        artifacts = self._artifacts.get(version)
+        now = time.monotonic()
+        if artifacts is None or now - self._checked_at.get(version, 0.0) >= self.check_interval:
+            artifacts = self._refresh(version, now)
+        if drop_fields:
+            return self._variant(artifacts, tuple(drop_fields))
+        return artifacts
+
+    def _variant(self, base: SchemaArtifacts, drop_fields: Tuple[str, ...]) -> SchemaArtifacts:
+        key = (base.version, drop_fields)
+        entry = self._variants.get(key)
+        if entry is not None and entry[0] == base.content_hash:
+            return entry[1]
+        with open(base.path, "rb") as f:
+            raw = f.read()
+        raw_schema = json.loads(raw.decode("utf-8"))
+        raw_schema["properties"] = {
+            name: prop for name, prop in raw_schema.get("properties", {}).items() if name not in drop_fields
+        }
+        if "required" in raw_schema:
+            raw_schema["required"] = [name for name in raw_schema["required"] if name not in drop_fields]
+        artifacts = compile_schema(
+            base.version,
+            base.path,
+            json.dumps(raw_schema, ensure_ascii=False).encode("utf-8"),
+            self.prompt_mode,
+            self.strip_prose_described,
+            self.references,
+            self.validate,
+        )
+        if hashlib.sha256(raw).hexdigest() == base.content_hash:
+            # Not cached if the file changed since the base was compiled
+            self._variants[key] = (base.content_hash, artifacts)
+        return artifacts
+
+    def _refresh(self, version: str, now: float) -> SchemaArtifacts:
+        if os.path.basename(version) != version or not version.startswith("e025_flat_schema"):
+            raise ValueError(f"Unknown schema version: {version}")
+        path = self._path_for(version)
+        try:
+            st = os.stat(path)
+        except OSError:
+            raise ValueError(f"Unknown schema version: {version}")
+
+        stat_key = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            artifacts = self._artifacts.get(version)
+            self._checked_at[version] = now
+            if artifacts is not None and self._stat_keys.get(version) == stat_key:
+                return artifacts
+
+            with open(path, "rb") as f:
+                raw = f.read()
+            content_hash = hashlib.sha256(raw).hexdigest()
+            if artifacts is None or artifacts.content_hash != content_hash:
+                artifacts = compile_schema(
+                    version, path, raw, self.prompt_mode, self.strip_prose_described, self.references, self.validate
+                )
+                # Single reference assignment: readers see either the old or new version
+                self._artifacts[version] = artifacts
+            self._stat_keys[version] = stat_key
+            return artifacts
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """Summaries of all available versions (for the API)."""
+        result = []
+        for version in self.versions():
+            artifacts = self.get(version)
+            result.append({
+                "version": version,
+                "default": version == self.default_version,
+                "content_hash": artifacts.content_hash,
+                "prompt_mode": self.prompt_mode,
+                "references": "model" if self.references else "local",
+                "validated": artifacts.validator is not None,
+                "system_prompt_tokens": artifacts.system_prompt_tokens,
+                "fields": list(artifacts.document_schema.get("properties", {}).keys()),
+            })
+        return result
+
+
+@lru_cache
+def get_schema_registry() -> SchemaRegistry:
+    """Get the process-wide schema registry."""
+    settings = get_settings()
+    return SchemaRegistry(
+        default_version=settings.schema_version,
+        prompt_mode=settings.prompt_mode,
+        strip_prose_described=settings.prompt_strip_prose_described,
+        references=settings.references_mode != "local",
+        validate=settings.result_validation,
+    )
@@ -0,0 +1,132 @@
+"""
+Compiled validation of LLM answers against the flat schema.
+
+The extraction pipeline works on plain dicts, so instead of a BaseModel the
+flat schema is translated into TypedDicts once per schema version and
+wrapped in a pydantic ``TypeAdapter``. ``validate_json`` then parses the
+provider text and checks it in one pass in pydantic-core (no json.loads
+followed by a separate validation walk) and returns a plain dict.
+
+Lax mode is kept on purpose: "120" is accepted for an integer field and a
+number for a string (a references value written as 36.6). Keys outside the
+schema are dropped rather than rejected.
+"""
+
+from typing import Any, Dict, List, Literal, Optional, Tuple, Union
+
+from pydantic import ConfigDict, TypeAdapter, ValidationError
+from typing_extensions import NotRequired, Required, TypedDict
+
+_CONFIG = ConfigDict(extra="ignore", coerce_numbers_to_str=True)
+
+_SCALARS = {
+    "string": str,
+    "integer": int,
+    "number": float,
+    "boolean": bool,
+}
+
+
+def _type_of(schema: Dict[str, Any], name: str) -> Any:
+    """Python type for a JSON schema node of the flat schema subset."""
+    types = schema.get("type", "string")
+    if not isinstance(types, list):
+        types = [types]
+    nullable = "null" in types
+    types = [t for t in types if t != "null"]
+
+    if "enum" in schema:
+        values = tuple(v for v in schema["enum"] if v is not None)
+        result: Any = Literal[values] if values else type(None)
+    elif types == ["array"]:
+        result = List[_type_of(schema.get("items", {}), f"{name}_item")]
+    elif types == ["object"]:
+        result = _typed_dict(name, schema)
+    elif len(types) == 1 and types[0] in _SCALARS:
+        result = _SCALARS[types[0]]
+    elif types:
+        result = Union[tuple(_SCALARS.get(t, Any) for t in types)]
+    else:
+        result = Any
+    return Optional[result] if nullable else result
+
+
+def _nullable(schema: Dict[str, Any]) -> bool:
+    types = schema.get("type")
+    return "null" in types if isinstance(types, list) else types == "null"
+
+
+def _typed_dict(name: str, schema: Dict[str, Any], total: bool = True) -> Any:
+    """TypedDict for an object schema; ``total=False`` makes every key optional.
+
+    A nullable key may also be left out (providers without strict structured
+    output omit null fields), so only required non-nullable keys are Required.
+    """
+    required = set(schema.get("required", ())) if total else set()
+    fields = {}
+    for key, prop in schema.get("properties", {}).items():
+        marker = Required if key in required and not _nullable(prop) else NotRequired
+        fields[key] = marker[_type_of(prop, f"{name}_{key}")]
+    typed = TypedDict(name, fields)
+    typed.__pydantic_config__ = _CONFIG
+    return typed
+
+
+class ResultValidator:
+    """Validators of extraction answers for one compiled schema version."""
+
+    def __init__(self, extraction_schema: Dict[str, Any]):
+        """Compile the validators.
+
+        Args:
+            extraction_schema: Extraction schema (document, and references unless aligned locally)
+        """
+        self.complete = TypeAdapter(self._result_type(extraction_schema, total=True))
+        # Repaired truncated answers: whatever fields were completed, plus the partial markers
+        self.partial = TypeAdapter(self._result_type(extraction_schema, total=False))
+
+    @staticmethod
+    def _result_type(extraction_schema: Dict[str, Any], total: bool) -> Any:
+        properties = extraction_schema.get("properties", {})
+        fields = {"document": Required[_typed_dict("Document", properties["document"], total)]}
+        if "references" in properties:
+            fields["references"] = Required[_type_of(properties["references"], "Reference")]
+        fields["partial"] = NotRequired[bool]
+        fields["missing_fields"] = NotRequired[List[str]]
+        typed = TypedDict("ExtractionResult", fields)
+        typed.__pydantic_config__ = _CONFIG
+        return typed
+
+    def validate_json(self, text: Union[str, bytes]) -> Dict[str, Any]:
+        """Parse and validate a complete answer in one pass.
+
+        Raises:
+            pydantic.ValidationError: If the text is not valid JSON or does not match the schema
+        """
+        return self.complete.validate_json(text)
+
+    def validate_python(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate an already parsed (repaired) answer.
+
+        Raises:
+            pydantic.ValidationError: If the result does not match the schema
+        """
+        adapter = self.partial if result.get("partial") else self.complete
+        return adapter.validate_python(result)
+
+
+def is_json_error(error: ValidationError) -> bool:
+    """Whether validation failed on JSON syntax (repairable) rather than on the schema."""
+    return any(e["type"] == "json_invalid" for e in error.errors(include_url=False))
+
+
+def summarize_errors(error: ValidationError, limit: int = 3) -> str:
+    """Short description of the first validation errors, for logs and error messages."""
+    errors: List[Tuple[str, str]] = [
+        (".".join(str(part) for part in e["loc"]) or "<root>", e["msg"])
+        for e in error.errors(include_url=False)
+    ]
+    summary = "; ".join(f"{loc}: {msg}" for loc, msg in errors[:limit])
+    if len(errors) > limit:
+        summary += f" (+{len(errors) - limit} more)"
+    return summary
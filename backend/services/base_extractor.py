@@ -0,0 +1,328 @@
+"""Common base class of the provider extractors.
+
+Implements the retry loop, outbound rate limiting, per-request idempotency
+keys and JSON response parsing (with repair of truncated answers and local
+reference alignment) once;
+providers implement a single attempt (``_extract_once`` / ``_stream_once``),
+a continuation of a truncated answer (``_continue_once``) and say which of
+their errors are transient (``_classify_error``).
+"""
+
+import logging
+import sys
+import time
+import uuid
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from pydantic import ValidationError
+
+from backend.models.transcript import TranscriptInput
+from backend.prompts.extraction_prompt import build_user_prompt
+from backend.prompts.token_estimate import estimate_tokens
+from backend.schemas.registry import SchemaArtifacts, get_schema_registry
+from backend.schemas.validation import is_json_error, summarize_errors
+from backend.services import fast_json, metrics
+from backend.services.json_repair import repair_result, repair_stats
+from backend.services.rate_limit import ProviderRateLimiter
+from backend.services.reference_alignment import align_references
+from backend.services.retry import InvalidResponseError, RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+
+class BaseExtractor:
+    """Provider extractor base: retries with backoff, idempotency keys, parsing."""
+
+    provider = ""
+    display_name = ""
+
+    def __init__(
+        self,
+        model_name: str,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[ProviderRateLimiter] = None,
+        repair_json: bool = True,
+        continue_truncated: bool = False,
+    ):
+        """Initialize the extractor.
+
+        Args:
+            model_name: Model used by the provider
+            retry_policy: Retry policy for transient errors (defaults to RetryPolicy())
+            rate_limiter: Outbound RPM/TPM and concurrency limiter (None: unlimited)
+            repair_json: Repair malformed or truncated answers instead of failing
+            continue_truncated: Ask the model once for the missing tail of a truncated answer
+        """
+        self.model_name = model_name
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.repair_json = repair_json
+        self.continue_truncated = continue_truncated
+
+    async def warmup(self, connections: int = 1) -> None:
+        """Open pooled connections ahead of the first extraction."""
+
+    async def aclose(self) -> None:
+        """Close the underlying HTTP connection pool."""
+
+    async def extract(self, transcript_input: TranscriptInput) -> Dict[str, Any]:
+        """Extract medical entities from a transcript, retrying transient failures.
+
+        All attempts of one extraction share an idempotency key.
+
+        Args:
+            transcript_input: The transcript to process
+
+        Returns:
+            Raw dict with 'document' and 'references' keys
+        """
+        idempotency_key = uuid.uuid4().hex
+        labels = self._metric_labels(transcript_input)
+        # Rendered once: the rate limiter and every attempt send the same prompt
+        user_prompt = self._user_prompt(transcript_input)
+
+        async def attempt_once(attempt: int) -> Dict[str, Any]:
+            async with self._admitted(transcript_input, user_prompt):
+                return await self._extract_once(transcript_input, idempotency_key, user_prompt)
+
+        return await self.retry_policy.run(
+            attempt_once,
+            self._classify_error,
+            name=f"{self.display_name} extraction",
+            on_retry=lambda reason: metrics.retries.inc(*labels, reason),
+        )
+
+    async def extract_stream(self, transcript_input: TranscriptInput) -> AsyncIterator[str]:
+        """Stream the raw JSON answer for a transcript as text deltas.
+
+        Failures before the first chunk are retried; once text has been
+        yielded the stream is not restarted. The rate limiter's concurrency
+        slot is held until the stream ends.
+
+        Args:
+            transcript_input: The transcript to process
+
+        Yields:
+            Text chunks which concatenate to the same JSON that extract() parses
+        """
+        idempotency_key = uuid.uuid4().hex
+        labels = self._metric_labels(transcript_input)
+        user_prompt = self._user_prompt(transcript_input)
+
+        async def open_stream(attempt: int) -> Tuple[AsyncExitStack, AsyncIterator[str], Optional[str]]:
+            stack = AsyncExitStack()
+            try:
+                await stack.enter_async_context(self._admitted(transcript_input, user_prompt))
+                stream = self._stream_once(transcript_input, idempotency_key, user_prompt=user_prompt).__aiter__()
+                try:
+                    first = await stream.__anext__()
+                except StopAsyncIteration:
+                    first = None
+            except BaseException:
+                await stack.__aexit__(*sys.exc_info())
+                raise
+            return stack, stream, first
+
+        stack, stream, first = await self.retry_policy.run(
+            open_stream,
+            self._classify_error,
+            name=f"{self.display_name} stream",
+            on_retry=lambda reason: metrics.retries.inc(*labels, reason),
+        )
+        async with stack:
+            if first is None:
+                return
+            yield first
+            async for chunk in stream:
+                yield chunk
+
+    async def finish_stream(self, transcript_input: TranscriptInput, response_text: str) -> Dict[str, Any]:
+        """Parse a finished stream from extract_stream like an extract() answer.
+
+        A truncated answer is repaired and marked partial (if repair is
+        enabled) but not continued: its text has already been streamed.
+
+        Args:
+            transcript_input: The transcript the stream was requested for
+            response_text: Concatenated stream chunks
+
+        Returns:
+            Raw dict with 'document' and 'references' keys
+        """
+        return self._parse_response(response_text, transcript_input)
+
+    def estimate_input_tokens(self, transcript_input: TranscriptInput, user_prompt: Optional[str] = None) -> int:
+        """Estimated prompt tokens: the schema version's system prompt plus the rendered user prompt.
+
+        Args:
+            transcript_input: The transcript to process
+            user_prompt: The already rendered user prompt (rendered here if None)
+        """
+        if user_prompt is None:
+            user_prompt = self._user_prompt(transcript_input)
+        return self._artifacts(transcript_input).system_prompt_tokens + estimate_tokens(user_prompt)
+
+    def _artifacts(self, transcript_input: Optional[TranscriptInput]) -> SchemaArtifacts:
+        """Schema artifacts for a request, without the fields removed by pre-extraction."""
+        if transcript_input is None:
+            return get_schema_registry().get()
+        pre_extraction = transcript_input.pre_extraction
+        return get_schema_registry().get(
+            transcript_input.schema_version, pre_extraction.removed_fields if pre_extraction else ()
+        )
+
+    def _user_prompt(self, transcript_input: TranscriptInput) -> str:
+        """Rendered user prompt for a request."""
+        started = time.perf_counter()
+        artifacts = self._artifacts(transcript_input)
+        prompt = build_user_prompt(
+            transcript_input.transcript,
+            transcript_input.incremental,
+            transcript_input.pre_extraction,
+            references=artifacts.references,
+        )
+        metrics.observe_stage(
+            "prompt_build", time.perf_counter() - started, self.provider, self.model_name, artifacts.version
+        )
+        return prompt
+
+    def _metric_labels(self, transcript_input: Optional[TranscriptInput]) -> Tuple[str, str, str]:
+        """(provider, model, schema version) labels of a request's metrics."""
+        return self.provider, self.model_name, self._artifacts(transcript_input).version
+
+    @asynccontextmanager
+    async def _admitted(
+        self, transcript_input: TranscriptInput, user_prompt: Optional[str] = None
+    ) -> AsyncIterator[None]:
+        """Admit one provider call through the rate limiter (if any)."""
+        if self.rate_limiter is None:
+            yield
+            return
+        tokens = self.estimate_input_tokens(transcript_input, user_prompt)
+        async with self.rate_limiter.admit(tokens, self._classify_error):
+            yield
+
+    async def _extract_once(
+        self, transcript_input: TranscriptInput, idempotency_key: str, user_prompt: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Single extraction attempt (``user_prompt``: the rendered prompt, rendered if None)."""
+        raise NotImplementedError
+
+    def _stream_once(
+        self, transcript_input: TranscriptInput, idempotency_key: str, user_prompt: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Single streaming attempt (``user_prompt``: the rendered prompt, rendered if None)."""
+        raise NotImplementedError
+
+    async def _continue_once(self, transcript_input: TranscriptInput, partial_text: str) -> str:
+        """Ask the model for the rest of a truncated answer; returns only the tail."""
+        raise NotImplementedError
+
+    def _classify_error(self, exc: BaseException) -> Tuple[Optional[str], Optional[float]]:
+        """Decide whether an error is worth retrying.
+
+        Returns:
+            (retry reason, or None if not retryable; Retry-After seconds if the provider sent one)
+        """
+        if isinstance(exc, InvalidResponseError):
+            return "invalid_json", None
+        return None, None
+
+    def _status_code(self, exc: BaseException) -> Optional[int]:
+        """HTTP status of a provider error, or None for other errors."""
+        return None
+
+    def is_client_error(self, exc: BaseException) -> bool:
+        """Whether the provider rejected the request itself rather than failing to serve it.
+
+        Non-retryable 4xx errors (bad or oversized request, authentication,
+        unknown model) say nothing about the provider's health.
+        """
+        status = self._status_code(exc)
+        return status is not None and 400 <= status < 500 and self._classify_error(exc)[0] is None
+
+    def _parse_response(
+        self, response_text: str, transcript_input: Optional[TranscriptInput] = None, record: bool = True
+    ) -> Dict[str, Any]:
+        """Parse the JSON response from the provider, repairing it if enabled.
+
+        Without a references array in the schema (REFERENCES_MODE=local) the
+        references are aligned to the transcript locally.
+        """
+        started = time.perf_counter()
+        artifacts = self._artifacts(transcript_input)
+        if artifacts.validator is not None:
+            result = self._validate_response(response_text, artifacts, record)
+        else:
+            try:
+                if not self.repair_json:
+                    result = fast_json.loads(response_text)
+                else:
+                    result = repair_result(
+                        response_text, artifacts.document_schema.get("properties", {}), record=record
+                    )
+            except (ValueError, TypeError) as e:
+                logger.error(f"Failed to parse {self.display_name} response: {e}")
+                logger.debug(f"Response text: {response_text}")
+                raise InvalidResponseError(f"Invalid JSON response from {self.display_name}: {e}")
+        if not artifacts.references and transcript_input is not None and isinstance(result, dict):
+            result["references"] = align_references(
+                result.get("document") or {},
+                transcript_input.transcript,
+                artifacts.document_schema,
+                offset=transcript_input.incremental.segment_offset if transcript_input.incremental else 0,
+            )
+        metrics.observe_stage(
+            "response_parse", time.perf_counter() - started, self.provider, self.model_name, artifacts.version
+        )
+        return result
+
+    def _validate_response(self, response_text: str, artifacts: SchemaArtifacts, record: bool) -> Dict[str, Any]:
+        """Parse and validate an answer with the schema version's compiled validator.
+
+        Well-formed answers are parsed and validated in a single pass; only
+        malformed JSON goes through the repair path and is validated afterwards.
+        """
+        try:
+            result = artifacts.validator.validate_json(response_text)
+            if record:
+                repair_stats.record("valid")
+            return result
+        except ValidationError as e:
+            error = e
+        if self.repair_json and is_json_error(error):
+            try:
+                repaired = repair_result(response_text, artifacts.document_schema.get("properties", {}), record=record)
+                return artifacts.validator.validate_python(repaired)
+            except ValidationError as e:
+                error = e
+            except (ValueError, TypeError) as e:
+                logger.error(f"Failed to parse {self.display_name} response: {e}")
+                logger.debug(f"Response text: {response_text}")
+                raise InvalidResponseError(f"Invalid JSON response from {self.display_name}: {e}")
+        elif record:
+            repair_stats.record("failed")
+        summary = summarize_errors(error)
+        logger.error(f"{self.display_name} response does not match the schema: {summary}")
+        logger.debug(f"Response text: {response_text}")
+        raise InvalidResponseError(f"Invalid response from {self.display_name}: {summary}")
+
+    async def _complete_response(self, transcript_input: TranscriptInput, response_text: str) -> Dict[str, Any]:
+        """Parse an answer; continue it once if it was truncated and continuation is enabled."""
+        result = self._parse_response(response_text, transcript_input)
+        if not result.get("partial") or not self.continue_truncated:
+            return result
+
+        logger.info(f"Requesting continuation of truncated {self.display_name} answer")
+        try:
+            tail = await self._continue_once(transcript_input, response_text)
+            continued = self._parse_response(response_text + tail, transcript_input, record=False)
+        except Exception as e:
+            logger.warning(f"Continuation failed, returning partial result: {type(e).__name__}: {e}")
+            return result
+        if continued.get("partial"):
+            logger.warning(f"Continued answer still truncated, missing {continued['missing_fields']}")
+            return continued if len(continued["missing_fields"]) < len(result["missing_fields"]) else result
+        repair_stats.record("continued")
+        return continued
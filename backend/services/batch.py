@@ -0,0 +1,79 @@
+"""Batch extraction with bounded concurrency.
+
+Fans a list of transcripts out to an extractor under an asyncio semaphore.
+Each item produces its own result or error entry, so one failing transcript
+never fails the whole batch.
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List
+
+from backend.models.transcript import TranscriptInput
+from backend.services.circuit_breaker import CircuitOpenError, ExtractionTimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+def error_status_code(exc: Exception) -> int:
+    """HTTP status used for an extraction error (mirrors /api/extract)."""
+    if isinstance(exc, ValueError):
+        return 422
+    if isinstance(exc, CircuitOpenError):
+        return 503
+    if isinstance(exc, ExtractionTimeoutError):
+        return 504
+    return 500
+
+
+async def iter_batch(
+    extractor: Any,
+    items: List[TranscriptInput],
+    concurrency: int,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Extract all items, yielding each item's entry as soon as it completes.
+
+    Entries carry the item's ``index`` in the input list, so they can be
+    matched up even though they arrive in completion order. Pending
+    extractions are cancelled if the consumer stops iterating early.
+
+    Args:
+        extractor: Extractor exposing ``async extract(TranscriptInput)``
+        items: Transcripts to process
+        concurrency: Maximum number of extractions in flight
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(index: int, item: TranscriptInput) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                result = await extractor.extract(item)
+                return {"index": index, "status": "ok", "result": result}
+            except Exception as e:
+                logger.error(f"Batch item {index} failed: {type(e).__name__}: {e}")
+                return {
+                    "index": index,
+                    "status": "error",
+                    "status_code": error_status_code(e),
+                    "error": str(e),
+                }
+
+    tasks = [asyncio.create_task(run(i, item)) for i, item in enumerate(items)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def extract_batch(
+    extractor: Any,
+    items: List[TranscriptInput],
+    concurrency: int,
+) -> List[Dict[str, Any]]:
+    """Extract all items and return their entries in input order."""
+    results: List[Dict[str, Any]] = [{} for _ in items]
+    async for entry in iter_batch(extractor, items, concurrency):
+        results[entry["index"]] = entry
+    return results
@@ -0,0 +1,121 @@
+"""Chunked (map-reduce) extraction for long transcripts.
+
+Splits a transcript into overlapping segment windows, extracts the windows in
+parallel with the wrapped extractor, and merges the flat documents with
+backend.services.document_merge.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.models.transcript import TranscriptInput, TranscriptSegment
+from backend.schemas.registry import SchemaRegistry, get_schema_registry
+from backend.services.document_merge import SCALAR_LATEST, merge_partial_results
+from backend.services.extractor_wrapper import ExtractorWrapper
+
+logger = logging.getLogger(__name__)
+
+
+def split_windows(
+    segments: List[TranscriptSegment], window_size: int, overlap: int
+) -> List[Tuple[int, List[TranscriptSegment]]]:
+    """Split segments into overlapping windows.
+
+    Args:
+        segments: Full transcript
+        window_size: Segments per window
+        overlap: Segments shared by consecutive windows
+
+    Returns:
+        List of (offset of the window's first segment, window segments)
+    """
+    if window_size <= 0:
+        raise ValueError("window_size must be positive")
+    if not 0 <= overlap < window_size:
+        raise ValueError("overlap must be between 0 and window_size - 1")
+
+    step = window_size - overlap
+    windows = []
+    start = 0
+    while True:
+        windows.append((start, segments[start:start + window_size]))
+        if start + window_size >= len(segments):
+            break
+        start += step
+    return windows
+
+
+class ChunkedExtractor(ExtractorWrapper):
+    """Extractor wrapper that map-reduces long transcripts over segment windows."""
+
+    def __init__(
+        self,
+        extractor: Any,
+        window_size: int,
+        overlap: int = 10,
+        concurrency: int = 4,
+        scalar_policy: str = SCALAR_LATEST,
+        registry: Optional[SchemaRegistry] = None,
+    ):
+        """Initialize the chunked extractor.
+
+        Args:
+            extractor: Wrapped extractor used for every window
+            window_size: Segments per window; shorter transcripts are extracted in one call
+            overlap: Segments shared by consecutive windows (keeps Q&A pairs intact)
+            concurrency: Maximum number of windows extracted at once
+            scalar_policy: How conflicting scalar values are reconciled
+            registry: Schema registry (decides array vs scalar fields)
+        """
+        super().__init__(extractor)
+        split_windows([], window_size, overlap)  # validate parameters early
+        self.window_size = window_size
+        self.overlap = overlap
+        self.concurrency = concurrency
+        self.scalar_policy = scalar_policy
+        self.registry = registry or get_schema_registry()
+
+    async def extract(self, transcript_input: TranscriptInput) -> Dict[str, Any]:
+        """Extract medical entities, splitting long transcripts into windows."""
+        segments = transcript_input.transcript
+        if transcript_input.incremental is not None or len(segments) <= self.window_size:
+            # Live updates carry one offset, context and previous document for the whole input
+            return await self.extractor.extract(transcript_input)
+
+        artifacts = self.registry.get(transcript_input.schema_version)
+        windows = split_windows(segments, self.window_size, self.overlap)
+        logger.info(
+            f"Chunked extraction: {len(segments)} segments in {len(windows)} windows "
+            f"(size {self.window_size}, overlap {self.overlap})"
+        )
+
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+
+        async def run(window: List[TranscriptSegment]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.extractor.extract(
+                    transcript_input.model_copy(update={"transcript": window})
+                )
+
+        tasks = [asyncio.create_task(run(window)) for _, window in windows]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        merged = merge_partial_results(
+            [(offset, result) for (offset, _), result in zip(windows, results)],
+            artifacts.document_schema,
+            self.scalar_policy,
+        )
+        truncated = [result for result in results if result.get("partial")]
+        if truncated:
+            missing = {name for result in truncated for name in result.get("missing_fields", [])}
+            merged["partial"] = True
+            merged["missing_fields"] = [
+                name for name in artifacts.document_schema.get("properties", {}) if name in missing
+            ]
+        return merged
@@ -0,0 +1,288 @@
+"""Per-provider circuit breakers and adaptive timeouts.
+
+Each provider extractor is wrapped in a CircuitBreakerExtractor. Calls time
+out after a multiple of the provider's observed latency percentile instead
+of the SDK default. After enough consecutive provider failures the circuit
+opens and calls fail fast with CircuitOpenError (HTTP 503) until a recovery
+period has passed; then a limited number of probe calls (half-open) decide
+whether the circuit closes again. While a circuit is open, a
+FallbackExtractor can route requests to another provider.
+
+States: closed -> open -> half_open -> closed | open
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+from backend.models.transcript import TranscriptInput
+from backend.services.extractor_wrapper import ExtractorWrapper, record_producer
+from backend.services.latency import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable (circuit open), retry in {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class ExtractionTimeoutError(TimeoutError):
+    """Raised when a provider call exceeds its adaptive timeout."""
+
+
+def counts_as_failure(exc: BaseException, extractor: Any = None) -> bool:
+    """Whether an exception says something about the provider's health.
+
+    Invalid model output (ValueError), cancellations and requests the provider
+    rejected as the caller's fault (4xx other than 408/409/429, classified by
+    the extractor that raised them) do not.
+    """
+    if isinstance(exc, (ValueError, asyncio.CancelledError, CircuitOpenError)):
+        return False
+    is_client_error = getattr(extractor, "is_client_error", None)
+    return not (is_client_error is not None and is_client_error(exc))
+
+
+class CircuitBreaker:
+    """Closed / open / half-open circuit breaker counting consecutive failures."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_seconds: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        """Initialize the breaker.
+
+        Args:
+            name: Provider name (for messages and /api/health)
+            failure_threshold: Consecutive failures that open the circuit
+            recovery_seconds: Time an open circuit waits before allowing probe calls
+            half_open_max_calls: Concurrent probe calls allowed while half-open
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Reserve a call, or raise CircuitOpenError if the circuit rejects it."""
+        with self._lock:
+            if self.state == STATE_OPEN:
+                remaining = self.opened_at + self.recovery_seconds - time.monotonic()
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self.state = STATE_HALF_OPEN
+                self._half_open_calls = 0
+                logger.info(f"Circuit for {self.name} half-open, probing")
+            if self.state == STATE_HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.recovery_seconds)
+                self._half_open_calls += 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != STATE_CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+            self.state = STATE_CLOSED
+            self.consecutive_failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == STATE_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != STATE_OPEN:
+                    self.times_opened += 1
+                    logger.warning(
+                        f"Circuit for {self.name} opened after {self.consecutive_failures} consecutive failures"
+                    )
+                self.state = STATE_OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Give back a half-open probe slot for a call that did not report health."""
+        with self._lock:
+            if self.state == STATE_HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        retry_after = None
+        if self.state == STATE_OPEN and self.opened_at is not None:
+            retry_after = round(max(0.0, self.opened_at + self.recovery_seconds - time.monotonic()), 1)
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "retry_after_seconds": retry_after,
+        }
+
+
+class AdaptiveTimeout:
+    """Timeout derived from the observed latency distribution."""
+
+    def __init__(
+        self,
+        percentile: float = 99.0,
+        multiplier: float = 2.0,
+        min_seconds: float = 30.0,
+        max_seconds: float = 600.0,
+        min_samples: int = 20,
+    ):
+        """Initialize the adaptive timeout.
+
+        Args:
+            percentile: Latency percentile the timeout is based on
+            multiplier: Timeout = percentile latency * multiplier
+            min_seconds: Lower bound of the timeout
+            max_seconds: Upper bound, also used until min_samples latencies are known
+            min_samples: Samples needed before the percentile is used
+        """
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.min_samples = min_samples
+        self.latency = LatencyWindow()
+
+    def record(self, seconds: float) -> None:
+        self.latency.record(seconds)
+
+    def current(self) -> float:
+        """Timeout in seconds for the next call."""
+        if len(self.latency) < self.min_samples:
+            return self.max_seconds
+        timeout = self.latency.percentile(self.percentile) * self.multiplier
+        return min(self.max_seconds, max(self.min_seconds, timeout))
+
+
+circuit_breakers: Dict[str, CircuitBreaker] = {}
+
+
+class CircuitBreakerExtractor(ExtractorWrapper):
+    """Provider extractor guarded by a circuit breaker and an adaptive timeout."""
+
+    def __init__(self, extractor: Any, breaker: CircuitBreaker, timeout: AdaptiveTimeout):
+        """Initialize the guarded extractor.
+
+        Args:
+            extractor: Provider extractor (OpenAIExtractor or GeminiExtractor)
+            breaker: Circuit breaker for this provider (registered for /api/health)
+            timeout: Adaptive timeout for this provider
+        """
+        super().__init__(extractor)
+        self.breaker = breaker
+        self.timeout = timeout
+        circuit_breakers[breaker.name] = breaker
+
+    def _record_outcome(self, exc: Optional[BaseException]) -> None:
+        if exc is None:
+            self.breaker.record_success()
+        elif counts_as_failure(exc, self.extractor):
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+
+    async def extract(self, transcript_input: TranscriptInput) -> Dict[str, Any]:
+        """Extract medical entities, failing fast while the circuit is open."""
+        self.breaker.before_call()
+        timeout = self.timeout.current()
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(self.extractor.extract(transcript_input), timeout)
+        except asyncio.TimeoutError:
+            self._record_outcome(TimeoutError())
+            logger.error(f"{self.provider} extraction timed out after {timeout:.1f}s")
+            raise ExtractionTimeoutError(f"{self.provider} did not answer within {timeout:.1f}s")
+        except BaseException as e:
+            self._record_outcome(e)
+            raise
+        self.timeout.record(time.perf_counter() - started)
+        self._record_outcome(None)
+        return result
+
+    async def extract_stream(self, transcript_input: TranscriptInput) -> AsyncIterator[str]:
+        """Stream the JSON answer; the adaptive timeout applies to the first chunk."""
+        self.breaker.before_call()
+        timeout = self.timeout.current()
+        stream = self.extractor.extract_stream(transcript_input).__aiter__()
+        try:
+            try:
+                first = await asyncio.wait_for(stream.__anext__(), timeout)
+            except asyncio.TimeoutError:
+                raise ExtractionTimeoutError(f"{self.provider} did not start answering within {timeout:.1f}s")
+            except StopAsyncIteration:
+                self._record_outcome(None)
+                return
+            yield first
+            async for chunk in stream:
+                yield chunk
+        except GeneratorExit:
+            self.breaker.release()
+            raise
+        except BaseException as e:
+            self._record_outcome(e)
+            raise
+        self._record_outcome(None)
+
+
+class FallbackExtractor(ExtractorWrapper):
+    """Routes requests to a fallback provider while the primary's circuit is open."""
+
+    def __init__(self, primary: Any, fallback: Any):
+        super().__init__(primary)
+        self.fallback = fallback
+
+    async def warmup(self, connections: int = 1) -> None:
+        await asyncio.gather(self.extractor.warmup(connections), self.fallback.warmup(connections))
+
+    async def aclose(self) -> None:
+        await asyncio.gather(self.extractor.aclose(), self.fallback.aclose())
+
+    async def extract(self, transcript_input: TranscriptInput) -> Dict[str, Any]:
+        try:
+            result = await self.extractor.extract(transcript_input)
+            producer = self.extractor
+        except CircuitOpenError as e:
+            logger.warning(f"{e}; falling back to {self.fallback.provider}")
+            result = await self.fallback.extract(transcript_input)
+            producer = self.fallback
+        record_producer(producer)
+        return result
+
+    async def extract_stream(self, transcript_input: TranscriptInput) -> AsyncIterator[str]:
+        stream = self.extractor.extract_stream(transcript_input).__aiter__()
+        try:
+            first = await stream.__anext__()
+        except StopAsyncIteration:
+            return
+        except CircuitOpenError as e:
+            logger.warning(f"{e}; falling back to {self.fallback.provider}")
+            async for chunk in self.fallback.extract_stream(transcript_input):
+                yield chunk
+            return
+        yield first
+        async for chunk in stream:
+            yield chunk
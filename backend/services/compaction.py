@@ -0,0 +1,237 @@
+"""Transcript compaction before prompting.
+
+Real consultations contain many segments that cost prompt tokens without
+clinical content. Before the user prompt is built:
+
+- ASR duplicates are removed: a segment repeating the previous one is
+  dropped, and words repeating the end of the previous segment ("... skauda
+  gerklę" / "skauda gerklę ir galvą") are cut from the start of the next.
+- Filler utterances ("Mhm.", "Ačiū.", "Gerai, ačiū.") are dropped, unless
+  they answer a question of the other speaker ("Ir nieko daugiau?" - "Mhm.").
+- Adjacent segments of the same speaker are merged (up to a length limit).
+
+A ``CompactTranscript`` keeps, for every compact segment, the original
+indices it covers, and translates the model's source_segments back. For a
+merged segment only the original fragments that match the referenced value
+are cited (all of them if none matches).
+"""
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from backend.models.transcript import TranscriptInput, TranscriptSegment
+from backend.services.document_merge import normalize_text
+from backend.services.extractor_wrapper import ExtractorWrapper
+from backend.services.reference_alignment import ReferenceAligner
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FILLERS = (
+    "mhm", "aha", "aaa", "mm", "hmm", "nu", "ačiū", "labai ačiū", "ačiū labai", "gerai", "puiku",
+    "supratau", "tvarkoj", "prašom", "prašau", "laba diena", "labas", "sveiki", "viso gero", "iki",
+)
+MIN_OVERLAP_WORDS = 3  # Shorter repeats at a segment boundary are left alone (they may be real)
+
+
+@dataclass
+class CompactTranscript:
+    """Compacted segments with the original indices behind each of them."""
+
+    segments: List[TranscriptSegment]
+    index_map: List[Tuple[int, ...]]  # compact index -> original local indices
+    original: Sequence[TranscriptSegment]
+    dropped: List[int] = field(default_factory=list)  # filler segments left out of the prompt
+
+    @property
+    def changed(self) -> bool:
+        return len(self.segments) != len(self.original) or any(
+            a.text != b.text for a, b in zip(self.segments, self.original)
+        )
+
+    def original_indices(self, compact_indices: Iterable[int], value: str = "") -> List[int]:
+        """Original indices of compact segment indices.
+
+        Args:
+            compact_indices: Indices into the compact transcript
+            value: The referenced value; selects the matching fragments of merged segments
+        """
+        result = set()
+        for index in compact_indices:
+            if not isinstance(index, int) or not 0 <= index < len(self.index_map):
+                continue
+            group = self.index_map[index]
+            if len(group) > 1 and value:
+                aligned = ReferenceAligner([self.original[i] for i in group]).align([value])[0]
+                if aligned:
+                    group = tuple(group[i] for i in aligned)
+            result.update(group)
+        return sorted(result)
+
+    def remap_references(self, references: Optional[List[Any]]) -> List[Any]:
+        """Translate the source_segments of references entries back to original indices."""
+        remapped = []
+        for ref in references or []:
+            if isinstance(ref, dict) and isinstance(ref.get("source_segments"), list):
+                ref = dict(ref)
+                ref["source_segments"] = self.original_indices(ref["source_segments"], str(ref.get("value") or ""))
+            remapped.append(ref)
+        return remapped
+
+
+def _is_filler(text: str, filler_words: frozenset, filler_phrases: frozenset) -> bool:
+    normalized = normalize_text(text)
+    if not normalized:
+        return True
+    return normalized in filler_phrases or all(word in filler_words for word in normalized.split())
+
+
+def _overlap_words(previous: str, current: str) -> int:
+    """Number of leading words of ``current`` that repeat the end of ``previous``."""
+    previous_words = [normalize_text(w) for w in previous.split()]
+    current_words = [normalize_text(w) for w in current.split()]
+    for k in range(min(len(previous_words), len(current_words)), MIN_OVERLAP_WORDS - 1, -1):
+        if previous_words[-k:] == current_words[:k]:
+            return k
+    return 0
+
+
+def compact_transcript(
+    segments: Sequence[TranscriptSegment],
+    fillers: Iterable[str] = DEFAULT_FILLERS,
+    merge_max_chars: int = 400,
+) -> CompactTranscript:
+    """Compact a transcript.
+
+    Args:
+        segments: Original transcript segments
+        fillers: Filler words and phrases (matched on the normalized utterance)
+        merge_max_chars: Longest merged same-speaker segment (0 disables merging)
+    """
+    fillers = [normalize_text(f) for f in fillers]
+    filler_words = frozenset(f for f in fillers if " " not in f)
+    filler_phrases = frozenset(fillers)
+
+    texts: List[str] = []
+    groups: List[List[int]] = []
+    speakers: List[str] = []
+    times: List[str] = []
+    dropped: List[int] = []
+    previous: Optional[TranscriptSegment] = None
+    for index, segment in enumerate(segments):
+        text = segment.text.strip()
+        answers_question = previous is not None and previous.speaker != segment.speaker and "?" in previous.text
+        previous_kept = bool(groups) and groups[-1][-1] == index - 1
+        if previous_kept:
+            overlap = _overlap_words(previous.text, text)
+            if overlap:
+                text = " ".join(text.split()[overlap:])
+            if not text or normalize_text(text) == normalize_text(previous.text):
+                groups[-1].append(index)  # ASR repeat of (the end of) the previous segment
+                previous = segment
+                continue
+        previous = segment
+        if not answers_question and _is_filler(text, filler_words, filler_phrases):
+            dropped.append(index)
+            continue
+        if (
+            merge_max_chars > 0
+            and speakers
+            and speakers[-1] == segment.speaker
+            and len(texts[-1]) + 1 + len(text) <= merge_max_chars
+        ):
+            texts[-1] = f"{texts[-1]} {text}"
+            groups[-1].append(index)
+            continue
+        texts.append(text)
+        groups.append([index])
+        speakers.append(segment.speaker)
+        times.append(segment.time)
+
+    compact = [
+        TranscriptSegment(time=time_, speaker=speaker, text=text)
+        for time_, speaker, text in zip(times, speakers, texts)
+    ]
+    return CompactTranscript(compact, [tuple(g) for g in groups], segments, dropped)
+
+
+class CompactionStats:
+    """Segments and characters before/after compaction for /api/compaction/stats."""
+
+    def __init__(self):
+        self.transcripts = 0
+        self.segments_in = 0
+        self.segments_out = 0
+        self.chars_in = 0
+        self.chars_out = 0
+        self.fillers_dropped = 0
+        self._lock = threading.Lock()
+
+    def record(self, compact: CompactTranscript) -> None:
+        with self._lock:
+            self.transcripts += 1
+            self.segments_in += len(compact.original)
+            self.segments_out += len(compact.segments)
+            self.chars_in += sum(len(s.text) for s in compact.original)
+            self.chars_out += sum(len(s.text) for s in compact.segments)
+            self.fillers_dropped += len(compact.dropped)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "transcripts": self.transcripts,
+            "segments_in": self.segments_in,
+            "segments_out": self.segments_out,
+            "fillers_dropped": self.fillers_dropped,
+            "chars_in": self.chars_in,
+            "chars_out": self.chars_out,
+            "segment_reduction": round(1 - self.segments_out / self.segments_in, 4) if self.segments_in else 0.0,
+        }
+
+
+compaction_stats = CompactionStats()
+
+
+class CompactingExtractor(ExtractorWrapper):
+    """Sends a compacted transcript to the model and maps references back.
+
+    Incremental (live) requests and streaming extractions pass through
+    unchanged: their segment numbering is fixed by the client.
+    """
+
+    def __init__(
+        self,
+        extractor: Any,
+        fillers: Iterable[str] = DEFAULT_FILLERS,
+        merge_max_chars: int = 400,
+        stats: Optional[CompactionStats] = None,
+    ):
+        """Initialize the compaction stage.
+
+        Args:
+            extractor: Extractor receiving the compacted transcript
+            fillers: Filler words and phrases to drop
+            merge_max_chars: Longest merged same-speaker segment (0 disables merging)
+            stats: Counters (defaults to the process-wide compaction_stats)
+        """
+        super().__init__(extractor)
+        self.fillers = tuple(fillers)
+        self.merge_max_chars = merge_max_chars
+        self.stats = stats or compaction_stats
+
+    async def extract(self, transcript_input: TranscriptInput) -> Dict[str, Any]:
+        """Extract medical entities from the compacted transcript."""
+        if transcript_input.incremental is not None:
+            return await self.extractor.extract(transcript_input)
+        compact = compact_transcript(transcript_input.transcript, self.fillers, self.merge_max_chars)
+        self.stats.record(compact)
+        if not compact.changed:
+            return await self.extractor.extract(transcript_input)
+
+        logger.info(
+            f"Compacted transcript: {len(compact.original)} -> {len(compact.segments)} segments "
+            f"({len(compact.dropped)} fillers dropped)"
+        )
+        result = await self.extractor.extract(transcript_input.model_copy(update={"transcript": compact.segments}))
+        result["references"] = compact.remap_references(result.get("references"))
+        return result
@@ -0,0 +1,241 @@
+"""Merging of partial flat E025 extraction results.
+
+Used to reduce the results of overlapping transcript windows into one
+document. Policy:
+- source_segments of every window are rebased to global transcript indices
+- array (statement) fields are concatenated in transcript order; a statement
+  is dropped as a duplicate when its normalized text equals an earlier one, or
+  when it is near-identical (token Jaccard >= DUPLICATE_SIMILARITY) and cites
+  overlapping segments. Duplicates contribute their segments to the survivor.
+- conflicting scalar fields (systolic_bp, temperature, ...) are reconciled
+  with a ScalarPolicy; only the chosen value keeps its reference.
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_SIMILARITY = 0.8
+
+# Scalar conflict policies
+SCALAR_LATEST = "latest"  # value mentioned last in the transcript wins
+SCALAR_EARLIEST = "earliest"  # value mentioned first wins
+SCALAR_MOST_REFERENCED = "most_referenced"  # value found by most windows wins (ties: latest)
+SCALAR_POLICIES = (SCALAR_LATEST, SCALAR_EARLIEST, SCALAR_MOST_REFERENCED)
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]", re.UNICODE)
+
+
+def normalize_text(value: str) -> str:
+    """Casefold, strip punctuation and collapse whitespace."""
+    return " ".join(_PUNCTUATION_RE.sub(" ", value.casefold()).split())
+
+
+def item_value(item: Any) -> str:
+    """The reference value of an array item (statement, allergy, vaccination, ...)."""
+    if isinstance(item, dict):
+        for key in ("statement", "description", "name"):
+            if isinstance(item.get(key), str):
+                return item[key]
+        return " ".join(str(v) for v in item.values() if v is not None)
+    return str(item)
+
+
+def is_array_field(prop_schema: Dict[str, Any]) -> bool:
+    """Whether a document property is an array (statement list) field."""
+    prop_type = prop_schema.get("type")
+    if isinstance(prop_type, list):
+        return "array" in prop_type
+    return prop_type == "array"
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def rebase_references(references: List[Dict[str, Any]], offset: int) -> List[Dict[str, Any]]:
+    """Shift window-local source_segments to global transcript indices."""
+    rebased = []
+    for ref in references or []:
+        if not isinstance(ref, dict):
+            continue
+        segments = [offset + i for i in ref.get("source_segments") or [] if isinstance(i, int)]
+        rebased.append({
+            "field_name": str(ref.get("field_name", "")),
+            "value": str(ref.get("value", "")),
+            "source_segments": segments,
+        })
+    return rebased
+
+
+@dataclass
+class _Part:
+    """One partial result with global references indexed by (field, normalized value)."""
+
+    position: int
+    document: Dict[str, Any]
+    references: List[Dict[str, Any]]
+    lookup: Dict[Tuple[str, str], List[int]] = field(default_factory=dict)
+    used: Set[int] = field(default_factory=set)
+
+    def __post_init__(self):
+        for i, ref in enumerate(self.references):
+            self.lookup.setdefault((ref["field_name"], normalize_text(ref["value"])), []).append(i)
+
+    def take_segments(self, field_name: str, value: str) -> Set[int]:
+        segments: Set[int] = set()
+        for i in self.lookup.get((field_name, normalize_text(value)), []):
+            self.used.add(i)
+            segments.update(self.references[i]["source_segments"])
+        return segments
+
+
+@dataclass
+class _KeptItem:
+    item: Any
+    norm: str
+    tokens: Set[str]
+    segments: Set[int]
+
+
+def _merge_array(field_name: str, parts: List[_Part]) -> Tuple[Optional[list], List[_KeptItem]]:
+    kept: List[_KeptItem] = []
+    seen_list = False
+    for part in parts:
+        items = part.document.get(field_name)
+        if items is None:
+            continue
+        seen_list = True
+        for item in items:
+            value = item_value(item)
+            norm = normalize_text(value)
+            tokens = set(norm.split())
+            segments = part.take_segments(field_name, value)
+            duplicate = next(
+                (
+                    k for k in kept
+                    if k.norm == norm
+                    or (k.segments & segments and _jaccard(k.tokens, tokens) >= DUPLICATE_SIMILARITY)
+                ),
+                None,
+            )
+            if duplicate is not None:
+                duplicate.segments |= segments
+                continue
+            kept.append(_KeptItem(item=item, norm=norm, tokens=tokens, segments=segments))
+    if not seen_list:
+        return None, []
+    return [k.item for k in kept], kept
+
+
+def _merge_scalar(
+    field_name: str, parts: List[_Part], policy: str
+) -> Tuple[Any, Set[int]]:
+    groups: Dict[str, Dict[str, Any]] = {}
+    for part in parts:
+        value = part.document.get(field_name)
+        if value is None:
+            continue
+        norm = normalize_text(str(value))
+        segments = part.take_segments(field_name, str(value))
+        group = groups.setdefault(norm, {"value": value, "segments": set(), "parts": 0, "first": None, "last": None})
+        group["segments"] |= segments
+        group["parts"] += 1
+        first = min(segments) if segments else part.position
+        last = max(segments) if segments else part.position
+        group["first"] = first if group["first"] is None else min(group["first"], first)
+        group["last"] = last if group["last"] is None else max(group["last"], last)
+
+    if not groups:
+        return None, set()
+
+    candidates = list(groups.values())
+    if policy == SCALAR_EARLIEST:
+        chosen = min(candidates, key=lambda g: g["first"])
+    elif policy == SCALAR_MOST_REFERENCED:
+        chosen = max(candidates, key=lambda g: (g["parts"], len(g["segments"]), g["last"]))
+    else:
+        chosen = max(candidates, key=lambda g: g["last"])
+
+    if len(candidates) > 1:
+        values = [g["value"] for g in candidates]
+        logger.warning(f"Conflicting values for '{field_name}': {values}; kept {chosen['value']!r} ({policy})")
+    return chosen["value"], chosen["segments"]
+
+
+def merge_partial_results(
+    parts: List[Tuple[int, Dict[str, Any]]],
+    document_schema: Dict[str, Any],
+    scalar_policy: str = SCALAR_LATEST,
+) -> Dict[str, Any]:
+    """Merge partial extraction results into a single result.
+
+    Args:
+        parts: (segment offset, raw result dict) per partial result, in transcript order.
+            The offset is added to every source_segments index of that result.
+        document_schema: Flat document schema (decides array vs scalar fields)
+        scalar_policy: One of SCALAR_POLICIES
+
+    Returns:
+        Raw dict with 'document' and 'references' keys
+    """
+    if scalar_policy not in SCALAR_POLICIES:
+        raise ValueError(f"Unknown scalar merge policy: {scalar_policy}")
+
+    prepared = [
+        _Part(
+            position=offset,
+            document=(result or {}).get("document") or {},
+            references=rebase_references((result or {}).get("references") or [], offset),
+        )
+        for offset, result in parts
+    ]
+
+    properties = document_schema.get("properties", {})
+    field_names = list(properties.keys())
+    for part in prepared:
+        field_names.extend(k for k in part.document.keys() if k not in field_names)
+
+    document: Dict[str, Any] = {}
+    references: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def add_reference(field_name: str, value: str, segments: Set[int]) -> None:
+        key = (field_name, normalize_text(value))
+        ref = references.get(key)
+        if ref is None:
+            references[key] = {"field_name": field_name, "value": value, "source_segments": sorted(segments)}
+        else:
+            ref["source_segments"] = sorted(set(ref["source_segments"]) | segments)
+
+    scalar_fields = set()
+    for field_name in field_names:
+        prop_schema = properties.get(field_name)
+        is_array = is_array_field(prop_schema) if prop_schema else any(
+            isinstance(p.document.get(field_name), list) for p in prepared
+        )
+        if is_array:
+            items, kept = _merge_array(field_name, prepared)
+            document[field_name] = items
+            for k in kept:
+                if k.segments:
+                    add_reference(field_name, item_value(k.item), k.segments)
+        else:
+            scalar_fields.add(field_name)
+            value, segments = _merge_scalar(field_name, prepared, scalar_policy)
+            document[field_name] = value
+            if value is not None and segments:
+                add_reference(field_name, str(value), segments)
+
+    # References that did not match any document value are kept (rebased, deduplicated)
+    for part in prepared:
+        for i, ref in enumerate(part.references):
+            if i in part.used or ref["field_name"] in scalar_fields:
+                continue
+            add_reference(ref["field_name"], ref["value"], set(ref["source_segments"]))
+
+    return {"document": document, "references": list(references.values())}
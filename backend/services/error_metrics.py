@@ -0,0 +1,55 @@
+"""Counting failed extractions for the ``extraction_errors_total`` metric.
+
+``ErrorCountingExtractor`` is always the outermost extractor wrapper, so
+every failure reaching the caller is counted once by its type, whichever
+layer raised it: provider errors after retries, an open circuit, adaptive
+timeouts, both hedged calls failing, chunk merge errors or invalid output
+(also of a streamed answer, parsed by ``finish_stream``).
+"""
+
+from typing import Any, AsyncIterator, Dict, Optional
+
+from backend.models.transcript import TranscriptInput
+from backend.schemas.registry import SchemaRegistry, get_schema_registry
+from backend.services import metrics
+from backend.services.extractor_wrapper import ExtractorWrapper
+
+
+class ErrorCountingExtractor(ExtractorWrapper):
+    """Extractor wrapper counting the extractions that fail."""
+
+    def __init__(self, extractor: Any, registry: Optional[SchemaRegistry] = None):
+        """Initialize the error counter.
+
+        Args:
+            extractor: Wrapped extractor
+            registry: Schema registry (resolves the default schema version)
+        """
+        super().__init__(extractor)
+        self.registry = registry or get_schema_registry()
+
+    async def extract(self, transcript_input: TranscriptInput) -> Dict[str, Any]:
+        try:
+            return await self.extractor.extract(transcript_input)
+        except Exception as e:
+            self._count(transcript_input, e)
+            raise
+
+    async def extract_stream(self, transcript_input: TranscriptInput) -> AsyncIterator[str]:
+        try:
+            async for chunk in self.extractor.extract_stream(transcript_input):
+                yield chunk
+        except Exception as e:
+            self._count(transcript_input, e)
+            raise
+
+    async def finish_stream(self, transcript_input: TranscriptInput, response_text: str) -> Dict[str, Any]:
+        try:
+            return await self.extractor.finish_stream(transcript_input, response_text)
+        except Exception as e:
+            self._count(transcript_input, e)
+            raise
+
+    def _count(self, transcript_input: TranscriptInput, exc: Exception) -> None:
+        version = transcript_input.schema_version or self.registry.default_version
+        metrics.count_error(exc, self.provider, self.model_name, version)
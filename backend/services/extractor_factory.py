@@ -0,0 +1,284 @@
+"""Construction of application-lifetime extractors.
+
+Extractors are built once (FastAPI lifespan, Streamlit ``st.cache_resource``)
+and shared across requests, so every extraction reuses the same keep-alive
+HTTP connection pool instead of paying fresh TLS handshakes.
+"""
+
+import logging
+from typing import Any, Dict, Optional, Union
+
+import httpx
+import openai
+from openai import DefaultAsyncHttpxClient
+
+from backend.config import Settings
+from backend.services.chunking import ChunkedExtractor
+from backend.services.circuit_breaker import (
+    AdaptiveTimeout,
+    CircuitBreaker,
+    CircuitBreakerExtractor,
+    FallbackExtractor,
+)
+from backend.services.compaction import CompactingExtractor
+from backend.services.error_metrics import ErrorCountingExtractor
+from backend.services.gemini_extractor import GeminiExtractor
+from backend.services.hedging import HedgedExtractor
+from backend.services.mock_extractor import MODE_RECORD, Cassette, MockExtractor
+from backend.services.openai_extractor import OpenAIExtractor
+from backend.services.rate_limit import AdaptiveConcurrencyLimit, ProviderRateLimiter, rate_limiters
+from backend.services.result_cache import CachedExtractor, get_result_cache
+from backend.services.retry import RetryPolicy, retry_rate_limiter
+from backend.services.usage_ledger import LedgerExtractor, get_usage_ledger
+from backend.services.vitals import MODE_OFF, VitalsPreExtractor
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderNotConfiguredError(RuntimeError):
+    """Raised when the selected LLM provider has no API key configured."""
+
+
+def _pool_limits(settings: Settings, limits_cls: type = httpx.Limits) -> Any:
+    return limits_cls(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry,
+    )
+
+
+def _pool_timeout(settings: Settings, timeout_cls: type = httpx.Timeout) -> Any:
+    return timeout_cls(settings.http_timeout_seconds, connect=settings.http_connect_timeout_seconds)
+
+
+def _retry_policy(settings: Settings) -> RetryPolicy:
+    # All providers share the process-wide retry-rate cap
+    retry_rate_limiter.ratio = settings.retry_rate_ratio
+    retry_rate_limiter.min_per_second = settings.retry_min_per_second
+    return RetryPolicy(
+        max_attempts=settings.retry_max_attempts,
+        base_delay_seconds=settings.retry_base_delay_seconds,
+        max_delay_seconds=settings.retry_max_delay_seconds,
+        budget_seconds=settings.retry_budget_seconds,
+        limiter=retry_rate_limiter,
+    )
+
+
+def _rate_limiter(settings: Settings, provider: str) -> Optional[ProviderRateLimiter]:
+    if not settings.rate_limit_enabled:
+        return None
+    limiter = ProviderRateLimiter(
+        provider,
+        requests_per_minute=getattr(settings, f"{provider}_rpm"),
+        tokens_per_minute=getattr(settings, f"{provider}_tpm"),
+        expected_output_tokens=settings.rate_limit_expected_output_tokens,
+        concurrency=AdaptiveConcurrencyLimit(
+            initial=settings.concurrency_initial,
+            min_limit=settings.concurrency_min,
+            max_limit=settings.concurrency_max,
+            backoff_factor=settings.concurrency_backoff_factor,
+            latency_spike_ratio=settings.concurrency_latency_spike_ratio,
+            latency_spike_count=settings.concurrency_latency_spike_count,
+        ),
+    )
+    rate_limiters[provider] = limiter
+    return limiter
+
+
+def build_provider_extractor(
+    settings: Settings, provider: str
+) -> Union[OpenAIExtractor, GeminiExtractor, MockExtractor]:
+    """Build a provider extractor with its own tuned keep-alive connection pool,
+    retry policy and outbound rate limiter.
+
+    Args:
+        settings: Application settings
+        provider: "openai", "gemini" or "mock"
+
+    Raises:
+        ProviderNotConfiguredError: If the provider's API key is missing
+    """
+    if provider == "mock":
+        return build_mock_extractor(settings)
+    if provider == "openai":
+        if not settings.openai_api_key:
+            raise ProviderNotConfiguredError("OPENAI_API_KEY not configured")
+        # The OpenAI SDK may bundle its own httpx flavour: build the pool with its types
+        http_client = DefaultAsyncHttpxClient(
+            limits=_pool_limits(settings, type(openai.DEFAULT_CONNECTION_LIMITS)),
+            timeout=_pool_timeout(settings, openai.Timeout),
+        )
+        return OpenAIExtractor(
+            api_key=settings.openai_api_key,
+            model_name=settings.openai_model,
+            http_client=http_client,
+            base_url=settings.openai_base_url,
+            use_prompt_cache_key=settings.openai_prompt_cache_key,
+            retry_policy=_retry_policy(settings),
+            rate_limiter=_rate_limiter(settings, provider),
+            repair_json=settings.json_repair_enabled,
+            continue_truncated=settings.json_repair_continuation,
+        )
+    else:
+        if not settings.google_api_key:
+            raise ProviderNotConfiguredError("GOOGLE_API_KEY not configured")
+        http_client = httpx.AsyncClient(
+            limits=_pool_limits(settings),
+            timeout=_pool_timeout(settings),
+        )
+        return GeminiExtractor(
+            api_key=settings.google_api_key,
+            model_name=settings.gemini_model,
+            http_client=http_client,
+            use_response_schema=settings.gemini_response_schema,
+            base_url=settings.gemini_base_url,
+            use_context_cache=settings.gemini_context_cache,
+            context_cache_ttl_seconds=settings.gemini_context_cache_ttl_seconds,
+            retry_policy=_retry_policy(settings),
+            rate_limiter=_rate_limiter(settings, provider),
+            repair_json=settings.json_repair_enabled,
+            continue_truncated=settings.json_repair_continuation,
+        )
+
+
+def build_mock_extractor(settings: Settings) -> MockExtractor:
+    """Build the mock provider; in record mode it wraps MOCK_RECORD_PROVIDER.
+
+    Raises:
+        ProviderNotConfiguredError: If record mode's provider has no API key
+        ValueError: If a mock setting is invalid
+    """
+    upstream = None
+    if settings.mock_mode == MODE_RECORD:
+        if settings.mock_record_provider == "mock":
+            raise ValueError("MOCK_RECORD_PROVIDER must be a real provider")
+        upstream = build_provider_extractor(settings, settings.mock_record_provider)
+    return MockExtractor(
+        Cassette(settings.mock_cassette_path),
+        mode=settings.mock_mode,
+        upstream=upstream,
+        time_to_first_token=settings.mock_time_to_first_token,
+        tokens_per_second=settings.mock_tokens_per_second,
+        error_rate=settings.mock_error_rate,
+        rate_limit_rate=settings.mock_rate_limit_rate,
+        retry_after_seconds=settings.mock_retry_after_seconds,
+        miss_policy=settings.mock_replay_miss,
+        seed=settings.mock_seed,
+        retry_policy=_retry_policy(settings),
+        # Record mode: the upstream provider's limits apply
+        rate_limiter=upstream.rate_limiter if upstream is not None else _rate_limiter(settings, "mock"),
+        repair_json=settings.json_repair_enabled,
+        continue_truncated=settings.json_repair_continuation,
+    )
+
+
+def build_guarded_extractor(settings: Settings, provider: str) -> Any:
+    """Build a provider extractor behind its circuit breaker and adaptive timeout (if enabled)."""
+    extractor = build_provider_extractor(settings, provider)
+    if not settings.circuit_breaker_enabled:
+        return extractor
+    return CircuitBreakerExtractor(
+        extractor,
+        CircuitBreaker(
+            extractor.provider,
+            failure_threshold=settings.breaker_failure_threshold,
+            recovery_seconds=settings.breaker_recovery_seconds,
+            half_open_max_calls=settings.breaker_half_open_max_calls,
+        ),
+        AdaptiveTimeout(
+            percentile=settings.adaptive_timeout_percentile,
+            multiplier=settings.adaptive_timeout_multiplier,
+            min_seconds=settings.adaptive_timeout_min_seconds,
+            max_seconds=settings.http_timeout_seconds,
+            min_samples=settings.adaptive_timeout_min_samples,
+        ),
+    )
+
+
+def secondary_provider(settings: Settings) -> str:
+    """Provider used for hedging (the other provider unless configured)."""
+    if settings.hedge_secondary_provider:
+        return settings.hedge_secondary_provider
+    return "gemini" if settings.llm_provider == "openai" else "openai"
+
+
+def build_extractor(settings: Settings) -> Any:
+    """Build the shared extractor for the configured LLM_PROVIDER.
+
+    Returns the provider extractor behind its circuit breaker, hedged with
+    the secondary provider or backed by a fallback provider, wrapped in
+    transcript compaction, chunked extraction, vital-sign pre-extraction,
+    the result cache and the usage ledger when enabled. Failed extractions
+    are counted (extraction_errors_total) around the whole chain.
+    """
+    extractor = build_guarded_extractor(settings, settings.llm_provider)
+    logger.info(f"Created shared {extractor.provider} extractor ({extractor.model_name})")
+
+    if settings.hedging_enabled:
+        try:
+            secondary = build_guarded_extractor(settings, secondary_provider(settings))
+        except ProviderNotConfiguredError as e:
+            logger.warning(f"Hedging disabled: {e}")
+        else:
+            logger.info(f"Hedging {extractor.provider} with {secondary.provider} ({secondary.model_name})")
+            extractor = HedgedExtractor(
+                extractor,
+                secondary,
+                percentile=settings.hedge_percentile,
+                min_delay_seconds=settings.hedge_min_delay_seconds,
+                max_delay_seconds=settings.hedge_max_delay_seconds,
+                initial_delay_seconds=settings.hedge_initial_delay_seconds,
+                min_samples=settings.hedge_min_samples,
+            )
+    elif settings.fallback_provider and settings.fallback_provider != settings.llm_provider:
+        try:
+            fallback = build_guarded_extractor(settings, settings.fallback_provider)
+        except ProviderNotConfiguredError as e:
+            logger.warning(f"Fallback provider disabled: {e}")
+        else:
+            logger.info(f"Falling back to {fallback.provider} while {extractor.provider} is unavailable")
+            extractor = FallbackExtractor(extractor, fallback)
+
+    # Settings of the layers below the result cache that change the result (part of the cache key)
+    pipeline: Dict[str, Any] = {}
+
+    if settings.compaction_enabled:
+        pipeline["compaction"] = {
+            "fillers": settings.compaction_fillers,
+            "merge_max_chars": settings.compaction_merge_max_chars,
+        }
+        extractor = CompactingExtractor(
+            extractor,
+            fillers=settings.compaction_fillers,
+            merge_max_chars=settings.compaction_merge_max_chars,
+        )
+
+    if settings.chunk_window_segments > 0:
+        pipeline["chunking"] = {
+            "window_size": settings.chunk_window_segments,
+            "overlap": settings.chunk_overlap_segments,
+            "scalar_policy": settings.chunk_scalar_policy,
+        }
+        extractor = ChunkedExtractor(
+            extractor,
+            window_size=settings.chunk_window_segments,
+            overlap=settings.chunk_overlap_segments,
+            concurrency=settings.chunk_concurrency,
+            scalar_policy=settings.chunk_scalar_policy,
+        )
+
+    if settings.vitals_preextract != MODE_OFF:
+        # Outside chunking: the whole transcript is scanned once, every window
+        # is sent with the same (static) schema variant
+        pipeline["vitals_preextract"] = settings.vitals_preextract
+        extractor = VitalsPreExtractor(extractor, mode=settings.vitals_preextract)
+
+    if settings.cache_enabled:
+        extractor = CachedExtractor(extractor, get_result_cache(), pipeline=pipeline)
+
+    if settings.ledger_db_path:
+        # Outside the cache: result cache hits are recorded too (without LLM calls)
+        extractor = LedgerExtractor(extractor, get_usage_ledger(), prices=settings.ledger_prices)
+
+    # Outermost: each failed extraction is counted once, whichever layer raised
+    return ErrorCountingExtractor(extractor)
@@ -0,0 +1,67 @@
+"""Base class for extractors that wrap another extractor."""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Iterator, Set, Tuple
+
+from backend.models.transcript import TranscriptInput
+
+_producers: ContextVar[Tuple[Set[Tuple[str, str]], ...]] = ContextVar("extraction_producers", default=())
+
+
+def record_producer(extractor: Any) -> None:
+    """Record the extractor whose answer is returned where a wrapper chooses between providers."""
+    for producers in _producers.get():
+        producers.add((extractor.provider, extractor.model_name))
+
+
+@contextmanager
+def collect_producers() -> Iterator[Set[Tuple[str, str]]]:
+    """Collect the (provider, model) pairs recorded inside the block (including child tasks).
+
+    Empty unless a hedge or a fallback chose the provider; collectors nest.
+    """
+    producers: Set[Tuple[str, str]] = set()
+    token = _producers.set(_producers.get() + (producers,))
+    try:
+        yield producers
+    finally:
+        _producers.reset(token)
+
+
+class ExtractorWrapper:
+    """Delegates the extractor interface to a wrapped extractor.
+
+    Subclasses override ``extract`` (and anything else they change); provider
+    identity and connection lifecycle pass through to the wrapped extractor.
+    ``finish_stream`` turns the text of a finished ``extract_stream`` into the
+    result ``extract`` would return, so every layer post-processing results
+    overrides it too.
+    """
+
+    def __init__(self, extractor: Any):
+        self.extractor = extractor
+
+    @property
+    def provider(self) -> str:
+        return self.extractor.provider
+
+    @property
+    def model_name(self) -> str:
+        return self.extractor.model_name
+
+    async def warmup(self, connections: int = 1) -> None:
+        await self.extractor.warmup(connections)
+
+    async def aclose(self) -> None:
+        await self.extractor.aclose()
+
+    async def extract(self, transcript_input: TranscriptInput) -> Dict[str, Any]:
+        return await self.extractor.extract(transcript_input)
+
+    async def extract_stream(self, transcript_input: TranscriptInput) -> AsyncIterator[str]:
+        async for chunk in self.extractor.extract_stream(transcript_input):
+            yield chunk
+
+    async def finish_stream(self, transcript_input: TranscriptInput, response_text: str) -> Dict[str, Any]:
+        return await self.extractor.finish_stream(transcript_input, response_text)
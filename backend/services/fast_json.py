@@ -0,0 +1,56 @@
+"""Fast JSON parsing and rendering.
+
+Uses orjson when it is installed and falls back to the standard library
+otherwise. Output is compact UTF-8 without ASCII escaping, so Lithuanian
+text is sent as-is instead of as ``\\uXXXX`` sequences.
+
+``FastJSONResponse`` renders a result straight to bytes, skipping FastAPI's
+``jsonable_encoder`` walk and the str -> bytes re-encoding of JSONResponse.
+"""
+
+import json
+from typing import Any, Union
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+# Raised by loads() for invalid input (orjson.JSONDecodeError subclasses it)
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    """Parse JSON text or UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes (no ASCII escaping)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_str(obj: Any) -> str:
+    """Serialize to compact JSON text (no ASCII escaping)."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered with dumps(); bytes content is sent unchanged."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return dumps(content)
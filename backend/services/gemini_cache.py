@@ -0,0 +1,131 @@
+"""Explicit Gemini context caches for the static system prompt.
+
+One cached content per schema version (keyed by the version fingerprint) holds
+the rendered system prompt. Requests reference it with ``cached_content``
+instead of resending the system instruction, so its tokens are billed at the
+cached rate and do not have to be re-processed before the first output token.
+Caches are extended shortly before their TTL runs out and recreated if they
+disappeared; if creation fails (e.g. prompt below the model's minimum cache
+size) requests fall back to the plain system instruction for a while.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _CacheEntry:
+    name: str
+    expires_at: float  # time.monotonic()
+
+
+class GeminiContextCache:
+    """Creates and refreshes one Gemini cached content per schema version."""
+
+    def __init__(
+        self,
+        client: Any,
+        model_name: str,
+        ttl_seconds: int = 3600,
+        refresh_margin_seconds: int = 300,
+        retry_after_seconds: int = 300,
+    ):
+        """Initialize the cache manager.
+
+        Args:
+            client: google.genai Client
+            model_name: Model the cached content is created for
+            ttl_seconds: TTL of each cached content
+            refresh_margin_seconds: Extend the TTL once less than this remains
+            retry_after_seconds: Wait before retrying after a failed creation
+        """
+        self.client = client
+        self.model_name = model_name
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = min(refresh_margin_seconds, ttl_seconds // 2)
+        self.retry_after_seconds = retry_after_seconds
+        self._entries: Dict[str, _CacheEntry] = {}
+        self._failed_until: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _fresh(self, entry: Optional[_CacheEntry], now: float) -> bool:
+        return entry is not None and entry.expires_at - now > self.refresh_margin_seconds
+
+    async def get(self, artifacts: Any) -> Optional[str]:
+        """Return the cached content name for a schema version, or None to send the prompt inline.
+
+        Args:
+            artifacts: SchemaArtifacts of the request's schema version
+        """
+        key = artifacts.fingerprint
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if self._fresh(entry, now):
+            return entry.name
+        if self._failed_until.get(key, 0.0) > now:
+            return None
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(key)
+            if self._fresh(entry, time.monotonic()):
+                return entry.name
+            name = await self._refresh(artifacts, entry)
+            if name is None:
+                self._entries.pop(key, None)
+                self._failed_until[key] = time.monotonic() + self.retry_after_seconds
+                return None
+            self._entries[key] = _CacheEntry(name, time.monotonic() + self.ttl_seconds)
+            return name
+
+    async def _refresh(self, artifacts: Any, entry: Optional[_CacheEntry]) -> Optional[str]:
+        ttl = f"{self.ttl_seconds}s"
+        if entry is not None:
+            try:
+                await self.client.aio.caches.update(
+                    name=entry.name, config=types.UpdateCachedContentConfig(ttl=ttl)
+                )
+                logger.info(f"Extended Gemini context cache {entry.name} for '{artifacts.version}'")
+                return entry.name
+            except Exception as e:
+                logger.warning(f"Could not extend Gemini context cache {entry.name}, recreating: {e}")
+
+        try:
+            cached = await self.client.aio.caches.create(
+                model=self.model_name,
+                config=types.CreateCachedContentConfig(
+                    display_name=f"{artifacts.version}-{artifacts.fingerprint[:12]}",
+                    system_instruction=artifacts.system_prompt,
+                    ttl=ttl,
+                ),
+            )
+        except Exception as e:
+            logger.warning(
+                f"Gemini context cache unavailable for '{artifacts.version}', "
+                f"sending the system prompt inline: {type(e).__name__}: {e}"
+            )
+            return None
+        logger.info(f"Created Gemini context cache {cached.name} for '{artifacts.version}'")
+        return cached.name
+
+    def invalidate(self, name: str) -> None:
+        """Forget a cached content (e.g. after a request referencing it failed)."""
+        for key, entry in list(self._entries.items()):
+            if entry.name == name:
+                del self._entries[key]
+
+    async def aclose(self) -> None:
+        """Delete the cached contents created by this process (best effort)."""
+        entries, self._entries = list(self._entries.values()), {}
+        for entry in entries:
+            try:
+                await self.client.aio.caches.delete(name=entry.name)
+            except Exception as e:
+                logger.warning(f"Could not delete Gemini context cache {entry.name}: {e}")
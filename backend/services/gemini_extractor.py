@@ -3,12 +3,14 @@
 TEMPORARY: Modified to use flat E025 schema for testing.
 """
 
-import json
+import asyncio
 import logging
-from typing import Any, Dict
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 
+import httpx
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 
 # --- ORIGINAL imports (commented out for testing) ---
 # from backend.models.e025_document import E025Document
@@ -16,70 +18,271 @@ from google.genai import types
 # --- END ORIGINAL ---
 
 from backend.models.transcript import TranscriptInput
-from backend.prompts.extraction_prompt import SYSTEM_PROMPT, build_user_prompt
+from backend.prompts.extraction_prompt import CONTINUATION_PROMPT
+from backend.services.base_extractor import BaseExtractor
+from backend.services.gemini_cache import GeminiContextCache
+from backend.services.rate_limit import ProviderRateLimiter
+from backend.services.retry import RETRYABLE_STATUS_CODES, RetryPolicy, parse_retry_after
+from backend.services.usage import LLMUsage, record_usage
 
 logger = logging.getLogger(__name__)
 
 
-class GeminiExtractor:
+class GeminiExtractor(BaseExtractor):
     """Service for extracting medical entities using Gemini."""
 
-    def __init__(self, api_key: str, model_name: str = "models/gemini-3-pro-preview"):
+    provider = "gemini"
+    display_name = "Gemini"
+
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str = "models/gemini-3-pro-preview",
+        http_client: Optional[httpx.AsyncClient] = None,
+        use_response_schema: bool = False,
+        base_url: Optional[str] = None,
+        use_context_cache: bool = False,
+        context_cache_ttl_seconds: int = 3600,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[ProviderRateLimiter] = None,
+        repair_json: bool = True,
+        continue_truncated: bool = False,
+    ):
         """Initialize the Gemini extractor.
 
         Args:
             api_key: Google AI API key
             model_name: Gemini model to use (with models/ prefix)
+            http_client: Optional shared HTTP client (connection pool) to reuse
+            use_response_schema: Send the compiled schema as response_json_schema
+            base_url: Optional API base URL (e.g. a local stub provider)
+            use_context_cache: Serve the system prompt from an explicit context cache
+            context_cache_ttl_seconds: TTL of the explicit context caches
+            retry_policy: Retry policy for transient errors
+            rate_limiter: Outbound RPM/TPM and adaptive concurrency limiter
+            repair_json: Repair malformed or truncated answers instead of failing
+            continue_truncated: Ask once for the missing tail of a truncated answer
+        """
+        super().__init__(model_name, retry_policy, rate_limiter, repair_json, continue_truncated)
+        http_options = None
+        if http_client or base_url:
+            http_options = types.HttpOptions(httpx_async_client=http_client, base_url=base_url or None)
+        self.client = genai.Client(api_key=api_key, http_options=http_options)
+        self._http_client = http_client
+        self.use_response_schema = use_response_schema
+        self.context_cache = (
+            GeminiContextCache(self.client, model_name, ttl_seconds=context_cache_ttl_seconds)
+            if use_context_cache else None
+        )
+
+    async def warmup(self, connections: int = 1) -> None:
+        """Open pooled connections ahead of the first extraction.
+
+        Issues cheap concurrent model lookups so TLS handshakes are paid at
+        startup instead of on the first user request.
         """
-        self.client = genai.Client(api_key=api_key)
-        self.model_name = model_name
+        results = await asyncio.gather(
+            *(self.client.aio.models.get(model=self.model_name) for _ in range(max(1, connections))),
+            return_exceptions=True,
+        )
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            logger.warning(f"Gemini warmup failed: {type(errors[0]).__name__}: {errors[0]}")
+        else:
+            logger.info(f"Gemini warmup opened {len(results)} connection(s)")
+
+    async def aclose(self) -> None:
+        """Delete the context caches and close the underlying HTTP connection pool."""
+        if self.context_cache is not None:
+            await self.context_cache.aclose()
+        await self.client.aio.aclose()
+        if self._http_client is not None:
+            await self._http_client.aclose()
+
+    async def _cached_content(self, transcript_input: TranscriptInput) -> Optional[str]:
+        """Name of the context cache holding this request's system prompt, if enabled."""
+        if self.context_cache is None:
+            return None
+        return await self.context_cache.get(self._artifacts(transcript_input))
+
+    def _request_kwargs(
+        self,
+        transcript_input: TranscriptInput,
+        cached_content: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
+        user_prompt: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Build the generate_content arguments for a transcript.
+
+        The static system prompt is either sent as system_instruction (first in
+        the prompt, byte-identical per schema version) or, with a context
+        cache, referenced through cached_content.
+        """
+        if user_prompt is None:
+            user_prompt = self._user_prompt(transcript_input)
+        artifacts = self._artifacts(transcript_input)
+
+        return {
+            "model": self.model_name,
+            "contents": user_prompt,
+            "config": types.GenerateContentConfig(
+                system_instruction=None if cached_content else artifacts.system_prompt,
+                cached_content=cached_content,
+                temperature=0.1,
+                response_mime_type="application/json",
+                # --- ORIGINAL (Pydantic schema) ---
+                # response_schema=ExtractionResult,
+                # --- END ORIGINAL ---
+                # TEMPORARY: No response_schema by default - rely on prompt schema
+                response_json_schema=artifacts.gemini_schema if self.use_response_schema else None,
+                http_options=(
+                    types.HttpOptions(headers={"Idempotency-Key": idempotency_key}) if idempotency_key else None
+                ),
+            ),
+        }
+
+    def _classify_error(self, exc: BaseException) -> Tuple[Optional[str], Optional[float]]:
+        """Retry connection errors, 408/409/429/5xx and invalid JSON."""
+        if isinstance(exc, errors.APIError) and exc.code in RETRYABLE_STATUS_CODES:
+            return f"http_{exc.code}", parse_retry_after(getattr(exc.response, "headers", None))
+        if isinstance(exc, httpx.TimeoutException):
+            return "timeout", None
+        if isinstance(exc, httpx.TransportError):
+            return "connection", None
+        return super()._classify_error(exc)
+
+    def _status_code(self, exc: BaseException) -> Optional[int]:
+        return exc.code if isinstance(exc, errors.APIError) else None
+
+    def _record_usage(
+        self,
+        usage: Any,
+        latency_seconds: Optional[float],
+        streamed: bool,
+        schema_version: str = "",
+        duration_seconds: Optional[float] = None,
+    ) -> None:
+        """Record token usage (including context-cache hits) of a response."""
+        if usage is None:
+            return
+        cached_tokens = usage.cached_content_token_count or 0
+        record_usage(LLMUsage(
+            provider=self.provider,
+            model=self.model_name,
+            input_tokens=usage.prompt_token_count or 0,
+            cached_tokens=cached_tokens,
+            output_tokens=usage.candidates_token_count or 0,
+            latency_seconds=latency_seconds,
+            streamed=streamed,
+            schema_version=schema_version,
+            duration_seconds=duration_seconds,
+        ))
+        logger.info(
+            f"Gemini usage: {usage.prompt_token_count} input ({cached_tokens} cached), "
+            f"{usage.candidates_token_count} output"
+        )
 
     # --- TEMPORARY: returns raw dict instead of ExtractionResult ---
-    async def extract(self, transcript_input: TranscriptInput) -> Dict[str, Any]:
-        """Extract medical entities from a transcript.
+    async def _extract_once(
+        self, transcript_input: TranscriptInput, idempotency_key: str, user_prompt: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Single extraction attempt (retries are handled by BaseExtractor.extract).
 
         Args:
             transcript_input: The transcript to process
+            idempotency_key: Key shared by all attempts of one extraction
+            user_prompt: The rendered user prompt (rendered here if None)
 
         Returns:
             Raw dict with 'document' and 'references' keys
         """
-        user_prompt = build_user_prompt(transcript_input.transcript)
+        cached_content = await self._cached_content(transcript_input)
+        request_kwargs = self._request_kwargs(transcript_input, cached_content, idempotency_key, user_prompt)
 
         try:
-            response = await self.client.aio.models.generate_content(
-                model=self.model_name,
-                contents=user_prompt,
-                config=types.GenerateContentConfig(
-                    system_instruction=SYSTEM_PROMPT,
-                    temperature=0.1,
-                    response_mime_type="application/json",
-                    # --- ORIGINAL (Pydantic schema) ---
-                    # response_schema=ExtractionResult,
-                    # --- END ORIGINAL ---
-                    # TEMPORARY: No response_schema - rely on prompt schema
-                ),
-            )
+            started = time.perf_counter()
+            response = await self.client.aio.models.generate_content(**request_kwargs)
             logger.info(f"Gemini response received, length: {len(response.text)}")
+            self._record_usage(
+                response.usage_metadata, time.perf_counter() - started, streamed=False,
+                schema_version=self._artifacts(transcript_input).version,
+            )
         except Exception as e:
             logger.error(f"Gemini API error: {type(e).__name__}: {e}")
+            if cached_content:
+                self.context_cache.invalidate(cached_content)
             raise
 
-        return self._parse_response(response.text)
+        return await self._complete_response(transcript_input, response.text)
 
         # --- ORIGINAL (Pydantic validation) ---
         # result_json = self._parse_response(response.text)
         # return self._build_extraction_result(result_json)
         # --- END ORIGINAL ---
 
-    def _parse_response(self, response_text: str) -> Dict[str, Any]:
-        """Parse the JSON response from Gemini."""
+    async def _continue_once(self, transcript_input: TranscriptInput, partial_text: str) -> str:
+        """Ask for the rest of a truncated answer, prefilled with the partial text.
+
+        Sent as plain text: the tail alone is not a valid JSON document.
+        """
+        request_kwargs = self._request_kwargs(transcript_input)
+        request_kwargs["contents"] = [
+            types.Content(role="user", parts=[types.Part(text=request_kwargs["contents"])]),
+            types.Content(role="model", parts=[types.Part(text=partial_text)]),
+            types.Content(role="user", parts=[types.Part(text=CONTINUATION_PROMPT)]),
+        ]
+        request_kwargs["config"] = request_kwargs["config"].model_copy(
+            update={"response_mime_type": "text/plain", "response_json_schema": None}
+        )
+        started = time.perf_counter()
+        response = await self.client.aio.models.generate_content(**request_kwargs)
+        self._record_usage(
+            response.usage_metadata, time.perf_counter() - started, streamed=False,
+            schema_version=self._artifacts(transcript_input).version,
+        )
+        return response.text or ""
+
+    async def _stream_once(
+        self, transcript_input: TranscriptInput, idempotency_key: str, user_prompt: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Single streaming attempt (retries are handled by BaseExtractor.extract_stream).
+
+        Args:
+            transcript_input: The transcript to process
+            idempotency_key: Key shared by all attempts of one extraction
+            user_prompt: The rendered user prompt (rendered here if None)
+
+        Yields:
+            Text chunks which concatenate to the same JSON that extract() parses
+        """
+        cached_content = await self._cached_content(transcript_input)
+        request_kwargs = self._request_kwargs(transcript_input, cached_content, idempotency_key, user_prompt)
+
         try:
-            return json.loads(response_text)
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse Gemini response: {e}")
-            logger.debug(f"Response text: {response_text}")
-            raise ValueError(f"Invalid JSON response from Gemini: {e}")
+            started = time.perf_counter()
+            first_token_latency = None
+            usage = None
+            stream = await self.client.aio.models.generate_content_stream(**request_kwargs)
+            length = 0
+            async for chunk in stream:
+                if chunk.usage_metadata is not None:
+                    usage = chunk.usage_metadata
+                if chunk.text:
+                    if first_token_latency is None:
+                        first_token_latency = time.perf_counter() - started
+                    length += len(chunk.text)
+                    yield chunk.text
+            logger.info(f"Gemini stream finished, length: {length}")
+            self._record_usage(
+                usage, first_token_latency, streamed=True,
+                schema_version=self._artifacts(transcript_input).version,
+                duration_seconds=time.perf_counter() - started,
+            )
+        except Exception as e:
+            logger.error(f"Gemini API error: {type(e).__name__}: {e}")
+            if cached_content:
+                self.context_cache.invalidate(cached_content)
+            raise
 
     # --- ORIGINAL (kept but unused during testing) ---
     # def _build_extraction_result(self, result_json: Dict[str, Any]) -> ExtractionResult:
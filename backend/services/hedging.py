@@ -0,0 +1,181 @@
+"""Hedged extraction across two LLM providers.
+
+The request goes to the primary provider first. If it has not answered after
+a delay derived from the primary's observed latency percentile, the same
+request is also sent to the secondary provider. The first response that
+parses and validates wins and the other call is cancelled, so a slow or
+degraded provider no longer sets the tail latency on its own.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from backend.models.transcript import TranscriptInput
+from backend.services.extractor_wrapper import ExtractorWrapper, record_producer
+from backend.services.latency import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+
+def validate_result(result: Any) -> Dict[str, Any]:
+    """Check the shape of an extraction result.
+
+    Raises:
+        ValueError: If the result lacks a 'document' object or 'references' array
+    """
+    if not isinstance(result, dict):
+        raise ValueError("Extraction result is not a JSON object")
+    if not isinstance(result.get("document"), dict):
+        raise ValueError("Extraction result has no 'document' object")
+    if not isinstance(result.get("references"), list):
+        raise ValueError("Extraction result has no 'references' array")
+    return result
+
+
+class HedgingStats:
+    """How often hedges fire and which provider wins."""
+
+    def __init__(self):
+        self.requests = 0
+        self.hedges_fired = 0
+        self.wins: Dict[str, int] = {}
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def record(self, hedged: bool, winner: Optional[str]) -> None:
+        with self._lock:
+            self.requests += 1
+            if hedged:
+                self.hedges_fired += 1
+            if winner is None:
+                self.failures += 1
+            else:
+                self.wins[winner] = self.wins.get(winner, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "hedges_fired": self.hedges_fired,
+            "hedge_rate": round(self.hedges_fired / self.requests, 4) if self.requests else 0.0,
+            "wins": dict(self.wins),
+            "failures": self.failures,
+        }
+
+
+hedging_stats = HedgingStats()
+
+
+class HedgedExtractor(ExtractorWrapper):
+    """Extractor racing a secondary provider against a slow primary.
+
+    Streaming extractions are not hedged and use the primary provider.
+    """
+
+    def __init__(
+        self,
+        primary: Any,
+        secondary: Any,
+        percentile: float = 95.0,
+        min_delay_seconds: float = 2.0,
+        max_delay_seconds: float = 60.0,
+        initial_delay_seconds: float = 20.0,
+        min_samples: int = 20,
+        stats: Optional[HedgingStats] = None,
+    ):
+        """Initialize the hedged extractor.
+
+        Args:
+            primary: Extractor asked first
+            secondary: Extractor asked when the primary is slower than the hedge delay
+            percentile: Primary latency percentile used as the hedge delay
+            min_delay_seconds: Lower bound of the hedge delay
+            max_delay_seconds: Upper bound of the hedge delay
+            initial_delay_seconds: Hedge delay until min_samples latencies are known
+            min_samples: Primary latency samples needed before the percentile is used
+            stats: Hedging counters (defaults to the process-wide hedging_stats)
+        """
+        super().__init__(primary)
+        self.secondary = secondary
+        self.percentile = percentile
+        self.min_delay_seconds = min_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.initial_delay_seconds = initial_delay_seconds
+        self.min_samples = min_samples
+        self.primary_latency = LatencyWindow()
+        self.stats = stats or hedging_stats
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for the primary before also asking the secondary."""
+        if len(self.primary_latency) < self.min_samples:
+            delay = self.initial_delay_seconds
+        else:
+            delay = self.primary_latency.percentile(self.percentile)
+        return min(self.max_delay_seconds, max(self.min_delay_seconds, delay))
+
+    async def warmup(self, connections: int = 1) -> None:
+        await asyncio.gather(self.extractor.warmup(connections), self.secondary.warmup(connections))
+
+    async def aclose(self) -> None:
+        await asyncio.gather(self.extractor.aclose(), self.secondary.aclose())
+
+    async def _attempt(self, extractor: Any, transcript_input: TranscriptInput) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            result = validate_result(await extractor.extract(transcript_input))
+        except asyncio.CancelledError:
+            if extractor is self.extractor:
+                # Lost to the hedge: the primary took at least this long. Dropping
+                # the sample would bias the percentile low and hedge ever more often.
+                self.primary_latency.record(time.perf_counter() - started)
+            raise
+        if extractor is self.extractor:
+            self.primary_latency.record(time.perf_counter() - started)
+        return result
+
+    async def extract(self, transcript_input: TranscriptInput) -> Dict[str, Any]:
+        """Extract medical entities, hedging with the secondary provider when the primary is slow."""
+        delay = self.hedge_delay()
+        extractors = {}
+        primary = asyncio.create_task(self._attempt(self.extractor, transcript_input))
+        extractors[primary] = self.extractor
+        pending = {primary}
+        hedged = False
+        errors = []
+
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            while True:
+                for task in done:
+                    pending.discard(task)
+                    if task.exception() is None:
+                        winner = extractors[task]
+                        if hedged:
+                            logger.info(f"Hedged extraction won by {winner.provider}")
+                        self.stats.record(hedged, winner.provider)
+                        # Caches and the ledger attribute the answer to the winner, not the primary
+                        record_producer(winner)
+                        return task.result()
+                    errors.append(task.exception())
+                    logger.warning(
+                        f"{extractors[task].provider} extraction failed during hedging: "
+                        f"{type(task.exception()).__name__}: {task.exception()}"
+                    )
+
+                if not hedged:
+                    # Primary slower than the hedge delay, or already failed
+                    hedged = True
+                    logger.info(f"Hedging to {self.secondary.provider} after {delay:.1f}s")
+                    secondary = asyncio.create_task(self._attempt(self.secondary, transcript_input))
+                    extractors[secondary] = self.secondary
+                    pending.add(secondary)
+
+                if not pending:
+                    self.stats.record(hedged, None)
+                    raise errors[0]
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,422 @@
+"""Asynchronous extraction jobs backed by a durable local SQLite queue.
+
+POST /api/jobs stores the request and returns a job id immediately; a pool of
+async workers claims queued jobs and runs them through the shared extractor.
+Jobs that were running when the process stopped are put back in the queue on
+the next start, so accepted work survives restarts.
+
+Job lifecycle: queued -> running -> succeeded | failed | cancelled
+
+Store reads and writes run in a worker thread (``asyncio.to_thread``), like
+the result cache and the usage ledger, so they do not block the event loop.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from backend.models.transcript import TranscriptInput
+from backend.services import fast_json
+from backend.services.batch import error_status_code
+from backend.services.latency import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED, STATUS_CANCELLED)
+
+_COLUMNS = (
+    "id, idempotency_key, request_hash, status, request, result, error, status_code, "
+    "attempts, created_at, started_at, finished_at"
+)
+
+
+class IdempotencyConflictError(Exception):
+    """An Idempotency-Key was reused with a different request body."""
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    if ts is None:
+        return None
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+class JobStore:
+    """SQLite persistence for extraction jobs."""
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                idempotency_key TEXT UNIQUE,
+                request_hash TEXT NOT NULL,
+                status TEXT NOT NULL,
+                request TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                status_code INTEGER,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+        self._conn.commit()
+
+    def create(self, request: str, idempotency_key: Optional[str] = None) -> Tuple[sqlite3.Row, bool]:
+        """Insert a queued job, or return the existing job for a reused idempotency key.
+
+        Returns:
+            (job row, created) where created is False for an idempotent replay
+
+        Raises:
+            IdempotencyConflictError: If the key was used for a different request
+        """
+        request_hash = hashlib.sha256(request.encode("utf-8")).hexdigest()
+        with self._lock:
+            if idempotency_key:
+                row = self._conn.execute(
+                    f"SELECT {_COLUMNS} FROM jobs WHERE idempotency_key = ?", (idempotency_key,)
+                ).fetchone()
+                if row is not None:
+                    if row["request_hash"] != request_hash:
+                        raise IdempotencyConflictError(
+                            f"Idempotency-Key '{idempotency_key}' was already used for a different request"
+                        )
+                    return row, False
+            row = self._conn.execute(
+                f"INSERT INTO jobs (id, idempotency_key, request_hash, status, request, created_at) "
+                f"VALUES (?, ?, ?, ?, ?, ?) RETURNING {_COLUMNS}",
+                (uuid.uuid4().hex, idempotency_key or None, request_hash, STATUS_QUEUED, request, time.time()),
+            ).fetchone()
+            self._conn.commit()
+            return row, True
+
+    def get(self, job_id: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def queue_position(self, row: sqlite3.Row) -> int:
+        """Number of queued jobs ahead of the given one."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < ?",
+                (STATUS_QUEUED, row["created_at"]),
+            ).fetchone()[0]
+
+    def claim_next(self) -> Optional[sqlite3.Row]:
+        """Atomically move the oldest queued job to running and return it."""
+        with self._lock:
+            row = self._conn.execute(
+                f"UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1 "
+                f"WHERE id = (SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1) "
+                f"RETURNING {_COLUMNS}",
+                (STATUS_RUNNING, time.time(), STATUS_QUEUED),
+            ).fetchone()
+            self._conn.commit()
+            return row
+
+    def finish(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[str] = None,
+        error: Optional[str] = None,
+        status_code: Optional[int] = None,
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, status_code = ?, finished_at = ? "
+                "WHERE id = ?",
+                (status, result, error, status_code, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def cancel_queued(self, job_id: str) -> bool:
+        """Cancel a job that has not started yet. Returns False if it is no longer queued."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                (STATUS_CANCELLED, time.time(), job_id, STATUS_QUEUED),
+            )
+            self._conn.commit()
+            return cur.rowcount > 0
+
+    def requeue(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL WHERE id = ? AND status = ?",
+                (STATUS_QUEUED, job_id, STATUS_RUNNING),
+            )
+            self._conn.commit()
+
+    def requeue_running(self) -> int:
+        """Put jobs interrupted by a previous shutdown or crash back in the queue."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL WHERE status = ?",
+                (STATUS_QUEUED, STATUS_RUNNING),
+            )
+            self._conn.commit()
+            return cur.rowcount
+
+    def prune(self, older_than_seconds: int) -> int:
+        """Delete finished jobs older than the retention period."""
+        if older_than_seconds <= 0:
+            return 0
+        placeholders = ", ".join("?" for _ in FINISHED_STATUSES)
+        with self._lock:
+            cur = self._conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({placeholders}) AND finished_at < ?",
+                (*FINISHED_STATUSES, time.time() - older_than_seconds),
+            )
+            self._conn.commit()
+            return cur.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (STATUS_QUEUED, STATUS_RUNNING, *FINISHED_STATUSES)}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueue:
+    """Pool of async workers running queued extraction jobs."""
+
+    def __init__(
+        self,
+        store: JobStore,
+        extractor: Any,
+        workers: int = 2,
+        poll_interval: float = 1.0,
+        retention_seconds: int = 0,
+        max_attempts: int = 3,
+    ):
+        """Initialize the job queue.
+
+        Args:
+            store: Durable job store
+            extractor: Shared extractor used to run the jobs
+            workers: Number of concurrent worker tasks
+            poll_interval: Seconds an idle worker waits before checking the store again
+            retention_seconds: Finished jobs older than this are deleted at startup (0 keeps all)
+            max_attempts: Runs of a job (each restart or worker crash while running
+                adds one) after which it fails instead of running again
+        """
+        self.store = store
+        self.extractor = extractor
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.queue_wait = LatencyWindow()
+        self.run_time = LatencyWindow()
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._recorded: Dict[str, asyncio.Event] = {}  # Set once a running job's outcome is stored
+        self._cancel_requested: Set[str] = set()
+
+    async def start(self) -> None:
+        """Recover interrupted jobs and start the workers."""
+        requeued = self.store.requeue_running()
+        pruned = self.store.prune(self.retention_seconds)
+        if requeued or pruned:
+            logger.info(f"Job queue: requeued {requeued} interrupted jobs, pruned {pruned} old jobs")
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        """Stop the workers. Running jobs go back to the queue for the next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(
+        self, transcript_input: TranscriptInput, idempotency_key: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Queue an extraction job.
+
+        Returns:
+            (job description, created) where created is False for an idempotent replay
+        """
+        row, created = await asyncio.to_thread(
+            self.store.create, transcript_input.model_dump_json(), idempotency_key
+        )
+        if created:
+            self._wakeup.set()
+        return await asyncio.to_thread(self.describe, row), created
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._describe_job, job_id)
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued or running job. Finished jobs are returned unchanged."""
+        if not await asyncio.to_thread(self.store.cancel_queued, job_id):
+            task = self._running.get(job_id)
+            recorded = self._recorded.get(job_id)
+            if task is not None and recorded is not None:
+                self._cancel_requested.add(job_id)
+                task.cancel()
+                # Let the worker record the cancellation before reporting the job
+                await recorded.wait()
+        return await self.get(job_id)
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                row = await asyncio.to_thread(self.store.claim_next)
+            except Exception as e:
+                # Store errors (locked or full disk) must not end the worker
+                logger.error(f"Job worker {number} could not claim a job: {type(e).__name__}: {e}")
+                row = None
+            if row is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(row)
+
+    async def _finish(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+        status_code: Optional[int] = None,
+    ) -> bool:
+        """Record the outcome of a job; failures are logged, never raised into the worker.
+
+        A job whose outcome could not be stored stays running and is requeued
+        (up to max_attempts) on the next start.
+        """
+        try:
+            await asyncio.to_thread(
+                self.store.finish,
+                job_id,
+                status,
+                result=fast_json.dumps_str(result) if result is not None else None,
+                error=error,
+                status_code=status_code,
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Job {job_id}: could not record status '{status}': {type(e).__name__}: {e}")
+            return False
+
+    async def _run(self, row: sqlite3.Row) -> None:
+        job_id = row["id"]
+        self.queue_wait.record(row["started_at"] - row["created_at"])
+        if row["attempts"] > self.max_attempts:
+            # Interrupted (restart or worker crash) on every previous run
+            logger.error(f"Job {job_id} failed: interrupted {row['attempts'] - 1} times")
+            await self._finish(
+                job_id,
+                STATUS_FAILED,
+                error=f"Job abandoned after {row['attempts'] - 1} interrupted attempts",
+                status_code=500,
+            )
+            return
+        started = time.perf_counter()
+        self._recorded[job_id] = asyncio.Event()
+        try:
+            transcript_input = TranscriptInput.model_validate_json(row["request"])
+            task = asyncio.create_task(self.extractor.extract(transcript_input))
+            self._running[job_id] = task
+            result = await task
+        except asyncio.CancelledError:
+            if job_id not in self._cancel_requested:
+                # Worker shutdown: leave the job for the next start (inline, the worker is being cancelled)
+                try:
+                    self.store.requeue(job_id)
+                except Exception as e:
+                    logger.error(f"Job {job_id}: could not requeue: {type(e).__name__}: {e}")
+                raise
+            await self._finish(job_id, STATUS_CANCELLED)
+            logger.info(f"Job {job_id} cancelled while running")
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {type(e).__name__}: {e}")
+            await self._finish(job_id, STATUS_FAILED, error=str(e), status_code=error_status_code(e))
+        else:
+            if await self._finish(job_id, STATUS_SUCCEEDED, result=result):
+                self.run_time.record(time.perf_counter() - started)
+        finally:
+            self._running.pop(job_id, None)
+            self._recorded.pop(job_id).set()
+            self._cancel_requested.discard(job_id)
+
+    def _describe_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self.store.get(job_id)
+        return self.describe(row) if row is not None else None
+
+    def describe(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """Public view of a job row, including timings and the result or error."""
+        created_at, started_at, finished_at = row["created_at"], row["started_at"], row["finished_at"]
+        now = time.time()
+        timings: Dict[str, Optional[float]] = {
+            "queued_ms": _ms((started_at or finished_at or now) - created_at),
+            "run_ms": _ms((finished_at or now) - started_at) if started_at else None,
+            "total_ms": _ms((finished_at or now) - created_at),
+        }
+        job: Dict[str, Any] = {
+            "job_id": row["id"],
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "created_at": _iso(created_at),
+            "started_at": _iso(started_at),
+            "finished_at": _iso(finished_at),
+            "timings": timings,
+        }
+        if row["status"] == STATUS_QUEUED:
+            job["queue_position"] = self.store.queue_position(row)
+        elif row["status"] == STATUS_SUCCEEDED:
+            job["result"] = fast_json.loads(row["result"])
+        elif row["status"] == STATUS_FAILED:
+            job["status_code"] = row["status_code"]
+            job["error"] = row["error"]
+        return job
+
+    async def stats(self) -> Dict[str, Any]:
+        counts = await asyncio.to_thread(self.store.counts)
+        return {
+            "queue_depth": counts[STATUS_QUEUED],
+            "running": counts[STATUS_RUNNING],
+            "workers": self.workers,
+            "counts": counts,
+            "queue_wait": self.queue_wait.snapshot(),
+            "run_time": self.run_time.snapshot(),
+        }
@@ -0,0 +1,42 @@
+"""Minimal RFC 6902 JSON Patch generation (add / remove / replace)."""
+
+from typing import Any, Dict, List
+
+
+def _escape(token: str) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def make_patch(old: Any, new: Any, path: str = "") -> List[Dict[str, Any]]:
+    """Compute the operations turning ``old`` into ``new``.
+
+    Objects are diffed key by key and lists element by element (appends use
+    the "-" index), so a growing document produces small patches.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops: List[Dict[str, Any]] = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{_escape(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": child, "value": value})
+            else:
+                ops.extend(make_patch(old[key], value, child))
+        return ops
+
+    if isinstance(old, list) and isinstance(new, list):
+        ops = []
+        common = min(len(old), len(new))
+        for i in range(common):
+            ops.extend(make_patch(old[i], new[i], f"{path}/{i}"))
+        for i in range(len(old) - 1, common - 1, -1):
+            ops.append({"op": "remove", "path": f"{path}/{i}"})
+        for value in new[common:]:
+            ops.append({"op": "add", "path": f"{path}/-", "value": value})
+        return ops
+
+    if old == new and type(old) is type(new):
+        return []
+    return [{"op": "replace", "path": path, "value": new}]
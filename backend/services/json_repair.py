@@ -0,0 +1,279 @@
+"""Repair of truncated or malformed LLM JSON answers.
+
+An answer cut off at the output token limit (or with a stray trailing comma)
+would otherwise fail the whole, expensive, call. ``repair_json`` removes
+trailing commas and, if the text is still not valid JSON, cuts it back to
+the last complete value and closes the open arrays and objects. Every
+complete document field and references entry is kept; a value that was cut
+off mid-way (an unterminated string, number or key) is dropped rather than
+kept clipped.
+
+``repair_result`` applies this to an extraction answer and marks repaired
+truncated results as partial:
+
+    {"document": {...}, "references": [...], "partial": true, "missing_fields": [...]}
+
+``missing_fields`` lists the schema fields that were not written completely
+when the answer was cut inside the document: fields not written yet and the
+field being written (it keeps the items completed before the cut).
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from backend.services import fast_json
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = " \t\r\n"
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class RepairStats:
+    """Counters of parsed, repaired and failed LLM answers for /api/repair/stats."""
+
+    def __init__(self):
+        self.valid = 0
+        self.repaired = 0
+        self.partial = 0
+        self.continued = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        total = self.valid + self.repaired + self.partial + self.failed
+        return {
+            "valid": self.valid,
+            "repaired": self.repaired,
+            "partial": self.partial,
+            "continued": self.continued,
+            "failed": self.failed,
+            "repair_rate": round((self.repaired + self.partial) / total, 4) if total else 0.0,
+        }
+
+
+repair_stats = RepairStats()
+
+
+def strip_code_fence(text: str) -> str:
+    """Remove a surrounding markdown code fence (```json ... ```)."""
+    stripped = text.strip()
+    if not stripped.startswith("```"):
+        return text
+    stripped = stripped.split("\n", 1)[1] if "\n" in stripped else ""
+    if stripped.rstrip().endswith("```"):
+        stripped = stripped.rstrip()[:-3]
+    return stripped
+
+
+def strip_trailing_commas(text: str) -> str:
+    """Remove commas directly followed by a closing bracket (outside strings)."""
+    out: List[str] = []
+    in_string = False
+    escape = False
+    pending_comma: Optional[int] = None
+    for c in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+            out.append(c)
+            continue
+        if c in _WHITESPACE:
+            out.append(c)
+            continue
+        if c in "}]" and pending_comma is not None:
+            out[pending_comma] = ""
+        pending_comma = None
+        if c == ",":
+            pending_comma = len(out)
+        elif c == '"':
+            in_string = True
+        out.append(c)
+    return "".join(out)
+
+
+def close_truncated(text: str) -> Tuple[str, List[str], bool]:
+    """Cut text back to its last complete value and close the open containers.
+
+    Objects and arrays inside arrays (e.g. references entries) are kept only
+    when complete.
+
+    Returns:
+        (repaired text, keys being written at each open object level when the
+        text ended, whether the text was truncated). Text after a complete
+        root value (e.g. a trailing explanation) is dropped and does not count
+        as truncation.
+    """
+    stack: List[str] = []  # open containers: "{" or "["
+    expect_key: List[bool] = []  # per open object: next string is a key
+    keys: List[Optional[str]] = []  # raw key being written per open container
+    in_items = 0  # open containers that are array items: kept whole or not at all
+    in_string = False
+    escape = False
+    string_start = 0
+    in_primitive = False
+    safe_end = 0
+    safe_stack: List[str] = []
+    root_start: Optional[int] = None
+
+    for i, c in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+                if stack[-1] == "{" and expect_key[-1]:
+                    keys[-1] = text[string_start:i + 1]
+                elif not in_items:
+                    safe_end, safe_stack = i + 1, list(stack)
+            continue
+        if in_primitive:
+            if c not in ",}]" + _WHITESPACE:
+                continue
+            in_primitive = False
+            if not in_items:
+                safe_end, safe_stack = i, list(stack)
+        if c in _WHITESPACE:
+            continue
+        if root_start is None:
+            if c not in "{[":
+                continue  # Anything before the root value (e.g. prose) is ignored
+            root_start = i
+        if c in "{[":
+            if stack and stack[-1] == "[":
+                in_items += 1
+            stack.append(c)
+            expect_key.append(c == "{")
+            keys.append(None)
+            if not in_items:
+                safe_end, safe_stack = i + 1, list(stack)
+        elif c in "}]":
+            stack.pop()
+            expect_key.pop()
+            keys.pop()
+            if stack and stack[-1] == "[":
+                in_items -= 1
+            if not in_items:
+                safe_end, safe_stack = i + 1, list(stack)
+            if not stack:
+                return text[root_start:i + 1], [], False
+        elif c == '"':
+            in_string = True
+            string_start = i
+        elif c == ":":
+            expect_key[-1] = False
+        elif c == ",":
+            if stack[-1] == "{":
+                expect_key[-1] = True
+                keys[-1] = None
+        else:
+            in_primitive = True
+
+    if root_start is None:
+        return text, [], False
+    repaired = text[root_start:safe_end] + "".join(_CLOSERS[c] for c in reversed(safe_stack))
+    cut_keys = []
+    for container, key in zip(stack, keys):
+        if container != "{" or key is None:
+            break
+        cut_keys.append(fast_json.loads(key))
+    return repaired, cut_keys, True
+
+
+def repair_json(text: str) -> Tuple[Any, str, List[str]]:
+    """Parse JSON, repairing trailing commas and truncation if needed.
+
+    Returns:
+        (value, outcome, keys cut off) where outcome is "valid", "repaired"
+        (complete after fixing syntax) or "partial" (truncated, closed)
+
+    Raises:
+        ValueError: If nothing usable could be recovered
+    """
+    try:
+        return fast_json.loads(text), "valid", []
+    except (fast_json.JSONDecodeError, TypeError):
+        if not isinstance(text, str):
+            raise ValueError("Response is not text")
+
+    cleaned = strip_trailing_commas(strip_code_fence(text))
+    try:
+        return fast_json.loads(cleaned), "repaired", []
+    except fast_json.JSONDecodeError:
+        pass
+
+    closed, cut_keys, truncated = close_truncated(cleaned)
+    try:
+        return fast_json.loads(strip_trailing_commas(closed)), "partial" if truncated else "repaired", cut_keys
+    except fast_json.JSONDecodeError as e:
+        raise ValueError(f"Unrepairable JSON: {e}")
+
+
+def _record(record: bool, outcome: str) -> None:
+    if record:
+        repair_stats.record(outcome)
+
+
+def repair_result(text: str, expected_fields: Iterable[str], record: bool = True) -> Dict[str, Any]:
+    """Parse an extraction answer, repairing it if needed, and update repair_stats.
+
+    Args:
+        text: Raw model output
+        expected_fields: Document fields of the schema version
+        record: Count the outcome in repair_stats
+
+    Returns:
+        Raw dict with 'document' and 'references' keys; repaired truncated
+        answers also carry 'partial': True and 'missing_fields'
+
+    Raises:
+        ValueError: If no document field or reference could be recovered
+    """
+    try:
+        value, outcome, cut_keys = repair_json(text)
+    except ValueError:
+        _record(record, "failed")
+        raise
+    if not isinstance(value, dict):
+        _record(record, "failed")
+        raise ValueError("Response is not a JSON object")
+
+    if outcome == "partial":
+        document = value.get("document")
+        has_document = isinstance(document, dict)
+        if not has_document:
+            document = {}
+        if not document and not value.get("references"):
+            _record(record, "failed")
+            raise ValueError("Truncated response contains no complete field")
+        value["document"] = document
+        value.setdefault("references", [])
+        if cut_keys[:1] == ["document"]:
+            # Cut inside the document: unwritten fields and the field being written
+            cut_fields = set(cut_keys[1:2])
+            missing = [name for name in expected_fields if name not in document or name in cut_fields]
+        elif has_document:
+            missing = []  # Document complete, cut inside the references
+        else:
+            missing = list(expected_fields)
+        value["partial"] = True
+        value["missing_fields"] = missing
+        logger.warning(
+            f"Repaired truncated response: {len(document)} fields kept, "
+            f"missing {value['missing_fields']}"
+        )
+    elif outcome == "repaired":
+        logger.info("Repaired malformed JSON response")
+    _record(record, outcome)
+    return value
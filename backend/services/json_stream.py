@@ -0,0 +1,189 @@
+"""Incremental JSON parser for streamed extraction output.
+
+Consumes the LLM's JSON answer chunk by chunk and reports each top-level
+document field and each references entry as soon as its value is complete,
+without waiting for the whole object. Expected shape:
+
+    {"document": {"<field>": <value>, ...}, "references": [{...}, ...]}
+
+Only characters belonging to a value being reported are buffered, so the cost
+is linear in the output length.
+"""
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+EVENT_FIELD = "field"
+EVENT_REFERENCE = "reference"
+
+_WHITESPACE = " \t\r\n"
+_PRIMITIVE_END = ",}]" + _WHITESPACE
+
+
+@dataclass
+class JSONStreamEvent:
+    """A completed value: a document field (key = field name) or a reference (key = index)."""
+
+    kind: str
+    key: Any
+    value: Any
+
+
+@dataclass
+class _Frame:
+    kind: str  # "obj" or "arr"
+    state: str  # obj: key/colon/value/comma, arr: value/comma
+    key: Optional[str] = None
+    index: int = 0
+    key_chars: List[str] = field(default_factory=list)
+
+
+class IncrementalJSONParser:
+    """Streaming parser emitting JSONStreamEvent objects as values complete."""
+
+    def __init__(self):
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._string_is_key = False
+        self._escape = False
+        self._in_primitive = False
+        self._capture: Optional[List[str]] = None
+        self._capture_depth = 0
+        self._events: List[JSONStreamEvent] = []
+        self.done = False
+
+    def feed(self, chunk: str) -> List[JSONStreamEvent]:
+        """Consume a chunk of text and return the values completed by it."""
+        for c in chunk:
+            self._consume(c)
+        events, self._events = self._events, []
+        return events
+
+    def _consume(self, c: str) -> None:
+        if self._in_string:
+            if self._capture is not None:
+                self._capture.append(c)
+            frame = self._stack[-1]
+            if self._escape:
+                self._escape = False
+                if self._string_is_key:
+                    frame.key_chars.append(c)
+            elif c == "\\":
+                self._escape = True
+                if self._string_is_key:
+                    frame.key_chars.append(c)
+            elif c == '"':
+                self._in_string = False
+                if self._string_is_key:
+                    frame.key = json.loads('"' + "".join(frame.key_chars) + '"')
+                    frame.key_chars = []
+                    frame.state = "colon"
+                else:
+                    self._value_done()
+            elif self._string_is_key:
+                frame.key_chars.append(c)
+            return
+
+        if self._in_primitive:
+            if c not in _PRIMITIVE_END:
+                if self._capture is not None:
+                    self._capture.append(c)
+                return
+            self._in_primitive = False
+            self._value_done()
+
+        if c in _WHITESPACE or self.done:
+            if self._capture is not None and not self.done:
+                self._capture.append(c)
+            return
+
+        if not self._stack:
+            # Anything before the root object (e.g. a code fence) is ignored
+            if c == "{":
+                self._stack.append(_Frame(kind="obj", state="key"))
+            return
+
+        if self._capture is not None:
+            self._capture.append(c)
+
+        frame = self._stack[-1]
+        if frame.kind == "obj":
+            if frame.state == "key":
+                if c == '"':
+                    self._in_string = True
+                    self._string_is_key = True
+                elif c == "}":
+                    self._close()
+            elif frame.state == "colon":
+                if c == ":":
+                    frame.state = "value"
+            elif frame.state == "value":
+                self._begin_value(c)
+            elif frame.state == "comma":
+                if c == ",":
+                    frame.state = "key"
+                elif c == "}":
+                    self._close()
+        else:
+            if frame.state == "value":
+                if c == "]":
+                    self._close()
+                else:
+                    self._begin_value(c)
+            elif frame.state == "comma":
+                if c == ",":
+                    frame.state = "value"
+                elif c == "]":
+                    self._close()
+
+    def _is_reported(self) -> bool:
+        """Whether a value starting in the current frame is a document field or reference."""
+        if len(self._stack) != 2:
+            return False
+        root, frame = self._stack
+        if root.key == "document":
+            return frame.kind == "obj"
+        if root.key == "references":
+            return frame.kind == "arr"
+        return False
+
+    def _begin_value(self, c: str) -> None:
+        if self._capture is None and self._is_reported():
+            self._capture = [c]
+            self._capture_depth = len(self._stack)
+
+        if c == "{":
+            self._stack.append(_Frame(kind="obj", state="key"))
+        elif c == "[":
+            self._stack.append(_Frame(kind="arr", state="value"))
+        elif c == '"':
+            self._in_string = True
+            self._string_is_key = False
+        else:
+            self._in_primitive = True
+
+    def _close(self) -> None:
+        self._stack.pop()
+        if not self._stack:
+            self.done = True
+            return
+        self._value_done()
+
+    def _value_done(self) -> None:
+        frame = self._stack[-1]
+        if self._capture is not None and len(self._stack) == self._capture_depth:
+            text = "".join(self._capture).rstrip(_WHITESPACE + ",")
+            self._capture = None
+            try:
+                value = json.loads(text)
+            except json.JSONDecodeError:
+                pass  # Malformed value: skipped here, surfaced by the final parse
+            else:
+                if frame.kind == "obj":
+                    self._events.append(JSONStreamEvent(EVENT_FIELD, frame.key, value))
+                else:
+                    self._events.append(JSONStreamEvent(EVENT_REFERENCE, frame.index, value))
+        frame.state = "comma"
+        if frame.kind == "arr":
+            frame.index += 1
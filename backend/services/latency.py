@@ -0,0 +1,44 @@
+"""Rolling latency windows for percentile-based reporting and decisions."""
+
+import math
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+
+class LatencyWindow:
+    """Keeps the most recent latency samples (seconds) and computes percentiles."""
+
+    def __init__(self, maxlen: int = 200):
+        self._samples: "deque[float]" = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Nearest-rank percentile (0-100) of the window, or None if empty."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(1, math.ceil(p / 100.0 * len(samples)))
+        return samples[min(rank, len(samples)) - 1]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Count and p50/p95/p99 in milliseconds."""
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "count": self.count,
+            "p50_ms": ms(self.percentile(50)),
+            "p95_ms": ms(self.percentile(95)),
+            "p99_ms": ms(self.percentile(99)),
+        }
@@ -0,0 +1,208 @@
+"""Live-consultation incremental extraction.
+
+A session receives transcript segments while the consultation is going on.
+Segments are debounced, and only the newly arrived ones (plus a few already
+processed segments as Q&A context) are sent to the LLM together with the
+current document. The returned fields and source_segments are merged into the
+running document and the change is pushed to the client as a JSON Patch, so
+the cost of each update is proportional to the new segments, not to the whole
+transcript.
+"""
+
+import asyncio
+import copy
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from backend.models.transcript import IncrementalContext, TranscriptInput, TranscriptSegment
+from backend.schemas.registry import get_schema_registry
+from backend.services.batch import error_status_code
+from backend.services.document_merge import (
+    SCALAR_LATEST,
+    is_array_field,
+    merge_partial_results,
+    normalize_text,
+)
+from backend.services.json_patch import make_patch
+
+logger = logging.getLogger(__name__)
+
+
+def _reference_key(ref: Dict[str, Any]) -> tuple:
+    return ref.get("field_name"), normalize_text(str(ref.get("value", "")))
+
+
+def _stable_order(
+    old: List[Dict[str, Any]], new: List[Dict[str, Any]], scalar_fields: set
+) -> List[Dict[str, Any]]:
+    """Keep surviving references at their previous positions and append new ones,
+    so the JSON Patch for references is mostly appends. A replaced scalar value
+    takes the position of the value it replaced."""
+    position = {_reference_key(ref): i for i, ref in enumerate(old)}
+    scalar_position = {ref.get("field_name"): i for i, ref in enumerate(old) if ref.get("field_name") in scalar_fields}
+
+    def sort_key(ref: Dict[str, Any]) -> int:
+        if _reference_key(ref) in position:
+            return position[_reference_key(ref)]
+        return scalar_position.get(ref.get("field_name"), len(old))
+
+    return sorted(new, key=sort_key)
+
+
+class LiveExtractionSession:
+    """Running document for one live consultation."""
+
+    def __init__(
+        self,
+        extractor: Any,
+        send: Callable[[Dict[str, Any]], Awaitable[None]],
+        debounce_seconds: float = 3.0,
+        max_wait_seconds: float = 15.0,
+        max_pending_segments: int = 30,
+        context_segments: int = 4,
+        schema_version: Optional[str] = None,
+    ):
+        """Initialize the session.
+
+        Args:
+            extractor: Shared extractor
+            send: Coroutine sending a JSON message to the client
+            debounce_seconds: Quiet period after the last segment before extracting
+            max_wait_seconds: Upper bound on how long pending segments may wait
+            max_pending_segments: Extract immediately once this many segments are pending
+            context_segments: Already processed segments re-sent as context
+            schema_version: Flat schema version for this session
+        """
+        self.extractor = extractor
+        self.send = send
+        self.debounce_seconds = debounce_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.max_pending_segments = max_pending_segments
+        self.context_segments = context_segments
+        self.artifacts = get_schema_registry().get(schema_version)
+
+        self.segments: List[TranscriptSegment] = []
+        self.extracted_upto = 0
+        self.version = 0
+        self.state: Dict[str, Any] = {
+            "document": {name: None for name in self.artifacts.document_schema.get("properties", {})},
+            "references": [],
+        }
+        self._scalar_fields = {
+            name for name, prop in self.artifacts.document_schema.get("properties", {}).items()
+            if not is_array_field(prop)
+        }
+        self._first_pending_at: Optional[float] = None
+        self._timer: Optional[asyncio.Task] = None
+        self._flushes: Set[asyncio.Task] = set()  # Scheduled extractions past their delay
+        self._lock = asyncio.Lock()
+        self.closed = False
+
+    @property
+    def pending(self) -> int:
+        return len(self.segments) - self.extracted_upto
+
+    async def start(self) -> None:
+        """Send the initial (empty) state to the client."""
+        await self.send({"type": "state", "version": self.version, "state": self.state})
+
+    async def append(self, segments: List[TranscriptSegment]) -> None:
+        """Add newly transcribed segments and (re)schedule an extraction."""
+        if not segments:
+            return
+        self.segments.extend(segments)
+        if self._first_pending_at is None:
+            self._first_pending_at = time.monotonic()
+        await self.send({"type": "ack", "segments": len(self.segments)})
+
+        if self.pending >= self.max_pending_segments:
+            self._schedule(0.0)
+        else:
+            waited = time.monotonic() - self._first_pending_at
+            self._schedule(max(0.0, min(self.debounce_seconds, self.max_wait_seconds - waited)))
+
+    def _schedule(self, delay: float) -> None:
+        if self._timer is not None and not self._timer.done():
+            self._timer.cancel()
+        self._timer = asyncio.create_task(self._flush_after(delay))
+
+    async def _flush_after(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        # From here on the extraction must not be cancelled by a newer schedule (only by close())
+        task = asyncio.current_task()
+        self._timer = None
+        self._flushes.add(task)
+        try:
+            await self.flush()
+        except Exception as e:
+            # Nobody awaits this task: a client gone mid-update must not surface as an unretrieved error
+            logger.warning(f"Live extraction update not delivered: {type(e).__name__}: {e}")
+        finally:
+            self._flushes.discard(task)
+
+    async def _send(self, message: Dict[str, Any]) -> None:
+        if not self.closed:
+            await self.send(message)
+
+    async def flush(self) -> None:
+        """Extract all pending segments and push the resulting patch."""
+        async with self._lock:
+            if self.pending <= 0:
+                return
+            end = len(self.segments)
+            context_start = max(0, self.extracted_upto - self.context_segments)
+            transcript_input = TranscriptInput(
+                transcript=self.segments[context_start:end],
+                schema_version=self.artifacts.version,
+                incremental=IncrementalContext(
+                    segment_offset=context_start,
+                    context_segments=self.extracted_upto - context_start,
+                    document=self.state["document"],
+                ),
+            )
+
+            started = time.perf_counter()
+            try:
+                delta = await self.extractor.extract(transcript_input)
+            except Exception as e:
+                logger.error(f"Live extraction failed: {type(e).__name__}: {e}")
+                await self._send({
+                    "type": "error",
+                    "status_code": error_status_code(e),
+                    "detail": str(e),
+                    "pending": self.pending,
+                })
+                return
+            if self.closed:
+                return
+
+            old_state = copy.deepcopy(self.state)
+            merged = merge_partial_results(
+                [(0, self.state), (0, delta)],
+                self.artifacts.document_schema,
+                SCALAR_LATEST,
+            )
+            merged["references"] = _stable_order(
+                old_state["references"], merged["references"], self._scalar_fields
+            )
+            self.state = merged
+            self.extracted_upto = end
+            self._first_pending_at = time.monotonic() if self.pending else None
+            ops = make_patch(old_state, self.state)
+            self.version += 1
+            await self._send({
+                "type": "patch",
+                "version": self.version,
+                "segments_processed": end,
+                "extraction_ms": round((time.perf_counter() - started) * 1000, 1),
+                "ops": ops,
+            })
+
+    async def close(self) -> None:
+        """Stop the session: the pending schedule and running extractions are cancelled."""
+        self.closed = True
+        tasks = [task for task in (self._timer, *self._flushes) if task is not None and not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
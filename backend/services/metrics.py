@@ -0,0 +1,226 @@
+"""Prometheus metrics of the extraction request path.
+
+Exposed on GET /metrics in the Prometheus text exposition format (0.0.4).
+The counters and histograms are kept in-process by this module, like the
+other stats singletons, so no client library is needed.
+
+Stages observed in ``extraction_stage_seconds`` (labels provider, model,
+schema_version):
+
+- ``request_parse``: request received to handler start (body read and validation)
+- ``prompt_build``: user prompt rendering
+- ``provider_first_byte``: time to the first streamed token
+- ``provider_total``: the whole provider call
+- ``response_parse``: parsing (repair, validation, local alignment) of the answer
+- ``response_serialize``: rendering the API response
+
+plus LLM token counts, result cache lookups, retries and errors by type and
+provider, and per-route HTTP request counts and latency. Errors are counted
+once per failed extraction, by the outermost extractor wrapper
+(``ErrorCountingExtractor``).
+"""
+
+import bisect
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# From 1 ms (parsing, prompt building) up to 2 minutes (slow provider calls)
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0,
+)
+STAGE_LABELS = ("stage", "provider", "model", "schema_version")
+CALL_LABELS = ("provider", "model", "schema_version")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        key = tuple(str(v) for v in label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(tuple(str(v) for v in label_values), 0.0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}_total{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels."""
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # bucket counts..., +Inf count, sum
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        key = tuple(str(v) for v in label_values)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(tuple(str(v) for v in label_values))
+        return int(sum(series[:-1])) if series else 0
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            series_items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in series_items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, key, le)} {_format_value(cumulative)}"
+            yield f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(series[-1])}"
+            yield f"{self.name}_count{_format_labels(self.labels, key)} {_format_value(cumulative)}"
+
+
+class MetricsRegistry:
+    """Metrics rendered together on /metrics."""
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+
+    def register(self, metric: Any) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Histogram:
+        return self.register(Histogram(name, documentation, labels))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            full_name = f"{metric.name}_total" if metric.kind == "counter" else metric.name
+            lines.append(f"# HELP {full_name} {metric.documentation}")
+            lines.append(f"# TYPE {full_name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+stage_seconds = registry.histogram(
+    "extraction_stage_seconds", "Time spent per stage of the extraction request path", STAGE_LABELS
+)
+http_request_seconds = registry.histogram(
+    "http_request_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+llm_tokens = registry.counter(
+    "llm_tokens", "LLM tokens by kind (prompt, cached_prompt: the part of prompt served from cache, completion)", CALL_LABELS + ("kind",)
+)
+llm_calls = registry.counter("llm_calls", "LLM provider calls", CALL_LABELS + ("streamed",))
+cache_lookups = registry.counter("extraction_cache_lookups", "Result cache lookups", CALL_LABELS + ("result",))
+retries = registry.counter("llm_retries", "Retried provider calls by reason", CALL_LABELS + ("reason",))
+errors = registry.counter("extraction_errors", "Failed extractions by error type", CALL_LABELS + ("type",))
+
+
+def observe_stage(stage: str, seconds: float, provider: str, model: str, schema_version: Optional[str]) -> None:
+    """Record the duration of one stage of an extraction."""
+    stage_seconds.observe(seconds, stage, provider, model, schema_version or "")
+
+
+def count_error(exc: BaseException, provider: str, model: str, schema_version: Optional[str]) -> None:
+    """Count one failed extraction by error type."""
+    errors.inc(provider, model, schema_version or "", type(exc).__name__)
+
+
+def observe_usage(usage: Any) -> None:
+    """Record an LLM call (an ``LLMUsage``): token counts and provider latency."""
+    labels = (usage.provider, usage.model, usage.schema_version or "")
+    llm_calls.inc(*labels, "true" if usage.streamed else "false")
+    llm_tokens.inc(*labels, "prompt", amount=usage.input_tokens)
+    llm_tokens.inc(*labels, "cached_prompt", amount=usage.cached_tokens)
+    llm_tokens.inc(*labels, "completion", amount=usage.output_tokens)
+    if usage.streamed and usage.latency_seconds is not None:
+        stage_seconds.observe(usage.latency_seconds, "provider_first_byte", *labels)
+    total = usage.duration_seconds
+    if total is None and not usage.streamed:
+        total = usage.latency_seconds
+    if total is not None:
+        stage_seconds.observe(total, "provider_total", *labels)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording ``http_request_seconds`` per route template.
+
+    Also stores the arrival time as ``request.state.received_at`` so that
+    handlers can observe the ``request_parse`` stage.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        scope.setdefault("state", {})["received_at"] = started
+        status = {"code": 500}
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            # Route templates keep the label set bounded (no job ids or unknown paths)
+            path = getattr(route, "path", None) or "unmatched"
+            http_request_seconds.observe(time.perf_counter() - started, scope["method"], path, str(status["code"]))
+
+
+def render() -> bytes:
+    """All metrics in the Prometheus text format."""
+    return registry.render().encode("utf-8")
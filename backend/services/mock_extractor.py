@@ -0,0 +1,421 @@
+"""Mock LLM provider: records real answers to a cassette and replays them.
+
+LLM_PROVIDER=mock makes load tests and deterministic runs possible without
+provider quota:
+
+- ``record`` mode sends every request to MOCK_RECORD_PROVIDER (through its
+  streaming API, so time to first token and output rate are measured) and
+  appends the raw answer to the cassette, keyed by the hash of the system
+  and user prompt.
+- ``replay`` mode serves answers from the cassette. Latency follows
+  configurable distributions of time to first token and tokens per second
+  (or the recorded values), and a share of the calls fails with an injected
+  500 or a 429 with Retry-After, so retries, rate limiting, circuit breaking
+  and hedging behave as against a real provider.
+
+The cassette is a JSON Lines file, one recorded answer per line:
+
+    {"key": "<prompt hash>", "response": "<raw answer>", "time_to_first_token": 1.2,
+     "duration": 9.8, "output_tokens": 640, "provider": "openai", "model": "gpt-4o", ...}
+
+Latency distributions are written as ``fixed:<seconds>``, ``uniform:<low>,<high>``,
+``normal:<mean>,<stddev>``, ``lognormal:<median>,<p95>`` or ``recorded``.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from backend.models.transcript import TranscriptInput
+from backend.prompts.token_estimate import estimate_tokens
+from backend.services import fast_json
+from backend.services.base_extractor import BaseExtractor
+from backend.services.rate_limit import ProviderRateLimiter
+from backend.services.retry import RETRYABLE_STATUS_CODES, RetryPolicy
+from backend.services.usage import LLMUsage, record_usage
+
+logger = logging.getLogger(__name__)
+
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+MOCK_MODES = (MODE_RECORD, MODE_REPLAY)
+MISS_ANY = "any"  # Unknown prompt: serve a recorded answer chosen by the prompt hash
+MISS_ERROR = "error"
+EMPTY_RESPONSE = '{"document":{},"references":[]}'  # Served for misses while the cassette is empty
+STREAM_CHUNK_CHARS = 16  # About four tokens per streamed delta
+_Z_95 = 1.6448536269514722  # Standard normal 95th percentile
+
+
+class MockProviderError(Exception):
+    """An error injected by the mock provider (HTTP status as a real provider would return)."""
+
+    def __init__(self, status_code: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(f"{status_code} {message}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CassetteMissError(LookupError):
+    """Replay found no recorded answer for a prompt (MOCK_REPLAY_MISS=error)."""
+
+
+class LatencyDistribution:
+    """A non-negative random duration parsed from a distribution spec."""
+
+    KINDS = ("fixed", "uniform", "normal", "lognormal", "recorded")
+
+    def __init__(self, spec: str):
+        """Parse a spec such as "lognormal:0.8,2.5".
+
+        Raises:
+            ValueError: If the spec is not a known distribution with valid parameters
+        """
+        self.spec = spec.strip()
+        kind, _, params = self.spec.partition(":")
+        self.kind = kind.strip().lower()
+        if self.kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution '{spec}' (expected one of {self.KINDS})")
+        try:
+            self.params = [float(p) for p in params.split(",")] if params.strip() else []
+        except ValueError:
+            raise ValueError(f"Invalid latency distribution parameters: '{spec}'")
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "recorded": 0}[self.kind]
+        if len(self.params) != expected or any(p < 0 for p in self.params):
+            raise ValueError(f"Latency distribution '{spec}' needs {expected} non-negative parameter(s)")
+        if self.kind == "lognormal" and self.params[1] < self.params[0]:
+            raise ValueError(f"Latency distribution '{spec}': p95 is below the median")
+
+    def sample(self, rng: random.Random, recorded: Optional[float] = None) -> float:
+        """Draw one value; ``recorded`` is used by the "recorded" kind (0 if unknown)."""
+        if self.kind == "recorded":
+            return max(0.0, recorded or 0.0)
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            low, high = sorted(self.params)
+            return rng.uniform(low, high)
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(self.params[0], self.params[1]))
+        median, p95 = self.params
+        if median <= 0:
+            return 0.0
+        sigma = math.log(p95 / median) / _Z_95
+        return rng.lognormvariate(math.log(median), sigma)
+
+
+class Cassette:
+    """Recorded answers by prompt hash, backed by an append-only JSON Lines file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._keys: List[str] = []
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = fast_json.loads(line)
+                except ValueError:
+                    logger.warning(f"Skipping unreadable cassette line {line_number} in {self.path}")
+                    continue
+                self._store(entry)
+        logger.info(f"Loaded {len(self._entries)} recorded answers from {self.path}")
+
+    def _store(self, entry: Dict[str, Any]) -> None:
+        if entry["key"] not in self._entries:
+            self._keys.append(entry["key"])
+        self._entries[entry["key"]] = entry  # A later recording of the same prompt wins
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(key)
+
+    def pick(self, key: str) -> Optional[Dict[str, Any]]:
+        """A recorded answer chosen deterministically by the prompt hash (None if empty)."""
+        if not self._keys:
+            return None
+        return self._entries[self._keys[int(key[:8], 16) % len(self._keys)]]
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        """Store an answer and append it to the cassette file."""
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._store(entry)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class MockStats:
+    """Replayed, recorded, missed and injected-error counts for /api/mock/stats."""
+
+    def __init__(self):
+        self.replayed = 0
+        self.recorded = 0
+        self.misses = 0
+        self.injected: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def record_injected(self, status_code: int) -> None:
+        with self._lock:
+            self.injected[str(status_code)] = self.injected.get(str(status_code), 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "replayed": self.replayed,
+            "recorded": self.recorded,
+            "misses": self.misses,
+            "injected_errors": dict(self.injected),
+        }
+
+
+mock_stats = MockStats()
+
+
+class MockExtractor(BaseExtractor):
+    """Extractor recording real answers to a cassette or replaying them."""
+
+    provider = "mock"
+    display_name = "Mock"
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        mode: str = MODE_REPLAY,
+        upstream: Optional[BaseExtractor] = None,
+        model_name: str = "mock",
+        time_to_first_token: str = "recorded",
+        tokens_per_second: str = "recorded",
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after_seconds: float = 1.0,
+        miss_policy: str = MISS_ANY,
+        seed: Optional[int] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[ProviderRateLimiter] = None,
+        repair_json: bool = True,
+        continue_truncated: bool = False,
+    ):
+        """Initialize the mock extractor.
+
+        Args:
+            cassette: Recorded answers
+            mode: "record" (call the upstream provider and store its answers) or "replay"
+            upstream: Real provider extractor (record mode)
+            model_name: Model name reported for replayed answers
+            time_to_first_token: Replay: distribution of the time to first token in seconds
+            tokens_per_second: Replay: distribution of the output rate (0: instant)
+            error_rate: Replay: share of calls failing with an injected 500
+            rate_limit_rate: Replay: share of calls failing with an injected 429
+            retry_after_seconds: Retry-After sent with injected 429s
+            miss_policy: Replay of an unknown prompt: "any" (some recorded answer) or "error"
+            seed: Seed of the latency and error sampling (None: random)
+            retry_policy: Retry policy for transient errors (defaults to RetryPolicy())
+            rate_limiter: Outbound RPM/TPM and concurrency limiter (None: unlimited)
+            repair_json: Repair malformed or truncated answers instead of failing
+            continue_truncated: Record mode: ask once for the missing tail of a truncated answer
+
+        Raises:
+            ValueError: If the mode, miss policy or a latency distribution is invalid
+        """
+        if mode not in MOCK_MODES:
+            raise ValueError(f"Unknown mock mode: {mode} (expected one of {MOCK_MODES})")
+        if mode == MODE_RECORD and upstream is None:
+            raise ValueError("Mock record mode needs an upstream provider")
+        if miss_policy not in (MISS_ANY, MISS_ERROR):
+            raise ValueError(f"Unknown mock miss policy: {miss_policy}")
+        if mode == MODE_RECORD:
+            model_name = upstream.model_name
+        super().__init__(model_name, retry_policy, rate_limiter, repair_json, continue_truncated)
+        self.cassette = cassette
+        self.mode = mode
+        self.upstream = upstream
+        self.time_to_first_token = LatencyDistribution(time_to_first_token)
+        self.tokens_per_second = LatencyDistribution(tokens_per_second)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after_seconds = retry_after_seconds
+        self.miss_policy = miss_policy
+        self.stats = mock_stats
+        self._rng = random.Random(seed)
+
+    async def warmup(self, connections: int = 1) -> None:
+        """Open the upstream provider's pooled connections (record mode)."""
+        if self.upstream is not None:
+            await self.upstream.warmup(connections)
+
+    async def aclose(self) -> None:
+        """Close the upstream provider's connection pool (record mode)."""
+        if self.upstream is not None:
+            await self.upstream.aclose()
+
+    def prompt_key(self, transcript_input: TranscriptInput, user_prompt: Optional[str] = None) -> str:
+        """Cassette key of a request: hash of its system and user prompt."""
+        if user_prompt is None:
+            user_prompt = self._user_prompt(transcript_input)
+        return self._prompt_key(self._artifacts(transcript_input).system_prompt, user_prompt)
+
+    @staticmethod
+    def _prompt_key(system_prompt: str, user_prompt: str) -> str:
+        return hashlib.sha256(f"{system_prompt}\n{user_prompt}".encode("utf-8")).hexdigest()[:32]
+
+    def _classify_error(self, exc: BaseException) -> Tuple[Optional[str], Optional[float]]:
+        """Retry injected 429/5xx errors; record mode classifies like the upstream provider."""
+        if isinstance(exc, MockProviderError) and exc.status_code in RETRYABLE_STATUS_CODES:
+            return f"http_{exc.status_code}", exc.retry_after
+        if self.upstream is not None:
+            return self.upstream._classify_error(exc)
+        return super()._classify_error(exc)
+
+    def _status_code(self, exc: BaseException) -> Optional[int]:
+        if isinstance(exc, MockProviderError):
+            return exc.status_code
+        if self.upstream is not None:
+            return self.upstream._status_code(exc)
+        return None
+
+    async def _extract_once(
+        self, transcript_input: TranscriptInput, idempotency_key: str, user_prompt: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Single extraction attempt: a replayed (or freshly recorded) answer."""
+        chunks = [
+            chunk async for chunk in self._stream_once(transcript_input, idempotency_key, user_prompt, streamed=False)
+        ]
+        return await self._complete_response(transcript_input, "".join(chunks))
+
+    async def _continue_once(self, transcript_input: TranscriptInput, partial_text: str) -> str:
+        """Record mode continues with the upstream provider; a replayed answer has no tail."""
+        if self.upstream is not None:
+            return await self.upstream._continue_once(transcript_input, partial_text)
+        return ""
+
+    async def _stream_once(
+        self,
+        transcript_input: TranscriptInput,
+        idempotency_key: str,
+        user_prompt: Optional[str] = None,
+        streamed: bool = True,
+    ) -> AsyncIterator[str]:
+        """Single streaming attempt."""
+        if user_prompt is None:
+            user_prompt = self._user_prompt(transcript_input)
+        if self.mode == MODE_RECORD:
+            async for chunk in self._record_stream(transcript_input, idempotency_key, user_prompt):
+                yield chunk
+        else:
+            async for chunk in self._replay_stream(transcript_input, user_prompt, streamed):
+                yield chunk
+
+    async def _record_stream(
+        self, transcript_input: TranscriptInput, idempotency_key: str, user_prompt: str
+    ) -> AsyncIterator[str]:
+        """Stream the upstream provider's answer and append it to the cassette once complete."""
+        key = self.prompt_key(transcript_input, user_prompt)
+        started = time.perf_counter()
+        first_token_at = None
+        chunks = []
+        async for chunk in self.upstream._stream_once(transcript_input, idempotency_key, user_prompt=user_prompt):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            chunks.append(chunk)
+            yield chunk
+        finished = time.perf_counter()
+        response = "".join(chunks)
+        self.cassette.add({
+            "key": key,
+            "response": response,
+            "time_to_first_token": round((first_token_at or finished) - started, 4),
+            "duration": round(finished - started, 4),
+            "output_tokens": estimate_tokens(response),
+            "provider": self.upstream.provider,
+            "model": self.upstream.model_name,
+            "schema_version": transcript_input.schema_version,
+            "segments": len(transcript_input.transcript),
+            "recorded_at": time.time(),
+        })
+        self.stats.record("recorded")
+        logger.info(f"Recorded {self.upstream.display_name} answer {key[:12]} ({len(response)} chars)")
+
+    def _inject_error(self) -> None:
+        draw = self._rng.random()
+        if draw < self.rate_limit_rate:
+            self.stats.record_injected(429)
+            raise MockProviderError(429, "Rate limit exceeded (injected)", retry_after=self.retry_after_seconds)
+        if draw < self.rate_limit_rate + self.error_rate:
+            self.stats.record_injected(500)
+            raise MockProviderError(500, "Internal server error (injected)")
+
+    def _lookup(self, key: str) -> Dict[str, Any]:
+        entry = self.cassette.get(key)
+        if entry is not None:
+            return entry
+        self.stats.record("misses")
+        if self.miss_policy == MISS_ERROR:
+            raise CassetteMissError(f"No recorded answer for prompt {key[:12]} in {self.cassette.path}")
+        return self.cassette.pick(key) or {"key": key, "response": EMPTY_RESPONSE}
+
+    async def _replay_stream(
+        self, transcript_input: TranscriptInput, user_prompt: str, streamed: bool
+    ) -> AsyncIterator[str]:
+        """Serve a recorded answer with sampled time to first token and output rate."""
+        self._inject_error()
+        artifacts = self._artifacts(transcript_input)
+        entry = self._lookup(self._prompt_key(artifacts.system_prompt, user_prompt))
+        response = entry["response"]
+        output_tokens = entry.get("output_tokens") or estimate_tokens(response)
+
+        recorded_rate = None
+        if entry.get("duration") is not None and entry.get("time_to_first_token") is not None:
+            generation = entry["duration"] - entry["time_to_first_token"]
+            recorded_rate = output_tokens / generation if generation > 0 else 0.0
+        first_token = self.time_to_first_token.sample(self._rng, entry.get("time_to_first_token"))
+        rate = self.tokens_per_second.sample(self._rng, recorded_rate)
+        generation = output_tokens / rate if rate > 0 else 0.0
+
+        started = time.perf_counter()
+        if first_token > 0:
+            await asyncio.sleep(first_token)
+        if not streamed:
+            if generation > 0:
+                await asyncio.sleep(generation)
+            yield response
+        else:
+            pieces = [response[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(response), STREAM_CHUNK_CHARS)]
+            step = generation / len(pieces) if pieces else 0.0
+            for piece in pieces:
+                yield piece
+                if step > 0:
+                    await asyncio.sleep(step)
+        self.stats.record("replayed")
+        record_usage(LLMUsage(
+            provider=self.provider,
+            model=self.model_name,
+            input_tokens=artifacts.system_prompt_tokens + estimate_tokens(user_prompt),
+            output_tokens=output_tokens,
+            latency_seconds=first_token if streamed else time.perf_counter() - started,
+            streamed=streamed,
+            schema_version=artifacts.version,
+            duration_seconds=time.perf_counter() - started,
+        ))
@@ -3,10 +3,13 @@
 TEMPORARY: Modified to use flat E025 schema for testing.
 """
 
-import json
+import asyncio
 import logging
-from typing import Any, Dict
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 
+import httpx
+import openai
 from openai import AsyncOpenAI
 
 # --- ORIGINAL imports (commented out for testing) ---
@@ -14,132 +17,258 @@ from openai import AsyncOpenAI
 # from backend.models.extraction_result import EntityReference, ExtractionResult
 # --- END ORIGINAL ---
 
-from backend.schemas.e025_flat import build_extraction_schema
+from backend.schemas.e025_flat import make_schema_strict
 from backend.models.transcript import TranscriptInput
-from backend.prompts.extraction_prompt import SYSTEM_PROMPT, build_user_prompt
+from backend.prompts.extraction_prompt import CONTINUATION_PROMPT
+from backend.services.base_extractor import BaseExtractor
+from backend.services.rate_limit import ProviderRateLimiter
+from backend.services.retry import RETRYABLE_STATUS_CODES, RetryPolicy, parse_retry_after
+from backend.services.usage import LLMUsage, record_usage
 
 logger = logging.getLogger(__name__)
 
 
-class OpenAIExtractor:
+class OpenAIExtractor(BaseExtractor):
     """Service for extracting medical entities using OpenAI GPT."""
 
-    def __init__(self, api_key: str, model_name: str = "gpt-4o"):
+    provider = "openai"
+    display_name = "OpenAI"
+
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str = "gpt-4o",
+        http_client: Optional[httpx.AsyncClient] = None,
+        base_url: Optional[str] = None,
+        use_prompt_cache_key: bool = True,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[ProviderRateLimiter] = None,
+        repair_json: bool = True,
+        continue_truncated: bool = False,
+    ):
         """Initialize the OpenAI extractor.
 
         Args:
             api_key: OpenAI API key
             model_name: GPT model to use (e.g., gpt-4o, gpt-4-turbo, gpt-3.5-turbo)
+            http_client: Optional shared HTTP client (connection pool) to reuse
+            base_url: Optional API base URL (e.g. a local stub provider)
+            use_prompt_cache_key: Send a per-schema-version prompt_cache_key so requests
+                sharing the static system prompt are routed to the same prefix cache
+            retry_policy: Retry policy for transient errors (the SDK's own retries are disabled)
+            rate_limiter: Outbound RPM/TPM and adaptive concurrency limiter
+            repair_json: Repair malformed or truncated answers instead of failing
+            continue_truncated: Ask once for the missing tail of a truncated answer
         """
-        self.client = AsyncOpenAI(api_key=api_key)
-        self.model_name = model_name
+        super().__init__(model_name, retry_policy, rate_limiter, repair_json, continue_truncated)
+        self.client = AsyncOpenAI(
+            api_key=api_key, http_client=http_client, base_url=base_url or None, max_retries=0
+        )
+        self.use_prompt_cache_key = use_prompt_cache_key
 
-    def _make_schema_strict(self, schema: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Post-process JSON schema to meet OpenAI Strict Structured Outputs requirements.
-        1. 'additionalProperties': false
-        2. All keys in 'properties' must be in 'required'
-        3. No 'description' or 'title' if '$ref' is present
+    async def warmup(self, connections: int = 1) -> None:
+        """Open pooled connections ahead of the first extraction.
+
+        Issues cheap concurrent model-list requests so TLS handshakes are paid
+        at startup instead of on the first user request.
         """
-        if "$ref" in schema:
-            # If it's a ref, it cannot have other keywords like description or title
-            keys_to_remove = ["description", "title", "default"]
-            for k in keys_to_remove:
-                if k in schema:
-                    del schema[k]
-            # We don't recurse into ref here, the ref definition will be handled in $defs
-            return schema
-
-        if "type" in schema and schema["type"] == "object":
-            schema["additionalProperties"] = False
-
-            properties = schema.get("properties", {})
-            if properties:
-                required = schema.get("required", [])
-                # Add all properties to required
-                for prop_name in properties.keys():
-                    if prop_name not in required:
-                        required.append(prop_name)
-                schema["required"] = required
-
-            # Recurse into properties
-            for prop in properties.values():
-                self._make_schema_strict(prop)
-
-            # Recurse into definitions
-            defs = schema.get("$defs", {})
-            for def_schema in defs.values():
-                self._make_schema_strict(def_schema)
-
-        elif "type" in schema and schema["type"] == "array":
-            items = schema.get("items", {})
-            self._make_schema_strict(items)
-
-        elif "anyOf" in schema:
-            for sub_schema in schema["anyOf"]:
-                self._make_schema_strict(sub_schema)
-
-        return schema
+        results = await asyncio.gather(
+            *(self.client.models.list() for _ in range(max(1, connections))),
+            return_exceptions=True,
+        )
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            logger.warning(f"OpenAI warmup failed: {type(errors[0]).__name__}: {errors[0]}")
+        else:
+            logger.info(f"OpenAI warmup opened {len(results)} connection(s)")
 
-    # --- TEMPORARY: returns raw dict instead of ExtractionResult ---
-    async def extract(self, transcript_input: TranscriptInput) -> Dict[str, Any]:
-        """Extract medical entities from a transcript.
+    async def aclose(self) -> None:
+        """Close the underlying HTTP connection pool."""
+        await self.client.close()
 
-        Args:
-            transcript_input: The transcript to process
+    def _make_schema_strict(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        """Post-process JSON schema to meet OpenAI Strict Structured Outputs requirements."""
+        return make_schema_strict(schema)
 
-        Returns:
-            Raw dict with 'document' and 'references' keys
+    def _request_kwargs(
+        self,
+        transcript_input: TranscriptInput,
+        idempotency_key: Optional[str] = None,
+        user_prompt: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Build the chat.completions.create arguments for a transcript.
+
+        The system prompt (static per schema version) comes first so that the
+        byte-identical prefix is served from OpenAI's automatic prompt cache;
+        everything request specific follows in the user message.
         """
-        user_prompt = build_user_prompt(transcript_input.transcript)
+        if user_prompt is None:
+            user_prompt = self._user_prompt(transcript_input)
 
         # --- ORIGINAL (Pydantic schema) ---
         # json_schema = ExtractionResult.model_json_schema()
         # strict_schema = self._make_schema_strict(json_schema)
         # --- END ORIGINAL ---
 
-        # TEMPORARY: Use flat schema (loaded from file, already strict-compatible)
-        strict_schema = build_extraction_schema()
-        self._make_schema_strict(strict_schema)
+        # TEMPORARY: Use flat schema (precompiled strict variant from the registry)
+        artifacts = self._artifacts(transcript_input)
+
+        request_kwargs = {
+            "model": self.model_name,
+            "messages": [
+                {"role": "system", "content": artifacts.system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            "temperature": 0.1,
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "extraction_result",
+                    "strict": True,
+                    "schema": artifacts.openai_schema
+                }
+            },
+        }
+        if self.use_prompt_cache_key:
+            request_kwargs["prompt_cache_key"] = f"{artifacts.version}:{artifacts.fingerprint[:16]}"
+        if idempotency_key:
+            request_kwargs["extra_headers"] = {"Idempotency-Key": idempotency_key}
+        return request_kwargs
+
+    def _classify_error(self, exc: BaseException) -> Tuple[Optional[str], Optional[float]]:
+        """Retry timeouts, connection errors, 408/409/429/5xx and invalid JSON."""
+        if isinstance(exc, openai.APITimeoutError):
+            return "timeout", None
+        if isinstance(exc, openai.APIConnectionError):
+            return "connection", None
+        if isinstance(exc, openai.APIStatusError) and exc.status_code in RETRYABLE_STATUS_CODES:
+            return f"http_{exc.status_code}", parse_retry_after(exc.response.headers)
+        return super()._classify_error(exc)
+
+    def _status_code(self, exc: BaseException) -> Optional[int]:
+        return exc.status_code if isinstance(exc, openai.APIStatusError) else None
+
+    def _record_usage(
+        self,
+        usage: Any,
+        latency_seconds: float,
+        streamed: bool,
+        schema_version: str = "",
+        duration_seconds: Optional[float] = None,
+    ) -> None:
+        """Record token usage (including prompt-cache hits) of a response."""
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+        record_usage(LLMUsage(
+            provider=self.provider,
+            model=self.model_name,
+            input_tokens=usage.prompt_tokens or 0,
+            cached_tokens=cached_tokens,
+            output_tokens=usage.completion_tokens or 0,
+            latency_seconds=latency_seconds,
+            streamed=streamed,
+            schema_version=schema_version,
+            duration_seconds=duration_seconds,
+        ))
+        logger.info(f"OpenAI usage: {usage.prompt_tokens} input ({cached_tokens} cached), {usage.completion_tokens} output")
+
+    # --- TEMPORARY: returns raw dict instead of ExtractionResult ---
+    async def _extract_once(
+        self, transcript_input: TranscriptInput, idempotency_key: str, user_prompt: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Single extraction attempt (retries are handled by BaseExtractor.extract).
+
+        Args:
+            transcript_input: The transcript to process
+            idempotency_key: Key shared by all attempts of one extraction
+            user_prompt: The rendered user prompt (rendered here if None)
+
+        Returns:
+            Raw dict with 'document' and 'references' keys
+        """
+        request_kwargs = self._request_kwargs(transcript_input, idempotency_key, user_prompt)
 
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": user_prompt},
-                ],
-                temperature=0.1,
-                response_format={
-                    "type": "json_schema",
-                    "json_schema": {
-                        "name": "extraction_result",
-                        "strict": True,
-                        "schema": strict_schema
-                    }
-                },
-            )
+            started = time.perf_counter()
+            response = await self.client.chat.completions.create(**request_kwargs)
             response_text = response.choices[0].message.content
             logger.info(f"OpenAI response received, length: {len(response_text)}")
+            self._record_usage(
+                response.usage, time.perf_counter() - started, streamed=False,
+                schema_version=self._artifacts(transcript_input).version,
+            )
         except Exception as e:
             logger.error(f"OpenAI API error: {type(e).__name__}: {e}")
             raise
 
-        return self._parse_response(response_text)
+        return await self._complete_response(transcript_input, response_text)
 
         # --- ORIGINAL (Pydantic validation) ---
         # result_json = self._parse_response(response_text)
         # return self._build_extraction_result(result_json)
         # --- END ORIGINAL ---
 
-    def _parse_response(self, response_text: str) -> Dict[str, Any]:
-        """Parse the JSON response from OpenAI."""
+    async def _continue_once(self, transcript_input: TranscriptInput, partial_text: str) -> str:
+        """Ask for the rest of a truncated answer, prefilled with the partial text.
+
+        Sent without response_format: the tail alone is not a valid JSON document.
+        """
+        request_kwargs = self._request_kwargs(transcript_input)
+        request_kwargs.pop("response_format")
+        request_kwargs["messages"] = request_kwargs["messages"] + [
+            {"role": "assistant", "content": partial_text},
+            {"role": "user", "content": CONTINUATION_PROMPT},
+        ]
+        started = time.perf_counter()
+        response = await self.client.chat.completions.create(**request_kwargs)
+        self._record_usage(
+            response.usage, time.perf_counter() - started, streamed=False,
+            schema_version=self._artifacts(transcript_input).version,
+        )
+        return response.choices[0].message.content or ""
+
+    async def _stream_once(
+        self, transcript_input: TranscriptInput, idempotency_key: str, user_prompt: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Single streaming attempt (retries are handled by BaseExtractor.extract_stream).
+
+        Args:
+            transcript_input: The transcript to process
+            idempotency_key: Key shared by all attempts of one extraction
+            user_prompt: The rendered user prompt (rendered here if None)
+
+        Yields:
+            Text chunks which concatenate to the same JSON that extract() parses
+        """
+        request_kwargs = self._request_kwargs(transcript_input, idempotency_key, user_prompt)
+
         try:
-            return json.loads(response_text)
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse OpenAI response: {e}")
-            logger.debug(f"Response text: {response_text}")
-            raise ValueError(f"Invalid JSON response from OpenAI: {e}")
+            started = time.perf_counter()
+            first_token_latency = None
+            usage = None
+            stream = await self.client.chat.completions.create(
+                **request_kwargs, stream=True, stream_options={"include_usage": True}
+            )
+            length = 0
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first_token_latency is None:
+                        first_token_latency = time.perf_counter() - started
+                    length += len(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+            logger.info(f"OpenAI stream finished, length: {length}")
+            self._record_usage(
+                usage, first_token_latency, streamed=True,
+                schema_version=self._artifacts(transcript_input).version,
+                duration_seconds=time.perf_counter() - started,
+            )
+        except Exception as e:
+            logger.error(f"OpenAI API error: {type(e).__name__}: {e}")
+            raise
 
     # --- ORIGINAL (kept but unused during testing) ---
     # def _build_extraction_result(self, result_json: Dict[str, Any]) -> ExtractionResult:
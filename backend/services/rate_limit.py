@@ -0,0 +1,283 @@
+"""Outbound rate limiting per LLM provider.
+
+Every provider call is admitted by a ProviderRateLimiter before it is sent:
+
+- Token buckets for requests per minute (RPM) and tokens per minute (TPM).
+  A request is charged its estimated tokens (system prompt + rendered user
+  prompt + expected output) up front; once the provider reports the actual
+  usage the difference is charged or refunded.
+- An AIMD concurrency limit: the number of calls in flight grows by one per
+  "window" of successful calls and is cut multiplicatively on 429/503
+  answers or repeated latency spikes, so the client backs off before a 429
+  storm and ramps up again when the pressure is gone. Latency is compared
+  per 1k tokens of the call, so a long transcript among short ones is not
+  mistaken for a spike.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+from backend.services.latency import LatencyWindow
+from backend.services.usage import collect_usage
+
+logger = logging.getLogger(__name__)
+
+# Retry reasons (see BaseExtractor._classify_error) that signal provider overload
+OVERLOAD_REASONS = frozenset({"http_429", "http_503"})
+
+
+class TokenBucket:
+    """Token bucket refilled continuously with ``per_minute`` tokens per minute."""
+
+    def __init__(self, per_minute: float):
+        """Initialize a full bucket.
+
+        Args:
+            per_minute: Refill rate and capacity (0 disables the bucket)
+        """
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` tokens are available (0 if they are now)."""
+        if not self.enabled:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        """Take tokens; the balance may go negative when actual usage exceeds the estimate."""
+        if self.enabled:
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class AdaptiveConcurrencyLimit:
+    """AIMD limit on concurrent provider calls."""
+
+    def __init__(
+        self,
+        initial: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff_factor: float = 0.5,
+        latency_spike_ratio: float = 3.0,
+        latency_spike_count: int = 3,
+        min_samples: int = 20,
+        cooldown_seconds: float = 5.0,
+    ):
+        """Initialize the limit.
+
+        Args:
+            initial: Concurrency limit at startup
+            min_limit: Lower bound of the limit
+            max_limit: Upper bound of the limit
+            backoff_factor: Multiplicative decrease on overload
+            latency_spike_ratio: A call slower (per 1k tokens) than this multiple of the median is a spike
+            latency_spike_count: Consecutive spikes that count as overload
+            min_samples: Latency samples needed before spikes are detected
+            cooldown_seconds: Minimum time between two decreases (one burst of 429s halves the limit once)
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(self.max_limit, max(self.min_limit, initial)))
+        self.backoff_factor = backoff_factor
+        self.latency_spike_ratio = latency_spike_ratio
+        self.latency_spike_count = max(1, latency_spike_count)
+        self.consecutive_spikes = 0
+        self.min_samples = min_samples
+        self.cooldown_seconds = cooldown_seconds
+        self.in_flight = 0
+        self.decreases = 0
+        self.latency = LatencyWindow()  # Seconds per 1k tokens (input + output) of successful calls
+        self._last_decrease = 0.0
+        self._condition: Optional[asyncio.Condition] = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self) -> None:
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self) -> None:
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify_all()
+
+    def on_success(self, latency_seconds: float, tokens: int) -> None:
+        """Additive increase, unless the last calls were all latency spikes.
+
+        Args:
+            latency_seconds: Duration of the call
+            tokens: Input + output tokens of the call (latency is compared per 1k tokens)
+        """
+        per_1k = latency_seconds * 1000 / max(1, tokens)
+        median = self.latency.percentile(50) if len(self.latency) >= self.min_samples else None
+        self.latency.record(per_1k)
+        if median and per_1k > median * self.latency_spike_ratio:
+            self.consecutive_spikes += 1
+            if self.consecutive_spikes >= self.latency_spike_count:
+                self.consecutive_spikes = 0
+                self.on_overload(
+                    f"{self.latency_spike_count} latency spikes, last {per_1k:.2f}s per 1k tokens "
+                    f"(median {median:.2f}s)"
+                )
+            return
+        self.consecutive_spikes = 0
+        self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+
+    def on_overload(self, reason: str) -> None:
+        """Multiplicative decrease, at most once per cooldown period."""
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown_seconds:
+            return
+        self._last_decrease = now
+        previous = self.limit
+        self.limit = max(float(self.min_limit), self.limit * self.backoff_factor)
+        self.decreases += 1
+        logger.warning(f"Concurrency limit {previous:.1f} -> {self.limit:.1f} ({reason})")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "decreases": self.decreases,
+            "latency_per_1k_tokens": self.latency.snapshot(),
+        }
+
+
+class ProviderRateLimiter:
+    """RPM/TPM token buckets plus adaptive concurrency for one provider."""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        expected_output_tokens: int = 1500,
+        concurrency: Optional[AdaptiveConcurrencyLimit] = None,
+    ):
+        """Initialize the limiter.
+
+        Args:
+            name: Provider name (for messages and /api/rate-limits/stats)
+            requests_per_minute: Provider RPM limit (0: unlimited)
+            tokens_per_minute: Provider TPM limit, input + output tokens (0: unlimited)
+            expected_output_tokens: Output estimate until actual answers have been seen
+            concurrency: Adaptive concurrency limit (defaults to AdaptiveConcurrencyLimit())
+        """
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.expected_output_tokens = float(expected_output_tokens)
+        self.concurrency = concurrency or AdaptiveConcurrencyLimit()
+        self.admitted = 0
+        self.throttled_seconds = 0.0
+        self.overloads = 0
+        self._lock = threading.Lock()
+
+    def estimate(self, input_tokens: int) -> int:
+        """Tokens charged up front for a request with the given input size."""
+        return input_tokens + int(self.expected_output_tokens)
+
+    async def _take(self, tokens: int) -> None:
+        """Wait until both buckets can pay for the request, then pay atomically."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+                if wait <= 0:
+                    self.requests.take(1)
+                    self.tokens.take(tokens)
+                    return
+            self.throttled_seconds += wait
+            await asyncio.sleep(wait)
+
+    def _settle(self, estimated: int, input_tokens: int, output_tokens: int) -> None:
+        """Charge or refund the difference between estimated and actual tokens."""
+        with self._lock:
+            self.tokens.take(input_tokens + output_tokens - estimated)
+            if output_tokens:
+                # Exponentially weighted average of recent answers
+                self.expected_output_tokens += 0.2 * (output_tokens - self.expected_output_tokens)
+
+    @asynccontextmanager
+    async def admit(
+        self,
+        input_tokens: int,
+        classify: Callable[[BaseException], Tuple[Optional[str], Optional[float]]],
+    ) -> AsyncIterator[None]:
+        """Hold a concurrency slot and the bucket tokens for one provider call.
+
+        Args:
+            input_tokens: Estimated prompt tokens of the call
+            classify: The extractor's error classifier, used to detect overload answers
+        """
+        estimated = self.estimate(input_tokens)
+        await self.concurrency.acquire()
+        try:
+            await self._take(estimated)
+            self.admitted += 1
+            started = time.perf_counter()
+            with collect_usage() as usages:
+                try:
+                    yield
+                except Exception as e:
+                    reason, _ = classify(e)
+                    if reason in OVERLOAD_REASONS:
+                        self.overloads += 1
+                        self.concurrency.on_overload(f"{self.name} {reason}")
+                    raise
+            latency = time.perf_counter() - started
+            if usages:
+                actual_input = sum(u.input_tokens for u in usages)
+                actual_output = sum(u.output_tokens for u in usages)
+                self.concurrency.on_success(latency, actual_input + actual_output)
+                self._settle(estimated, actual_input, actual_output)
+            else:
+                self.concurrency.on_success(latency, estimated)
+        finally:
+            await self.concurrency.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        def bucket(b: TokenBucket) -> Optional[Dict[str, Any]]:
+            if not b.enabled:
+                return None
+            with self._lock:
+                b._refill(time.monotonic())
+                return {"per_minute": int(b.capacity), "available": int(b.tokens)}
+
+        return {
+            "requests_per_minute": bucket(self.requests),
+            "tokens_per_minute": bucket(self.tokens),
+            "expected_output_tokens": int(self.expected_output_tokens),
+            "admitted": self.admitted,
+            "throttled_seconds": round(self.throttled_seconds, 2),
+            "overloads": self.overloads,
+            "concurrency": self.concurrency.snapshot(),
+        }
+
+
+rate_limiters: Dict[str, ProviderRateLimiter] = {}
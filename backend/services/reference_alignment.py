@@ -0,0 +1,316 @@
+"""Local alignment of extracted values to transcript segments.
+
+With ``REFERENCES_MODE=local`` the model writes only the document; the
+references array (roughly half of the output tokens) is rebuilt here:
+
+- Every segment is indexed by character n-grams of its words plus exact
+  number tokens ("36,6" and 36.6 both become ``#36.6``), weighted by inverse
+  segment frequency.
+- A value's score against a segment is the weighted share of its features
+  found in the segment. Its source_segments are the best segment plus those
+  scoring close to it (ties: the later segment, like a repeated measurement).
+- Question/answer exchanges cite both segments (extraction rule 4): a
+  question followed by another speaker's answer adds the answer, an answer
+  adds the question before it.
+
+Scoring is one sparse accumulation (``numpy.bincount``) over the inverted
+index for all values at once. numpy is in both requirements files; where it is
+missing, an equivalent (slower) pure-Python path is used.
+"""
+
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from backend.models.transcript import TranscriptSegment
+from backend.services.document_merge import is_array_field, item_value, normalize_text
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+logger = logging.getLogger(__name__)
+
+BACKEND = "numpy" if np is not None else "python"
+
+NGRAM_SIZE = 3  # Short enough to match inflected forms ("gerklę" / "gerklės")
+MIN_SCORE = 0.2  # Below this share of matched features a value gets no source segments
+SECONDARY_RATIO = 0.8  # Other segments scoring at least this fraction of the best are cited too
+MAX_SEGMENTS = 2  # Before adding question/answer partners
+NUMBER_WEIGHT = 3.0  # Numbers are the strongest evidence for measurements
+HINT_WEIGHT = 0.1  # Field hint words only break ties between segments with the same number
+MAX_DOCUMENT_FREQUENCY = 0.1  # Features in more of the segments are ignored (" ne", "as "): they barely discriminate
+MIN_STOP_POSTINGS = 10  # ... but only once they occur in more segments than this (short transcripts keep all)
+
+# Scores are accumulated in blocks of at most this many (value, segment) cells
+_MAX_BLOCK_CELLS = 4_000_000
+
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)?")
+
+# Words that name a scalar field in a transcript; its value alone ("69") is too short to align
+FIELD_HINTS: Dict[str, str] = {
+    "systolic_bp": "kraujospūdis spaudimas",
+    "diastolic_bp": "kraujospūdis spaudimas",
+    "pulse": "pulsas",
+    "breathing_rate": "kvėpavimo dažnis",
+    "saturation": "saturacija",
+    "temperature": "temperatūra",
+    "weight": "svoris sveria",
+    "height": "ūgis",
+    "bmi": "kūno masės indeksas",
+}
+
+
+def _number_token(text: str) -> str:
+    value = float(text.replace(",", "."))
+    return f"#{int(value)}" if value.is_integer() else f"#{value:g}"
+
+
+def text_features(text: str, weight: float = 1.0) -> Dict[str, float]:
+    """Weighted features of a text: word character n-grams and number tokens."""
+    features: Dict[str, float] = {}
+    for number in _NUMBER_RE.findall(text):
+        features[_number_token(number)] = NUMBER_WEIGHT * weight
+    for word in normalize_text(_NUMBER_RE.sub(" ", text)).split():
+        padded = f" {word} "
+        if len(padded) <= NGRAM_SIZE:
+            features.setdefault(padded, weight)
+            continue
+        for i in range(len(padded) - NGRAM_SIZE + 1):
+            features.setdefault(padded[i:i + NGRAM_SIZE], weight)
+    return features
+
+
+class AlignmentStats:
+    """Counters of local reference alignment for /api/alignment/stats."""
+
+    def __init__(self):
+        self.documents = 0
+        self.values = 0
+        self.unaligned = 0
+        self.total_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, values: int, unaligned: int, seconds: float) -> None:
+        with self._lock:
+            self.documents += 1
+            self.values += values
+            self.unaligned += unaligned
+            self.total_seconds += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "backend": BACKEND,
+            "documents": self.documents,
+            "values": self.values,
+            "unaligned": self.unaligned,
+            "avg_ms_per_document": (
+                round(self.total_seconds * 1000 / self.documents, 2) if self.documents else 0.0
+            ),
+        }
+
+
+alignment_stats = AlignmentStats()
+
+
+class ReferenceAligner:
+    """Inverted n-gram index over transcript segments."""
+
+    def __init__(self, segments: Sequence[TranscriptSegment], offset: int = 0):
+        """Index the segments.
+
+        Args:
+            segments: Transcript segments, numbered from ``offset``
+            offset: Global index of the first segment (incremental extraction)
+        """
+        self.segments = list(segments)
+        self.offset = offset
+        self.vocabulary: Dict[str, int] = {}
+        postings: List[List[int]] = []
+        for index, segment in enumerate(self.segments):
+            for feature in text_features(segment.text):
+                feature_id = self.vocabulary.setdefault(feature, len(postings))
+                if feature_id == len(postings):
+                    postings.append([])
+                postings[feature_id].append(index)
+
+        n = max(1, len(self.segments))
+        max_postings = max(MIN_STOP_POSTINGS, int(n * MAX_DOCUMENT_FREQUENCY))
+        self.stop_features = {feature for feature, i in self.vocabulary.items() if len(postings[i]) > max_postings}
+        postings = [[] if len(p) > max_postings else p for p in postings]
+        self.postings = postings
+        self.idf = [math.log(1.0 + n / len(p)) if p else 0.0 for p in postings]
+        self.unseen_idf = math.log(1.0 + n)  # Weight of a feature no segment has
+        if np is not None:
+            lengths = np.fromiter((len(p) for p in postings), dtype=np.int64, count=len(postings))
+            self._indptr = np.zeros(len(postings) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=self._indptr[1:])
+            self._indices = np.fromiter(
+                (i for p in postings for i in p), dtype=np.int64, count=int(self._indptr[-1])
+            )
+
+    def _query(self, text: str, hint: str = "") -> Tuple[List[int], List[float], float]:
+        """Known feature ids, their weights and the total weight of a value text."""
+        features = text_features(hint, HINT_WEIGHT) if hint else {}
+        features.update(text_features(text))
+        ids: List[int] = []
+        weights: List[float] = []
+        total = 0.0
+        for feature, boost in features.items():
+            if feature in self.stop_features:
+                continue
+            feature_id = self.vocabulary.get(feature)
+            if feature_id is None:
+                total += boost * self.unseen_idf
+                continue
+            weight = boost * self.idf[feature_id]
+            ids.append(feature_id)
+            weights.append(weight)
+            total += weight
+        return ids, weights, total
+
+    def _score_blocks(self, texts: Sequence[str], hints: Optional[Sequence[str]] = None) -> Iterator[Any]:
+        """Score matrices (values x segments, each cell in [0, 1]) for consecutive blocks of values."""
+        queries = [self._query(text, hint) for text, hint in zip(texts, hints or [""] * len(texts))]
+        n = len(self.segments)
+        if np is None:
+            rows = []
+            for ids, weights, total in queries:
+                row = [0.0] * n
+                for feature_id, weight in zip(ids, weights):
+                    for index in self.postings[feature_id]:
+                        row[index] += weight
+                rows.append([value / total for value in row] if total else row)
+            yield rows
+            return
+
+        block = max(1, _MAX_BLOCK_CELLS // max(1, n))
+        for start in range(0, len(queries), block):
+            chunk = queries[start:start + block]
+            # Sparse (value x feature) @ (feature x segment) as one weighted bincount
+            feature_ids = np.fromiter((f for ids, _, _ in chunk for f in ids), dtype=np.int64)
+            feature_weights = np.fromiter((w for _, weights, _ in chunk for w in weights), dtype=np.float64)
+            rows = np.repeat(np.arange(len(chunk)), [len(ids) for ids, _, _ in chunk])
+            starts = self._indptr[feature_ids]
+            lengths = self._indptr[feature_ids + 1] - starts
+            ends = np.cumsum(lengths)
+            # Positions of every posting of every feature, without a Python loop
+            positions = np.arange(int(ends[-1]) if len(ends) else 0) - np.repeat(ends - lengths - starts, lengths)
+            matrix = np.bincount(
+                np.repeat(rows, lengths) * n + self._indices[positions],
+                weights=np.repeat(feature_weights, lengths),
+                minlength=len(chunk) * n,
+            ).reshape(len(chunk), n)
+            totals = np.fromiter((total for _, _, total in chunk), dtype=np.float64, count=len(chunk))
+            matrix = matrix / np.where(totals > 0, totals, 1.0)[:, None]  # float even without any match
+            yield matrix
+
+    def _top_segments(self, matrix: Any) -> List[List[int]]:
+        """Per row: up to MAX_SEGMENTS local indices, best first (ties: the later segment)."""
+        n = len(self.segments)
+        if np is None:
+            selected = []
+            for row in matrix:
+                ranked = heapq.nlargest(MAX_SEGMENTS, range(n), key=lambda i: (row[i], i))
+                threshold = max(MIN_SCORE, row[ranked[0]] * SECONDARY_RATIO) if ranked else 0.0
+                selected.append([i for i in ranked if row[i] >= threshold])
+            return selected
+
+        work = matrix[:, ::-1].copy()  # Reversed so that argmax prefers the later segment
+        rows = np.arange(len(work))
+        threshold = None
+        picks = []
+        for _ in range(min(MAX_SEGMENTS, n)):
+            best = np.argmax(work, axis=1)
+            scores = work[rows, best]
+            if threshold is None:
+                threshold = np.maximum(MIN_SCORE, scores * SECONDARY_RATIO)
+            picks.append(np.where(scores >= threshold, n - 1 - best, -1))
+            work[rows, best] = -1.0
+        if not picks:
+            return [[] for _ in rows]
+        return [[i for i in row if i >= 0] for row in np.stack(picks, axis=1).tolist()]
+
+    def align(self, texts: Sequence[str], hints: Optional[Sequence[str]] = None) -> List[List[int]]:
+        """Global source segment indices for each value text.
+
+        Args:
+            texts: Extracted values
+            hints: Per value, words naming its field in a transcript (low weight)
+        """
+        aligned = []
+        for matrix in self._score_blocks(texts, hints):
+            for chosen in self._top_segments(matrix):
+                indices = set(chosen)
+                for i in chosen:
+                    indices.update(self._qa_partners(i))
+                aligned.append(sorted(self.offset + i for i in indices))
+        return aligned
+
+    def _qa_partners(self, i: int) -> List[int]:
+        """The question before an answer, or the answer after a question (rule 4)."""
+        partners = []
+        segment = self.segments[i]
+        if "?" in segment.text and i + 1 < len(self.segments):
+            if self.segments[i + 1].speaker != segment.speaker:
+                partners.append(i + 1)
+        if i > 0:
+            previous = self.segments[i - 1]
+            if "?" in previous.text and previous.speaker != segment.speaker:
+                partners.append(i - 1)
+        return partners
+
+
+def document_values(document: Dict[str, Any], document_schema: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """(field name, value as string) for every extracted value, in schema order."""
+    values = []
+    for name, prop in document_schema.get("properties", {}).items():
+        value = document.get(name)
+        if value is None or value == [] or value == "":
+            continue
+        if is_array_field(prop) and isinstance(value, list):
+            values.extend((name, item_value(item)) for item in value)
+        elif isinstance(value, bool):
+            values.append((name, "true" if value else "false"))
+        else:
+            values.append((name, str(value)))
+    return values
+
+
+def align_references(
+    document: Dict[str, Any],
+    segments: Sequence[TranscriptSegment],
+    document_schema: Dict[str, Any],
+    offset: int = 0,
+    aligner: Optional[ReferenceAligner] = None,
+) -> List[Dict[str, Any]]:
+    """Build the references array for a document from the transcript.
+
+    Args:
+        document: Extracted document
+        segments: Transcript segments the document was extracted from
+        document_schema: Flat document schema of the request's version
+        offset: Global index of the first segment (incremental extraction)
+        aligner: Prebuilt index over the same segments
+
+    Returns:
+        References entries as the model would write them
+    """
+    started = time.perf_counter()
+    values = document_values(document, document_schema)
+    aligner = aligner or ReferenceAligner(segments, offset)
+    aligned = aligner.align([value for _, value in values], [FIELD_HINTS.get(name, "") for name, _ in values])
+    references = [
+        {"field_name": name, "value": value, "source_segments": source_segments}
+        for (name, value), source_segments in zip(values, aligned)
+    ]
+    unaligned = sum(1 for source_segments in aligned if not source_segments)
+    alignment_stats.record(len(values), unaligned, time.perf_counter() - started)
+    if unaligned:
+        logger.debug(f"{unaligned} of {len(values)} values have no supporting segment")
+    return references
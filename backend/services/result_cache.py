@@ -0,0 +1,456 @@
+"""Content-addressed cache for extraction results.
+
+Sits in front of an extractor's ``extract`` method. Cache keys are derived from
+the normalized transcript segments, the schema version fingerprint (flat document
+schema content plus rendered system prompt), the provider, the model name and a
+digest of the pipeline settings of the wrapped layers (compaction, chunking,
+vital-sign pre-extraction), so the same transcript resubmitted with the same
+configuration is answered without an LLM call.
+
+Two tiers are available:
+- a bounded in-memory LRU tier (always on)
+- an optional on-disk SQLite tier with TTL and size-based eviction
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from backend.config import get_settings
+from backend.models.transcript import TranscriptInput, TranscriptSegment
+from backend.schemas.registry import SchemaRegistry, get_schema_registry
+from backend.services import fast_json, metrics
+from backend.services.extractor_wrapper import ExtractorWrapper, collect_producers
+
+logger = logging.getLogger(__name__)
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def normalize_segments(segments: List[TranscriptSegment]) -> List[List[str]]:
+    """Normalize transcript segments for hashing.
+
+    Collapses whitespace so that trivially different resubmissions of the same
+    transcript map to the same cache key.
+    """
+    return [
+        [" ".join(seg.time.split()), " ".join(seg.speaker.split()), " ".join(seg.text.split())]
+        for seg in segments
+    ]
+
+
+def pipeline_digest(pipeline: Dict[str, Any]) -> str:
+    """Hash of the settings of the wrapped layers that change the result."""
+    return _sha256(json.dumps(pipeline, sort_keys=True, ensure_ascii=False, separators=(",", ":")))[:16]
+
+
+def make_cache_key(
+    transcript_input: TranscriptInput,
+    provider: str,
+    model_name: str,
+    version: str,
+    fingerprint: str,
+    pipeline: str = "",
+) -> str:
+    """Build the content-addressed cache key for an extraction request.
+
+    Args:
+        transcript_input: The transcript to process
+        provider: LLM provider name (e.g. 'openai', 'gemini')
+        model_name: Model used by the provider
+        version: Schema version used for the extraction
+        fingerprint: Hash of the schema and system prompt in effect
+        pipeline: Digest of the wrapped layers' settings (``pipeline_digest``)
+    """
+    payload = json.dumps(
+        {
+            "segments": normalize_segments(transcript_input.transcript),
+            "incremental": transcript_input.incremental.model_dump() if transcript_input.incremental else None,
+            "provider": provider,
+            "model": model_name,
+            "version": version,
+            "fingerprint": fingerprint,
+            "pipeline": pipeline,
+        },
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return _sha256(payload)
+
+
+class MemoryLRUCache:
+    """Bounded in-memory LRU tier."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: str, fingerprint: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (fingerprint, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, fingerprint: str) -> int:
+        """Drop all entries produced under the given fingerprint."""
+        with self._lock:
+            stale = [k for k, (fp, _) in self._data.items() if fp == fingerprint]
+            for k in stale:
+                del self._data[k]
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteResultStore:
+    """Optional on-disk tier backed by SQLite, with TTL and size-based eviction."""
+
+    def __init__(self, path: str, ttl_seconds: int, max_bytes: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_accessed ON results(accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl_seconds > 0 and created_at + self.ttl_seconds < now:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._conn.commit()
+                self.evictions += 1
+                return None
+            self._conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return value
+
+    def set(self, key: str, value: str, version: str, fingerprint: str) -> None:
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results "
+                "(key, version, fingerprint, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, version, fingerprint, value, size, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then least recently used ones until under max_bytes."""
+        if self.ttl_seconds > 0:
+            cur = self._conn.execute(
+                "DELETE FROM results WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+            self.evictions += cur.rowcount
+        if self.max_bytes <= 0:
+            return
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM results ORDER BY accessed_at ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def invalidate_version(self, version: str, keep_fingerprint: str) -> int:
+        """Delete a version's entries produced under a different schema/prompt fingerprint."""
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM results WHERE version = ? AND fingerprint != ?",
+                (version, keep_fingerprint),
+            )
+            self._conn.commit()
+            return cur.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+        return {"entries": count, "bytes": total, "evictions": self.evictions}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ExtractionCache:
+    """Two-tier (memory + optional SQLite) extraction result cache with hit/miss counters."""
+
+    def __init__(self, memory: MemoryLRUCache, disk: Optional[SQLiteResultStore] = None):
+        self.memory = memory
+        self.disk = disk
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+        self._fingerprints: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def check_fingerprint(self, version: str, fingerprint: str) -> None:
+        """Invalidate a version's entries when its schema file or prompt changes."""
+        with self._lock:
+            previous = self._fingerprints.get(version)
+            if previous == fingerprint:
+                return
+            self._fingerprints[version] = fingerprint
+
+        removed = 0
+        if previous is not None:
+            removed += self.memory.invalidate(previous)
+            self.invalidations += 1
+        if self.disk is not None:
+            removed += self.disk.invalidate_version(version, fingerprint)
+        if removed or previous is not None:
+            logger.info(f"Schema '{version}' or prompt changed, invalidated {removed} cached results")
+
+    def get(self, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached result. Returns a fresh dict the caller may mutate."""
+        value = self.get_serialized(key, fingerprint)
+        return fast_json.loads(value) if value is not None else None
+
+    def get_serialized(self, key: str, fingerprint: str) -> Optional[str]:
+        """Look up a cached result as its stored JSON text."""
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            self.memory_hits += 1
+            return value
+
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                self.memory.set(key, value, fingerprint)
+                return value
+
+        self.misses += 1
+        return None
+
+    def peek(self, key: str) -> Optional[str]:
+        """Stored JSON text of a result, without counting a lookup."""
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+        return value
+
+    def set(self, key: str, result: Dict[str, Any], version: str, fingerprint: str) -> None:
+        """Store an extraction result in all tiers."""
+        value = fast_json.dumps_str(result)
+        self.memory.set(key, value, fingerprint)
+        if self.disk is not None:
+            self.disk.set(key, value, version, fingerprint)
+        self.stores += 1
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "invalidations": self.invalidations,
+            "memory": {
+                "entries": len(self.memory),
+                "max_entries": self.memory.max_entries,
+                "evictions": self.memory.evictions,
+            },
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
+
+
+class CachedExtractor(ExtractorWrapper):
+    """Extractor wrapper that answers repeated transcripts from the result cache."""
+
+    def __init__(
+        self,
+        extractor: Any,
+        cache: ExtractionCache,
+        registry: Optional[SchemaRegistry] = None,
+        pipeline: Optional[Dict[str, Any]] = None,
+    ):
+        """Initialize the cached extractor.
+
+        Args:
+            extractor: Wrapped extractor (OpenAIExtractor or GeminiExtractor)
+            cache: Shared extraction cache
+            registry: Schema registry providing version fingerprints
+            pipeline: Settings of the wrapped layers that change the result
+                (e.g. {"chunking": {...}}); part of every cache key, so results
+                built under other settings are not served from the disk tier
+        """
+        super().__init__(extractor)
+        self.cache = cache
+        self.registry = registry or get_schema_registry()
+        self.pipeline = pipeline_digest(pipeline or {})
+
+    def _lookup_key(self, transcript_input: TranscriptInput) -> Tuple[str, Any]:
+        artifacts = self.registry.get(transcript_input.schema_version)
+        self.cache.check_fingerprint(artifacts.version, artifacts.fingerprint)
+        key = make_cache_key(
+            transcript_input, self.provider, self.model_name, artifacts.version, artifacts.fingerprint, self.pipeline
+        )
+        return key, artifacts
+
+    def _count_lookup(self, version: str, hit: bool) -> None:
+        metrics.cache_lookups.inc(self.provider, self.model_name, version, "hit" if hit else "miss")
+
+    async def extract(self, transcript_input: TranscriptInput) -> Dict[str, Any]:
+        """Extract medical entities, serving repeated requests from the cache."""
+        key, artifacts = self._lookup_key(transcript_input)
+
+        cached = await asyncio.to_thread(self.cache.get, key, artifacts.fingerprint)
+        self._count_lookup(artifacts.version, cached is not None)
+        if cached is not None:
+            logger.info(f"Extraction cache hit ({key[:12]})")
+            return cached
+
+        with collect_producers() as producers:
+            result = await self.extractor.extract(transcript_input)
+        store_key = self._producer_key(transcript_input, key, artifacts, producers)
+        if store_key is not None and not result.get("partial"):
+            # Truncated, repaired answers are not cached: a later request may get the full answer
+            await asyncio.to_thread(self.cache.set, store_key, result, artifacts.version, artifacts.fingerprint)
+        return result
+
+    def _producer_key(
+        self, transcript_input: TranscriptInput, key: str, artifacts: Any, producers: Set[Tuple[str, str]]
+    ) -> Optional[str]:
+        """Cache key of the provider and model that produced a result, or None to not cache it.
+
+        An answer won by a hedge's secondary (or a fallback) is stored under
+        that provider's key, not the primary's; a result mixing providers
+        (chunk windows answered by different ones) is not cached.
+        """
+        others = producers - {(self.provider, self.model_name)}
+        if not others:
+            return key
+        if len(producers) > 1:
+            logger.info(f"Not caching a result produced by several providers: {sorted(producers)}")
+            return None
+        provider, model = next(iter(others))
+        return make_cache_key(
+            transcript_input, provider, model, artifacts.version, artifacts.fingerprint, self.pipeline
+        )
+
+    async def extract_stream(self, transcript_input: TranscriptInput) -> AsyncIterator[str]:
+        """Stream the JSON answer; cache hits are replayed as a single chunk.
+
+        The raw answer is not cached here: ``finish_stream`` caches the
+        post-processed result.
+        """
+        key, artifacts = self._lookup_key(transcript_input)
+
+        cached = await asyncio.to_thread(self.cache.get_serialized, key, artifacts.fingerprint)
+        self._count_lookup(artifacts.version, cached is not None)
+        if cached is not None:
+            logger.info(f"Extraction cache hit ({key[:12]})")
+            yield cached
+            return
+
+        async for chunk in self.extractor.extract_stream(transcript_input):
+            yield chunk
+
+    async def finish_stream(self, transcript_input: TranscriptInput, response_text: str) -> Dict[str, Any]:
+        """Parse a finished stream and cache the result, as extract() would.
+
+        A cache hit replayed by extract_stream is already a finished result
+        and is returned as stored.
+        """
+        key, artifacts = self._lookup_key(transcript_input)
+        cached = await asyncio.to_thread(self.cache.peek, key)
+        if cached is not None and cached == response_text:
+            return fast_json.loads(cached)
+
+        result = await self.extractor.finish_stream(transcript_input, response_text)
+        if not result.get("partial"):
+            await asyncio.to_thread(self.cache.set, key, result, artifacts.version, artifacts.fingerprint)
+        return result
+
+
+@lru_cache
+def get_result_cache() -> ExtractionCache:
+    """Get the process-wide extraction result cache built from settings."""
+    settings = get_settings()
+    disk = None
+    if settings.cache_db_path:
+        disk = SQLiteResultStore(
+            path=settings.cache_db_path,
+            ttl_seconds=settings.cache_ttl_seconds,
+            max_bytes=settings.cache_max_bytes,
+        )
+    return ExtractionCache(MemoryLRUCache(settings.cache_max_entries), disk)
@@ -0,0 +1,217 @@
+"""Retry policy shared by the provider extractors.
+
+Transient provider errors (429, 5xx, connection problems) and truncated or
+invalid JSON answers are retried with exponential backoff and full jitter,
+honoring Retry-After headers. Each logical request has a retry budget
+(attempts and total time), and every retry also needs a token from the
+process-wide RetryRateLimiter, which caps retries to a fraction of recent
+requests so retries cannot amplify an overload.
+"""
+
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+class InvalidResponseError(ValueError):
+    """The provider answered with truncated or otherwise invalid JSON."""
+
+
+def parse_retry_after(headers: Any) -> Optional[float]:
+    """Seconds to wait according to Retry-After / retry-after-ms response headers.
+
+    Args:
+        headers: Response headers (any mapping with case-insensitive get)
+
+    Returns:
+        Delay in seconds, or None if no usable header is present
+    """
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000.0)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RetryRateLimiter:
+    """Process-wide cap on retries relative to recent requests."""
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 0.5, window_seconds: float = 10.0):
+        """Initialize the limiter.
+
+        Args:
+            ratio: Retries allowed per request within the window
+            min_per_second: Retries always allowed per second, even at low traffic
+            window_seconds: Length of the sliding window
+        """
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window_seconds = window_seconds
+        self._requests: "deque[float]" = deque()
+        self._retries: "deque[float]" = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        for events in (self._requests, self._retries):
+            while events and events[0] < cutoff:
+                events.popleft()
+
+    def record_request(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            self._requests.append(now)
+
+    def try_acquire(self) -> bool:
+        """Take a retry token; False if retries are currently capped."""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            allowed = max(self.min_per_second * self.window_seconds, self.ratio * len(self._requests))
+            if len(self._retries) >= allowed:
+                return False
+            self._retries.append(now)
+            return True
+
+
+class RetryStats:
+    """Retry counters for /api/retries/stats."""
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.exhausted = 0
+        self.reasons: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, field: str, reason: Optional[str] = None) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+            if reason:
+                self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "retry_rate": round(self.retries / self.requests, 4) if self.requests else 0.0,
+            "throttled": self.throttled,
+            "exhausted": self.exhausted,
+            "reasons": dict(self.reasons),
+        }
+
+
+retry_rate_limiter = RetryRateLimiter()
+retry_stats = RetryStats()
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, Retry-After and a per-request budget."""
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay_seconds: float = 0.5,
+        max_delay_seconds: float = 20.0,
+        budget_seconds: float = 60.0,
+        limiter: Optional[RetryRateLimiter] = None,
+        stats: Optional[RetryStats] = None,
+    ):
+        """Initialize the retry policy.
+
+        Args:
+            max_attempts: Attempts per request including the first one (1 disables retries)
+            base_delay_seconds: Backoff cap of the first retry
+            max_delay_seconds: Upper bound of a single backoff
+            budget_seconds: Total time a request may spend, no retry starts after that
+            limiter: Global retry-rate cap (defaults to the process-wide limiter)
+            stats: Retry counters (defaults to the process-wide retry_stats)
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.budget_seconds = budget_seconds
+        self.limiter = limiter or retry_rate_limiter
+        self.stats = stats or retry_stats
+
+    def backoff(self, retry: int, retry_after: Optional[float] = None) -> float:
+        """Delay before the given retry (1-based): full jitter, at least Retry-After."""
+        cap = min(self.max_delay_seconds, self.base_delay_seconds * (2 ** (retry - 1)))
+        delay = random.uniform(0, cap)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    async def run(
+        self,
+        call: Callable[[int], Awaitable[T]],
+        classify: Callable[[BaseException], Tuple[Optional[str], Optional[float]]],
+        name: str = "request",
+        on_retry: Optional[Callable[[str], None]] = None,
+    ) -> T:
+        """Run ``call(attempt)`` until it succeeds or the error is not worth retrying.
+
+        Args:
+            call: Coroutine function receiving the 0-based attempt number
+            classify: Maps an exception to (retry reason or None if not retryable, Retry-After seconds)
+            name: Label used in log messages
+            on_retry: Called with the reason of every retry
+        """
+        started = time.monotonic()
+        self.stats.record("requests")
+        self.limiter.record_request()
+        attempt = 0
+        while True:
+            try:
+                return await call(attempt)
+            except Exception as e:
+                reason, retry_after = classify(e)
+                if reason is None:
+                    raise
+                attempt += 1
+                if attempt >= self.max_attempts:
+                    self.stats.record("exhausted")
+                    logger.error(f"{name} failed after {attempt} attempts ({reason})")
+                    raise
+                delay = self.backoff(attempt, retry_after)
+                if time.monotonic() - started + delay > self.budget_seconds:
+                    self.stats.record("exhausted")
+                    logger.error(f"{name} retry budget exhausted ({reason}, next delay {delay:.1f}s)")
+                    raise
+                if not self.limiter.try_acquire():
+                    self.stats.record("throttled")
+                    logger.warning(f"{name} not retried ({reason}): global retry rate cap reached")
+                    raise
+                self.stats.record("retries", reason)
+                if on_retry is not None:
+                    on_retry(reason)
+                logger.warning(f"{name} failed ({reason}), retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
@@ -0,0 +1,107 @@
+"""Server-sent-events streaming of extraction results.
+
+Feeds the extractor's token stream into the incremental JSON parser and turns
+every completed document field and references entry into an SSE event, so the
+client can render results while the model is still writing.
+
+Event sequence:
+- ``field``: {"name": <document field>, "value": <value>}
+- ``reference``: {"index": <n>, "field_name", "value", "source_segments"}
+  (not sent with REFERENCES_MODE=local: the aligned references are in ``done``)
+- ``metrics``: time to first token/field and total time, in milliseconds
+- ``done``: the full result, parsed and post-processed by the extractor
+  chain (``finish_stream``) like POST /api/extract; repaired and marked
+  partial if the answer was truncated
+- ``error``: {"status_code", "detail"} if the extraction fails
+"""
+
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Tuple
+
+from backend.models.transcript import TranscriptInput
+from backend.services import fast_json
+from backend.services.batch import error_status_code
+from backend.services.json_stream import EVENT_FIELD, IncrementalJSONParser
+from backend.services.latency import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingStats:
+    """Rolling time-to-first-token / time-to-first-field / total latency stats."""
+
+    def __init__(self, maxlen: int = 500):
+        self.time_to_first_token = LatencyWindow(maxlen)
+        self.time_to_first_field = LatencyWindow(maxlen)
+        self.total = LatencyWindow(maxlen)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "time_to_first_token": self.time_to_first_token.snapshot(),
+            "time_to_first_field": self.time_to_first_field.snapshot(),
+            "total": self.total.snapshot(),
+        }
+
+
+streaming_stats = StreamingStats()
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+async def stream_extraction_events(
+    extractor: Any, transcript_input: TranscriptInput
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Run a streaming extraction, yielding (event name, data) pairs."""
+    start = time.perf_counter()
+    first_token_at = None
+    first_field_at = None
+    parser = IncrementalJSONParser()
+    chunks = []
+
+    try:
+        async for chunk in extractor.extract_stream(transcript_input):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            chunks.append(chunk)
+            for event in parser.feed(chunk):
+                if first_field_at is None:
+                    first_field_at = time.perf_counter()
+                if event.kind == EVENT_FIELD:
+                    yield "field", {"name": event.key, "value": event.value}
+                else:
+                    data = {"index": event.key}
+                    if isinstance(event.value, dict):
+                        data.update(event.value)
+                    yield "reference", data
+
+        # Parsed and post-processed by the extractor chain, like an extract() answer
+        result = await extractor.finish_stream(transcript_input, "".join(chunks))
+    except Exception as e:
+        logger.error(f"Streaming extraction failed: {type(e).__name__}: {e}")
+        yield "error", {"status_code": error_status_code(e), "detail": str(e)}
+        return
+
+    total = time.perf_counter() - start
+    metrics = {"total_ms": _ms(total), "time_to_first_token_ms": None, "time_to_first_field_ms": None}
+    streaming_stats.total.record(total)
+    if first_token_at is not None:
+        metrics["time_to_first_token_ms"] = _ms(first_token_at - start)
+        streaming_stats.time_to_first_token.record(first_token_at - start)
+    if first_field_at is not None:
+        metrics["time_to_first_field_ms"] = _ms(first_field_at - start)
+        streaming_stats.time_to_first_field.record(first_field_at - start)
+    logger.info(
+        f"Streaming extraction finished: first field after {metrics['time_to_first_field_ms']} ms, "
+        f"total {metrics['total_ms']} ms"
+    )
+
+    yield "metrics", metrics
+    yield "done", result
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {fast_json.dumps_str(data)}\n\n"
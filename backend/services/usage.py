@@ -0,0 +1,111 @@
+"""Token usage reported by the LLM providers.
+
+Extractors call ``record_usage`` with the usage metadata of every response,
+including the number of prompt tokens served from the provider's prompt
+cache. Totals and latency split by prompt-cache hit/miss are kept in
+``usage_stats``; callers that need the usage of one request wrap it in
+``collect_usage()``.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from backend.services import metrics
+from backend.services.latency import LatencyWindow
+
+
+@dataclass
+class LLMUsage:
+    """Usage of one LLM call."""
+
+    provider: str
+    model: str
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+    latency_seconds: Optional[float] = None  # Time to first token when streaming, else total
+    streamed: bool = False
+    schema_version: str = ""
+    duration_seconds: Optional[float] = None  # Whole call including streaming (None: latency_seconds)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+_collected: ContextVar[Tuple[List[LLMUsage], ...]] = ContextVar("llm_usage", default=())
+
+
+class UsageStats:
+    """Process-wide token totals and latency split by prompt-cache hit/miss."""
+
+    def __init__(self, maxlen: int = 500):
+        self.calls = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.output_tokens = 0
+        self.cache_hit_latency = LatencyWindow(maxlen)
+        self.cache_miss_latency = LatencyWindow(maxlen)
+        self._lock = threading.Lock()
+
+    def record(self, usage: LLMUsage) -> None:
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += usage.input_tokens
+            self.cached_tokens += usage.cached_tokens
+            self.output_tokens += usage.output_tokens
+        if usage.latency_seconds is not None:
+            window = self.cache_hit_latency if usage.cached_tokens > 0 else self.cache_miss_latency
+            window.record(usage.latency_seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "input_tokens": self.input_tokens,
+            "cached_tokens": self.cached_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_ratio": round(self.cached_tokens / self.input_tokens, 4) if self.input_tokens else 0.0,
+            "latency_prompt_cache_hit": self.cache_hit_latency.snapshot(),
+            "latency_prompt_cache_miss": self.cache_miss_latency.snapshot(),
+        }
+
+
+usage_stats = UsageStats()
+
+
+def record_usage(usage: LLMUsage) -> None:
+    """Record the usage of one LLM call globally, in the metrics and in the active collector."""
+    usage_stats.record(usage)
+    metrics.observe_usage(usage)
+    for collected in _collected.get():
+        collected.append(usage)
+
+
+@contextmanager
+def collect_usage() -> Iterator[List[LLMUsage]]:
+    """Collect the usage of all LLM calls made inside the block (including child tasks).
+
+    Collectors nest: a call is recorded in every enclosing collector.
+    """
+    collected: List[LLMUsage] = []
+    token = _collected.set(_collected.get() + (collected,))
+    try:
+        yield collected
+    finally:
+        try:
+            _collected.reset(token)
+        except ValueError:
+            # Left in another context (a streaming generator resumed by another task)
+            _collected.set(tuple(c for c in _collected.get() if c is not collected))
+
+
+def summarize_usage(usages: List[LLMUsage]) -> Dict[str, int]:
+    """Sum the token counts of several LLM calls."""
+    return {
+        "calls": len(usages),
+        "input_tokens": sum(u.input_tokens for u in usages),
+        "cached_tokens": sum(u.cached_tokens for u in usages),
+        "output_tokens": sum(u.output_tokens for u in usages),
+    }
@@ -0,0 +1,373 @@
+"""Append-only ledger of the tokens, cost and time of every extraction.
+
+``LedgerExtractor`` wraps the result cache: each extraction
+(served by the provider or by the result cache, succeeded or failed) is
+appended to a local SQLite file with the provider usage collected for it
+(prompt, prompt-cached and completion tokens over all LLM calls, including
+retries, chunks and hedges), the wall time and the estimated cost.
+
+The output tokens are also attributed to the fields of the answer: every
+top-level document key and the references array is tokenized
+(``estimate_tokens`` of its ``"key": value`` JSON) and gets its share of the
+completion tokens. The shares are estimates. Only what the model wrote is
+counted: extractions without LLM calls (result cache hits) get no field
+rows, and references aligned locally (REFERENCES_MODE=local) as well as the
+values and references filled by vitals pre-extraction are left out.
+
+``UsageLedger.summary`` aggregates the ledger by day, provider, model,
+schema version and field (GET /api/usage/ledger, scripts/usage_ledger_report.py).
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple
+
+from backend.config import get_settings
+from backend.models.transcript import TranscriptInput
+from backend.prompts.token_estimate import estimate_tokens
+from backend.schemas.registry import SchemaRegistry, get_schema_registry
+from backend.services import fast_json
+from backend.services.extractor_wrapper import ExtractorWrapper, collect_producers
+from backend.services.usage import LLMUsage, collect_usage, summarize_usage
+from backend.services.vitals import LocalFill, collect_local_fill
+
+logger = logging.getLogger(__name__)
+
+STATUS_OK = "ok"
+STATUS_PARTIAL = "partial"
+STATUS_ERROR = "error"
+
+REFERENCES_FIELD = "references"
+GROUP_COLUMNS = ("day", "provider", "model", "schema_version", "field")
+
+
+def field_token_estimates(
+    result: Dict[str, Any], references: bool = True, local_fill: Optional[LocalFill] = None
+) -> Dict[str, int]:
+    """Estimated output tokens of every top-level document key and of the references array.
+
+    Args:
+        result: Extraction answer with 'document' (and 'references')
+        references: Whether the references were written by the model
+        local_fill: Values and references entries filled without the model (left out)
+
+    Returns:
+        Field name -> estimated tokens of its ``"name": value`` JSON
+    """
+    local_fill = local_fill or LocalFill()
+    fields = {
+        name: value for name, value in (result.get("document") or {}).items() if name not in local_fill.values
+    }
+    if references and REFERENCES_FIELD in result:
+        fields[REFERENCES_FIELD] = [
+            ref for ref in result[REFERENCES_FIELD]
+            if not (isinstance(ref, dict) and ref.get("field_name") in local_fill.references)
+        ]
+    return {
+        name: estimate_tokens(fast_json.dumps_str({name: value})[1:-1])
+        for name, value in fields.items()
+    }
+
+
+def usage_cost(usages: Sequence[LLMUsage], prices: Dict[str, List[float]]) -> Optional[float]:
+    """Cost in USD of LLM calls, or None if a model has no configured price.
+
+    Args:
+        usages: Usage of the LLM calls
+        prices: Model -> [input, cached input, output] USD per million tokens
+    """
+    cost = 0.0
+    for usage in usages:
+        price = prices.get(usage.model)
+        if price is None:
+            return None
+        input_price, cached_price, output_price = price
+        cost += (
+            (usage.input_tokens - usage.cached_tokens) * input_price
+            + usage.cached_tokens * cached_price
+            + usage.output_tokens * output_price
+        ) / 1_000_000
+    return round(cost, 8)
+
+
+def _day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).date().isoformat()
+
+
+class UsageLedger:
+    """SQLite ledger of extractions and the attributed output tokens per field."""
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS extractions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at REAL NOT NULL,
+                day TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                schema_version TEXT NOT NULL,
+                status TEXT NOT NULL,
+                streamed INTEGER NOT NULL,
+                segments INTEGER NOT NULL,
+                llm_calls INTEGER NOT NULL,
+                input_tokens INTEGER NOT NULL,
+                cached_tokens INTEGER NOT NULL,
+                output_tokens INTEGER NOT NULL,
+                duration_ms REAL NOT NULL,
+                cost_usd REAL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS field_tokens (
+                extraction_id INTEGER NOT NULL REFERENCES extractions(id),
+                field TEXT NOT NULL,
+                estimated_tokens INTEGER NOT NULL,
+                output_tokens REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_extractions_day ON extractions(day)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_field_tokens_extraction ON field_tokens(extraction_id)")
+        self._conn.commit()
+
+    def append(
+        self,
+        entry: Dict[str, Any],
+        field_tokens: Optional[Dict[str, int]] = None,
+    ) -> int:
+        """Append one extraction; its output tokens are split over the fields by their estimated share.
+
+        Args:
+            entry: Column values of the extractions table (created_at defaults to now)
+            field_tokens: Field name -> estimated output tokens
+
+        Returns:
+            Id of the ledger entry
+        """
+        created_at = entry.get("created_at") or time.time()
+        row = {**entry, "created_at": created_at, "day": _day(created_at)}
+        columns = (
+            "created_at", "day", "provider", "model", "schema_version", "status", "streamed", "segments",
+            "llm_calls", "input_tokens", "cached_tokens", "output_tokens", "duration_ms", "cost_usd",
+        )
+        field_tokens = field_tokens or {}
+        estimated_total = sum(field_tokens.values())
+        with self._lock:
+            extraction_id = self._conn.execute(
+                f"INSERT INTO extractions ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                tuple(row.get(c) for c in columns),
+            ).lastrowid
+            self._conn.executemany(
+                "INSERT INTO field_tokens (extraction_id, field, estimated_tokens, output_tokens) VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        extraction_id,
+                        name,
+                        tokens,
+                        row["output_tokens"] * tokens / estimated_total if estimated_total else 0.0,
+                    )
+                    for name, tokens in field_tokens.items()
+                ],
+            )
+            self._conn.commit()
+        return extraction_id
+
+    def summary(
+        self,
+        group_by: Sequence[str] = ("day",),
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Aggregate the ledger.
+
+        Grouped by field, every row reports the estimated and attributed
+        output tokens of the field and its share of the output of the group;
+        otherwise extractions, token totals, cost and mean wall time.
+
+        Args:
+            group_by: Any of day, provider, model, schema_version, field
+            since: First day included (YYYY-MM-DD, UTC)
+            until: Last day included (YYYY-MM-DD, UTC)
+
+        Raises:
+            ValueError: If a group column is unknown
+        """
+        unknown = [c for c in group_by if c not in GROUP_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown ledger group {unknown} (expected any of {GROUP_COLUMNS})")
+        conditions, params = [], []
+        if since:
+            conditions.append("e.day >= ?")
+            params.append(since)
+        if until:
+            conditions.append("e.day <= ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        if "field" not in group_by:
+            keys = [f"e.{c}" for c in group_by]
+            select = "".join(f"{k}, " for k in keys)
+            group = f"GROUP BY {', '.join(keys)} ORDER BY {', '.join(keys)}" if keys else ""
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT {select}COUNT(*) AS extractions, "
+                    f"SUM(e.status = '{STATUS_ERROR}') AS errors, SUM(e.llm_calls = 0) AS cached_results, "
+                    f"SUM(e.llm_calls) AS llm_calls, SUM(e.input_tokens) AS input_tokens, "
+                    f"SUM(e.cached_tokens) AS cached_tokens, SUM(e.output_tokens) AS output_tokens, "
+                    f"ROUND(SUM(e.cost_usd), 6) AS cost_usd, SUM(e.cost_usd IS NULL) AS unpriced, "
+                    f"ROUND(AVG(e.duration_ms), 1) AS mean_duration_ms "
+                    f"FROM extractions e {where} {group}",
+                    params,
+                ).fetchall()
+            return [dict(row) for row in rows if row["extractions"]]
+
+        keys = [f"e.{c}" if c != "field" else "f.field" for c in group_by]
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(keys)}, COUNT(*) AS extractions, "
+                f"SUM(f.estimated_tokens) AS estimated_tokens, SUM(f.output_tokens) AS output_tokens "
+                f"FROM field_tokens f JOIN extractions e ON e.id = f.extraction_id {where} "
+                f"GROUP BY {', '.join(keys)}",
+                params,
+            ).fetchall()
+        # Share of each field in the output of its group (same values of the other columns)
+        results = [dict(row) for row in rows]
+        others = [c for c in group_by if c != "field"]
+        totals: Dict[tuple, float] = {}
+        for row in results:
+            group_key = tuple(row[c] for c in others)
+            totals[group_key] = totals.get(group_key, 0.0) + row["output_tokens"]
+        for row in results:
+            total = totals[tuple(row[c] for c in others)]
+            row["output_tokens"] = round(row["output_tokens"], 1)
+            row["output_share"] = round(row["output_tokens"] / total, 4) if total else 0.0
+        results.sort(key=lambda r: (tuple(r[c] for c in others), -r["output_tokens"], -r["estimated_tokens"]))
+        return results
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class LedgerExtractor(ExtractorWrapper):
+    """Extractor wrapper appending every extraction to the usage ledger."""
+
+    def __init__(
+        self,
+        extractor: Any,
+        ledger: UsageLedger,
+        prices: Optional[Dict[str, List[float]]] = None,
+        registry: Optional[SchemaRegistry] = None,
+    ):
+        """Initialize the ledger wrapper.
+
+        Args:
+            extractor: Wrapped extractor
+            ledger: Ledger the extractions are appended to
+            prices: Model -> [input, cached input, output] USD per million tokens
+            registry: Schema registry (resolves the default schema version)
+        """
+        super().__init__(extractor)
+        self.ledger = ledger
+        self.prices = prices or {}
+        self.registry = registry or get_schema_registry()
+
+    async def extract(self, transcript_input: TranscriptInput) -> Dict[str, Any]:
+        """Extract medical entities and record the usage of the extraction."""
+        started = time.perf_counter()
+        result = None
+        with collect_usage() as usages, collect_local_fill() as local_fill, collect_producers() as producers:
+            try:
+                result = await self.extractor.extract(transcript_input)
+                return result
+            finally:
+                await self._record(
+                    transcript_input, usages, started, result, streamed=False, local_fill=local_fill, producers=producers
+                )
+
+    async def extract_stream(self, transcript_input: TranscriptInput) -> AsyncIterator[str]:
+        """Stream the JSON answer and record the usage once the stream ends."""
+        started = time.perf_counter()
+        chunks: List[str] = []
+        result = None
+        with collect_usage() as usages:
+            try:
+                async for chunk in self.extractor.extract_stream(transcript_input):
+                    chunks.append(chunk)
+                    yield chunk
+                try:
+                    result = fast_json.loads("".join(chunks))
+                except fast_json.JSONDecodeError:
+                    # Truncated stream: the usage is recorded, without field attribution
+                    result = {"partial": True}
+            finally:
+                await self._record(transcript_input, usages, started, result, streamed=True)
+
+    async def _record(
+        self,
+        transcript_input: TranscriptInput,
+        usages: List[LLMUsage],
+        started: float,
+        result: Optional[Dict[str, Any]],
+        streamed: bool,
+        local_fill: Optional[LocalFill] = None,
+        producers: Optional[Set[Tuple[str, str]]] = None,
+    ) -> None:
+        """Append the extraction to the ledger; failures to write are logged, never raised.
+
+        The entry names the provider and model that produced the answer (e.g.
+        a hedge's secondary); answers mixing providers keep the chain's own.
+        """
+        try:
+            artifacts = self.registry.get(transcript_input.schema_version)
+            totals = summarize_usage(usages)
+            if result is None:
+                status = STATUS_ERROR
+            else:
+                status = STATUS_PARTIAL if result.get("partial") else STATUS_OK
+            provider, model = self.provider, self.model_name
+            if producers and len(producers) == 1:
+                provider, model = next(iter(producers))
+            entry = {
+                "provider": provider,
+                "model": model,
+                "schema_version": artifacts.version,
+                "status": status,
+                "streamed": int(streamed),
+                "segments": len(transcript_input.transcript),
+                "llm_calls": totals["calls"],
+                "input_tokens": totals["input_tokens"],
+                "cached_tokens": totals["cached_tokens"],
+                "output_tokens": totals["output_tokens"],
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                "cost_usd": usage_cost(usages, self.prices),
+            }
+            fields = {}
+            if result and "document" in result and totals["calls"]:
+                # Cache hits have no output tokens to attribute
+                fields = field_token_estimates(result, artifacts.references, local_fill)
+            await asyncio.to_thread(self.ledger.append, entry, fields)
+        except Exception as e:
+            logger.warning(f"Usage ledger write failed: {e}")
+
+
+@lru_cache
+def get_usage_ledger() -> UsageLedger:
+    """Get the process-wide usage ledger at LEDGER_DB_PATH."""
+    return UsageLedger(get_settings().ledger_db_path)
@@ -0,0 +1,381 @@
+"""Deterministic pre-extraction of vital signs and body measurements.
+
+Blood pressure, pulse, breathing rate, saturation, temperature, weight,
+height and BMI are usually dictated in a few fixed Lithuanian phrasings
+("kraujospūdis 120 ant 80, pulsas 69"). One compiled pattern scans every
+segment once and fills these scalar fields with exact segment references,
+so the model does not have to copy them out:
+
+- ``remove`` mode leaves the fields out of the schema sent to the model
+  (a schema variant compiled once per version, so prompt caching still
+  works); the values come from the patterns only.
+- ``confirm`` mode gives the model the values to confirm or correct; the
+  model no longer writes their references entries.
+
+A measurement stated several times keeps the latest value. Numbers spoken
+as words are not recognized (in ``confirm`` mode the model still finds them).
+
+``collect_local_fill`` reports which values and references entries of an
+answer were filled here rather than written by the model (the usage ledger
+leaves them out of the output token attribution).
+"""
+
+import logging
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from backend.models.transcript import PreExtraction, TranscriptInput, TranscriptSegment
+from backend.prompts.token_estimate import estimate_tokens
+from backend.schemas.registry import SchemaRegistry, get_schema_registry
+from backend.services import fast_json
+from backend.services.extractor_wrapper import ExtractorWrapper
+
+logger = logging.getLogger(__name__)
+
+MODE_OFF = "off"
+MODE_REMOVE = "remove"
+MODE_CONFIRM = "confirm"
+MODES = (MODE_OFF, MODE_REMOVE, MODE_CONFIRM)
+
+VITAL_FIELDS = (
+    "systolic_bp", "diastolic_bp", "pulse", "breathing_rate", "saturation",
+    "temperature", "weight", "height", "bmi",
+)
+
+# Plausible ranges; values outside are ignored
+_RANGES = {
+    "systolic_bp": (60, 260),
+    "diastolic_bp": (30, 160),
+    "pulse": (25, 250),
+    "breathing_rate": (5, 70),
+    "saturation": (50, 100),
+    "temperature": (33.0, 43.5),
+    "weight": (1.0, 350.0),
+    "height": (40, 230),
+    "bmi": (10.0, 80.0),
+}
+_INTEGER_FIELDS = {"systolic_bp", "diastolic_bp", "pulse", "breathing_rate", "saturation", "height"}
+
+# A keyword mentioned without a value (e.g. "pamatuosiu temperatūrą") lets a
+# bare value in one of the next segments count ("Šiuo metu 36,6.")
+CONTEXT_SEGMENTS = 3
+
+_GAP = r"\D{0,25}?"
+_DECIMAL = r"\d{1,3}(?:[.,]\d{1,2})?"
+_BP_KEYWORD = r"kraujosp[ūu]d\w*|kraujo\s+spaud\w*|\bAKS\b"
+_TEMPERATURE_KEYWORD = r"temperat[ūu]r\w*|\btemp\b"
+
+_PATTERNS = [
+    ("bp", rf"(?:{_BP_KEYWORD}){_GAP}(?P<bp_s>\d{{2,3}})\s*(?:/|per|ant)\s*(?P<bp_d>\d{{2,3}})\b"),
+    ("bp_slash", r"\b(?P<bps_s>\d{2,3})\s*/\s*(?P<bps_d>\d{2,3})\b(?!\s*/)"),
+    ("bp_bare", r"\b(?P<bpb_s>\d{2,3})\s+(?:per|ant)\s+(?P<bpb_d>\d{2,3})\b"),
+    ("bp_keyword", _BP_KEYWORD),
+    ("pulse", rf"(?:\bpuls\w*|\bŠSD\b|širdies\s+susitraukim\w*(?:\s+dažn\w*)?){_GAP}(?P<pulse_v>\d{{2,3}})\b"),
+    ("breathing_rate", rf"(?:kvėpavim\w*\s+dažn\w*|\bKD\b|kvėpuoja){_GAP}(?P<breathing_rate_v>\d{{1,2}})\b"),
+    ("saturation", rf"(?:satur\w*|\bSpO\s?2|\bSpO₂){_GAP}(?P<saturation_v>\d{{2,3}})\b"),
+    ("temperature", rf"(?:{_TEMPERATURE_KEYWORD}){_GAP}(?P<temperature_v>\d{{2}}(?:[.,]\d{{1,2}})?)\b"),
+    ("temperature_bare", r"\b(?P<temperature_b>(?:3[3-9]|4[0-3])[.,]\d)\b"),
+    ("temperature_keyword", _TEMPERATURE_KEYWORD),
+    ("bmi", rf"(?:\bKMI\b|kūno\s+masės\s+indeks\w*){_GAP}(?P<bmi_v>\d{{2}}(?:[.,]\d{{1,2}})?)\b"),
+    ("weight", rf"(?:\bsver\w*|\bsvor\w*|kūno\s+mas\w*){_GAP}(?P<weight_v>{_DECIMAL})\b"),
+    ("height", rf"\bū[gk]\w*{_GAP}(?P<height_v>\d{{3}}|[12][.,]\d{{1,2}})\b"),
+]
+_SCANNER = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in _PATTERNS), re.IGNORECASE)
+
+
+@dataclass
+class VitalMatch:
+    """A value found by the patterns, with the segments it was read from."""
+
+    field: str
+    value: Any
+    source_segments: List[int]
+
+
+def _number(text: str, field: str) -> Optional[Any]:
+    value = float(text.replace(",", "."))
+    if field == "height" and value < 3:
+        value *= 100  # metres -> cm
+    low, high = _RANGES[field]
+    if not low <= value <= high:
+        return None
+    if field in _INTEGER_FIELDS or value.is_integer():
+        return int(round(value))
+    return value
+
+
+def pre_extract_vitals(
+    segments: Sequence[TranscriptSegment],
+    fields: Sequence[str] = VITAL_FIELDS,
+    offset: int = 0,
+    start: int = 0,
+) -> Dict[str, VitalMatch]:
+    """Scan all segments once and return the latest value per vital field.
+
+    Args:
+        segments: Transcript segments
+        fields: Fields to fill (those present in the schema version)
+        offset: Global index of the first segment (incremental extraction)
+        start: Segments before this local index are context only: their
+            keywords count, their values are not reported again
+    """
+    wanted = set(fields)
+    found: Dict[str, VitalMatch] = {}
+    keyword_seen: Dict[str, int] = {}  # "bp"/"temperature" -> segment index of a value-less mention
+
+    def put(field: str, raw: str, segment_indices: List[int]) -> None:
+        if field not in wanted:
+            return
+        value = _number(raw, field)
+        if value is not None:
+            found[field] = VitalMatch(field, value, segment_indices)
+
+    def context_segment(kind: str, index: int) -> Optional[int]:
+        seen = keyword_seen.get(kind)
+        return seen if seen is not None and index - seen <= CONTEXT_SEGMENTS else None
+
+    for local_index, segment in enumerate(segments):
+        index = offset + local_index
+        reported = local_index >= start
+        for m in _SCANNER.finditer(segment.text):
+            kind = m.lastgroup
+            if kind in ("bp_keyword", "temperature_keyword"):
+                keyword_seen[kind.split("_")[0]] = index
+                continue
+            if not reported:
+                continue
+            if kind in ("bp", "bp_slash", "bp_bare"):
+                prefix = {"bp": "bp", "bp_slash": "bps", "bp_bare": "bpb"}[kind]
+                sources = [index]
+                if kind == "bp_bare":
+                    seen = context_segment("bp", index)
+                    if seen is None:
+                        continue
+                    sources = sorted({seen, index})
+                systolic = _number(m.group(f"{prefix}_s"), "systolic_bp")
+                diastolic = _number(m.group(f"{prefix}_d"), "diastolic_bp")
+                if systolic is None or diastolic is None or diastolic >= systolic:
+                    continue
+                put("systolic_bp", m.group(f"{prefix}_s"), sources)
+                put("diastolic_bp", m.group(f"{prefix}_d"), sources)
+            elif kind == "temperature_bare":
+                seen = context_segment("temperature", index)
+                if seen is not None:
+                    put("temperature", m.group("temperature_b"), sorted({seen, index}))
+            else:
+                put(kind, m.group(f"{kind}_v"), [index])
+    return found
+
+
+def reference_entries(matches: Dict[str, VitalMatch]) -> List[Dict[str, Any]]:
+    """References entries for pre-extracted values (same shape the model writes)."""
+    return [
+        {"field_name": m.field, "value": str(m.value), "source_segments": m.source_segments}
+        for m in matches.values()
+    ]
+
+
+def estimate_saved_output_tokens(
+    matches: Dict[str, VitalMatch], mode: str, removed_fields: Sequence[str] = ()
+) -> int:
+    """Output tokens the model no longer writes.
+
+    ``confirm``: the references entries of the found values. ``remove``: also
+    every removed field's document entry (found value or null).
+    """
+    saved = estimate_tokens(fast_json.dumps_str(reference_entries(matches))) if matches else 0
+    if mode == MODE_REMOVE and removed_fields:
+        entries = {name: matches[name].value if name in matches else None for name in removed_fields}
+        saved += estimate_tokens(fast_json.dumps_str(entries))
+    return saved
+
+
+class PreExtractionStats:
+    """Counters of the vitals pre-extraction stage for /api/vitals/stats."""
+
+    def __init__(self):
+        self.transcripts = 0
+        self.transcripts_with_values = 0
+        self.fields_filled: Dict[str, int] = {}
+        self.model_corrections = 0
+        self.output_tokens_saved = 0
+        self._lock = threading.Lock()
+
+    def record(self, matches: Dict[str, VitalMatch], corrections: int, tokens_saved: int) -> None:
+        with self._lock:
+            self.transcripts += 1
+            if matches:
+                self.transcripts_with_values += 1
+            for name in matches:
+                self.fields_filled[name] = self.fields_filled.get(name, 0) + 1
+            self.model_corrections += corrections
+            self.output_tokens_saved += tokens_saved
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "transcripts": self.transcripts,
+            "transcripts_with_values": self.transcripts_with_values,
+            "fields_filled": dict(self.fields_filled),
+            "model_corrections": self.model_corrections,
+            "output_tokens_saved": self.output_tokens_saved,
+            "output_tokens_saved_per_transcript": (
+                round(self.output_tokens_saved / self.transcripts, 1) if self.transcripts else 0.0
+            ),
+        }
+
+
+vitals_stats = PreExtractionStats()
+
+
+@dataclass
+class LocalFill:
+    """Parts of an answer filled by pre-extraction instead of the model."""
+
+    values: Set[str] = field(default_factory=set)  # Document fields the model did not write
+    references: Set[str] = field(default_factory=set)  # field_name of the references entries built here
+
+
+_local_fill: ContextVar[Optional[LocalFill]] = ContextVar("vitals_local_fill", default=None)
+
+
+@contextmanager
+def collect_local_fill() -> Iterator[LocalFill]:
+    """Collect the fields pre-extraction fills inside the block."""
+    local_fill = LocalFill()
+    token = _local_fill.set(local_fill)
+    try:
+        yield local_fill
+    finally:
+        _local_fill.reset(token)
+
+
+def _same_value(a: Any, b: Any) -> bool:
+    try:
+        return abs(float(a) - float(b)) < 1e-6
+    except (TypeError, ValueError):
+        return False
+
+
+class VitalsPreExtractor(ExtractorWrapper):
+    """Fills vital-sign fields from compiled patterns before (or instead of) the model.
+
+    Streaming extractions send the model the same pre-extracted values; they
+    are merged into the answer by ``finish_stream``.
+    """
+
+    def __init__(
+        self,
+        extractor: Any,
+        mode: str = MODE_CONFIRM,
+        registry: Optional[SchemaRegistry] = None,
+        stats: Optional[PreExtractionStats] = None,
+    ):
+        """Initialize the pre-extraction stage.
+
+        Args:
+            extractor: Extractor receiving the transcript with the pre-extracted values
+            mode: "remove" or "confirm"
+            registry: Schema registry (defaults to the process-wide registry)
+            stats: Counters (defaults to the process-wide vitals_stats)
+        """
+        if mode not in (MODE_REMOVE, MODE_CONFIRM):
+            raise ValueError(f"Unknown vitals pre-extraction mode: {mode}")
+        super().__init__(extractor)
+        self.mode = mode
+        self.registry = registry or get_schema_registry()
+        self.stats = stats or vitals_stats
+
+    def _pre_extract(self, transcript_input: TranscriptInput) -> Tuple[Dict[str, VitalMatch], Tuple[str, ...]]:
+        properties = self.registry.get(transcript_input.schema_version).document_schema.get("properties", {})
+        fields = tuple(name for name in VITAL_FIELDS if name in properties)
+        incremental = transcript_input.incremental
+        matches = pre_extract_vitals(
+            transcript_input.transcript,
+            fields,
+            offset=incremental.segment_offset if incremental else 0,
+            start=incremental.context_segments if incremental else 0,
+        )
+        return matches, fields
+
+    def _model_input(
+        self, transcript_input: TranscriptInput
+    ) -> Tuple[TranscriptInput, Dict[str, VitalMatch], Tuple[str, ...]]:
+        """The transcript sent to the model (with the pre-extracted values), the matches and the vital fields."""
+        matches, fields = self._pre_extract(transcript_input)
+        if self.mode == MODE_CONFIRM and not matches:
+            return transcript_input, matches, fields
+        pre_extraction = PreExtraction(
+            mode=self.mode,
+            values={name: m.value for name, m in matches.items()},
+            source_segments={name: m.source_segments for name, m in matches.items()},
+            removed_fields=fields if self.mode == MODE_REMOVE else (),
+        )
+        return transcript_input.with_pre_extraction(pre_extraction), matches, fields
+
+    async def extract(self, transcript_input: TranscriptInput) -> Dict[str, Any]:
+        """Extract medical entities with vital signs pre-filled from the transcript text."""
+        model_input, matches, fields = self._model_input(transcript_input)
+        result = await self.extractor.extract(model_input)
+        return self._merge(result, model_input, matches, fields)
+
+    async def extract_stream(self, transcript_input: TranscriptInput) -> AsyncIterator[str]:
+        """Stream the model's answer to the transcript with the pre-extracted values."""
+        model_input, _, _ = self._model_input(transcript_input)
+        async for chunk in self.extractor.extract_stream(model_input):
+            yield chunk
+
+    async def finish_stream(self, transcript_input: TranscriptInput, response_text: str) -> Dict[str, Any]:
+        """Parse a streamed answer and merge the pre-extracted values into it."""
+        model_input, matches, fields = self._model_input(transcript_input)
+        result = await self.extractor.finish_stream(model_input, response_text)
+        return self._merge(result, model_input, matches, fields)
+
+    def _merge(
+        self,
+        result: Dict[str, Any],
+        model_input: TranscriptInput,
+        matches: Dict[str, VitalMatch],
+        fields: Tuple[str, ...],
+    ) -> Dict[str, Any]:
+        """Fill the accepted pattern matches (values and references) into the model's answer."""
+        if self.mode == MODE_CONFIRM and not matches:
+            self.stats.record(matches, 0, 0)
+            return result
+        pre_extraction = model_input.pre_extraction
+
+        document = result.setdefault("document", {})
+        references = result.setdefault("references", [])
+
+        corrections = 0
+        accepted = {}
+        local_values = set(fields) if self.mode == MODE_REMOVE else set()
+        for name, match in matches.items():
+            model_value = document.get(name)
+            if self.mode == MODE_CONFIRM and model_value is not None and not _same_value(model_value, match.value):
+                # The model corrected the pattern match; keep its value and references
+                corrections += 1
+                logger.info(f"Model corrected pre-extracted {name}: {match.value} -> {model_value}")
+                continue
+            if model_value is None:
+                local_values.add(name)
+            document[name] = match.value
+            accepted[name] = match
+        if self.mode == MODE_REMOVE:
+            for name in fields:
+                document.setdefault(name, None)
+        local_fill = _local_fill.get()
+        if local_fill is not None:
+            local_fill.values.update(local_values)
+            local_fill.references.update(accepted)
+
+        result["references"] = [
+            ref for ref in references if not (isinstance(ref, dict) and ref.get("field_name") in accepted)
+        ] + reference_entries(accepted)
+
+        saved = estimate_saved_output_tokens(matches, self.mode, pre_extraction.removed_fields)
+        self.stats.record(matches, corrections, saved)
+        return result
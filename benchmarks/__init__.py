@@ -0,0 +1 @@
+"""Microbenchmarks for the extraction backend."""
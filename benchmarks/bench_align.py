@@ -0,0 +1,87 @@
+"""Microbenchmark of local reference alignment (REFERENCES_MODE=local).
+
+Usage:
+    python -m benchmarks.bench_align [--segments 150 2000] [--statements 200] [--repeat 5]
+
+Aligns statements (the first words of random segments, as the model
+paraphrases them) against transcripts built from full_test_request.json and
+prints the index build and alignment time per transcript, for the numpy
+path and the pure-Python fallback, plus the share of statements whose
+source segment was found.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.transcript import TranscriptSegment  # noqa: E402
+from backend.services import reference_alignment  # noqa: E402
+from backend.services.reference_alignment import ReferenceAligner  # noqa: E402
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "full_test_request.json")
+
+
+def synthetic_transcript(segments: int) -> List[TranscriptSegment]:
+    """Transcript of the given length built from the sample consultation."""
+    with open(SAMPLE_FILE, "r", encoding="utf-8") as f:
+        sample = [TranscriptSegment(**s) for s in json.load(f)["transcript"]]
+    return [sample[i % len(sample)] for i in range(segments)]
+
+
+def run(segments: List[TranscriptSegment], statements: int, repeat: int) -> None:
+    rng = random.Random(0)
+    targets = [rng.randrange(len(segments)) for _ in range(statements)]
+    texts = []
+    for i in targets:
+        words = segments[i].text.split()
+        texts.append(" ".join(words[: max(3, len(words) // 2)]))
+
+    build = align = 0.0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        aligner = ReferenceAligner(segments)
+        build += time.perf_counter() - started
+        started = time.perf_counter()
+        aligned = aligner.align(texts)
+        align += time.perf_counter() - started
+
+    # A repeated sample segment counts as found in any of its copies
+    found = sum(
+        1 for target, result in zip(targets, aligned)
+        if any(segments[i].text == segments[target].text for i in result)
+    )
+    print(
+        f"{reference_alignment.BACKEND:>7} {len(segments):>8} {statements:>10} "
+        f"{build / repeat * 1000:>9.1f} {align / repeat * 1000:>9.1f} {found / statements:>7.0%}"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Reference alignment microbenchmark")
+    parser.add_argument("--segments", type=int, nargs="+", default=[150, 2000])
+    parser.add_argument("--statements", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'backend':>7} {'segments':>8} {'statements':>10} {'index ms':>9} {'align ms':>9} {'found':>7}")
+    numpy_module = reference_alignment.np
+    backends = [numpy_module, None] if numpy_module is not None else [None]
+    try:
+        for module in backends:
+            reference_alignment.np = module
+            reference_alignment.BACKEND = "numpy" if module is not None else "python"
+            for segments in args.segments:
+                run(synthetic_transcript(segments), args.statements, args.repeat)
+    finally:
+        reference_alignment.np = numpy_module
+        reference_alignment.BACKEND = "numpy" if numpy_module is not None else "python"
+
+
+if __name__ == "__main__":
+    main()
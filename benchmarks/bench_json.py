@@ -0,0 +1,94 @@
+"""Microbenchmark of the JSON parse/render path of one extraction request.
+
+Usage:
+    python -m benchmarks.bench_json [--segments 150 1500] [--repeat 50]
+
+Compares, per request, the CPU time of
+- the previous path: json.loads of the provider text, FastAPI's
+  jsonable_encoder and JSONResponse rendering, and
+- the fast path: fast_json.loads and FastJSONResponse rendering
+on synthetic results with one reference per transcript segment
+(Lithuanian text from full_test_request.json).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from backend.services import fast_json  # noqa: E402
+from backend.services.fast_json import FastJSONResponse  # noqa: E402
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "full_test_request.json")
+
+
+def synthetic_result(segments: int) -> Dict[str, Any]:
+    """Extraction result sized like a transcript with the given number of segments."""
+    with open(SAMPLE_FILE, "r", encoding="utf-8") as f:
+        sample = [s["text"] for s in json.load(f)["transcript"]]
+    texts = [sample[i % len(sample)] for i in range(segments)]
+    notes = [
+        {"text": texts[i], "source_segments": [i, i + 1]}
+        for i in range(0, segments, 3)
+    ]
+    return {
+        "document": {
+            "visit": {"date": "2021-07-14", "type": "Konsultacija"},
+            "complaints": " ".join(texts[: max(1, segments // 10)]),
+            "clinical_notes": notes,
+            "diagnosis": [{"code": "J02.9", "name": "Ūminis faringitas, nepatikslintas"}],
+        },
+        "references": [
+            {"field_name": "clinical_notes", "value": text, "source_segments": [i]}
+            for i, text in enumerate(texts)
+        ],
+    }
+
+
+def cpu_per_call(fn: Callable[[], Any], repeat: int) -> float:
+    """Mean CPU seconds per call."""
+    fn()
+    started = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - started) / repeat
+
+
+def previous_path(text: str) -> bytes:
+    result = json.loads(text)
+    return JSONResponse(jsonable_encoder(result)).body
+
+
+def fast_path(text: str) -> bytes:
+    result = fast_json.loads(text)
+    return FastJSONResponse(result).body
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="JSON parse/render microbenchmark")
+    parser.add_argument("--segments", type=int, nargs="+", default=[150, 1500])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    print(f"JSON backend: {fast_json.BACKEND}")
+    print(f"{'segments':>8} {'bytes':>10} {'previous ms':>12} {'fast ms':>9} {'saved ms':>9} {'speedup':>8}")
+    for segments in args.segments:
+        # Provider output as the model writes it (non-ASCII characters unescaped)
+        text = json.dumps(synthetic_result(segments), ensure_ascii=False)
+        previous = cpu_per_call(lambda: previous_path(text), args.repeat)
+        fast = cpu_per_call(lambda: fast_path(text), args.repeat)
+        print(
+            f"{segments:>8} {len(text.encode('utf-8')):>10} {previous * 1000:>12.2f} {fast * 1000:>9.2f} "
+            f"{(previous - fast) * 1000:>9.2f} {previous / fast:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""Offline benchmark of the extraction pipeline, stage by stage, with a baseline.
+
+Usage:
+    python -m benchmarks.bench_pipeline [--segments 15 150 1500 15000] [--repeat 5]
+        [--stages build_user_prompt parse_response ...] [--output results.json]
+        [--baseline benchmarks/baseline.json] [--threshold 0.25] [--save-baseline]
+
+Measures, without network access:
+- build_extraction_schema, make_schema_strict, build_system_prompt: schema
+  and system prompt construction (independent of the transcript length),
+- build_user_prompt: user prompt rendering of the transcript,
+- parse_response: BaseExtractor._parse_response of a schema-shaped answer
+  with one reference per segment (repair, validation and local alignment as
+  configured),
+- extract_e2e: POST /api/extract through the OpenAI extractor, with the
+  provider replaced by an in-process stub answering at once (HTTP client,
+  SDK, prompt building, parsing and response rendering; no result cache),
+on synthetic transcripts of the given lengths, built by repeating the
+segments of test_request.json and full_test_request.json.
+
+Every stage runs at least --repeat times and for at least 0.2 s. Results
+(median, min and mean wall time per call) are written as JSON. They are
+compared against the baseline file when it exists: a stage whose --metric
+(default min_ms, the least sensitive to a busy machine) grew by more than the
+threshold (and by more than --min-delta-ms) is a regression, and the exit
+status is 1. --save-baseline stores the results as
+the new baseline. Timings are machine-specific: record the baseline on the
+machine that runs the comparison.
+"""
+
+import argparse
+import asyncio
+import copy
+import gc
+import importlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+import openai  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.responses import Response  # noqa: E402
+from openai import DefaultAsyncHttpxClient  # noqa: E402
+
+from backend.models.transcript import TranscriptInput, TranscriptSegment  # noqa: E402
+from backend.prompts.extraction_prompt import build_system_prompt, build_user_prompt  # noqa: E402
+from backend.schemas.e025_flat import build_extraction_schema, make_schema_strict  # noqa: E402
+from backend.schemas.registry import get_schema_registry  # noqa: E402
+from backend.services import fast_json  # noqa: E402
+from backend.services.base_extractor import BaseExtractor  # noqa: E402
+from backend.services.openai_extractor import OpenAIExtractor  # noqa: E402
+from benchmarks.bench_validate import synthetic_answer  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_FILES = [os.path.join(ROOT, "test_request.json"), os.path.join(ROOT, "full_test_request.json")]
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+SCHEMA_STAGES = ("build_extraction_schema", "make_schema_strict", "build_system_prompt")
+TRANSCRIPT_STAGES = ("build_user_prompt", "parse_response", "extract_e2e")
+STAGES = SCHEMA_STAGES + TRANSCRIPT_STAGES
+MIN_TIME = 0.2  # Seconds measured per stage at least (short stages are repeated more)
+
+
+def synthetic_transcript(segments: int) -> List[TranscriptSegment]:
+    """Transcript of the given length built from the sample consultations."""
+    sample: List[TranscriptSegment] = []
+    for path in SAMPLE_FILES:
+        with open(path, "r", encoding="utf-8") as f:
+            sample.extend(TranscriptSegment(**s) for s in json.load(f)["transcript"])
+    return [sample[i % len(sample)] for i in range(segments)]
+
+
+def _summary(timings: List[float]) -> Dict[str, Any]:
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 4),
+        "min_ms": round(min(timings) * 1000, 4),
+        "mean_ms": round(statistics.fmean(timings) * 1000, 4),
+        "repeat": len(timings),
+    }
+
+
+def measure(fn: Callable[[], Any], repeat: int, min_time: float = MIN_TIME) -> Dict[str, Any]:
+    """Wall time per call: at least ``repeat`` calls and ``min_time`` seconds, after one warm-up call.
+
+    The garbage collector is paused while timing, as in timeit.
+    """
+    fn()
+    timings: List[float] = []
+    gc.collect()
+    gc.disable()
+    try:
+        while len(timings) < repeat or sum(timings) < min_time:
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return _summary(timings)
+
+
+async def measure_async(fn: Callable[[], Awaitable[Any]], repeat: int, min_time: float = MIN_TIME) -> Dict[str, Any]:
+    """Wall time per awaited call, like measure()."""
+    await fn()
+    timings: List[float] = []
+    gc.collect()
+    gc.disable()
+    try:
+        while len(timings) < repeat or sum(timings) < min_time:
+            started = time.perf_counter()
+            await fn()
+            timings.append(time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return _summary(timings)
+
+
+def stub_provider(answer: str) -> FastAPI:
+    """OpenAI-compatible chat completions endpoint returning a fixed answer at once."""
+    body = fast_json.dumps({
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "stub",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    })
+    stub = FastAPI()
+
+    @stub.post("/v1/chat/completions")
+    async def chat_completions() -> Response:
+        return Response(body, media_type="application/json")
+
+    return stub
+
+
+async def run_e2e(transcript_input: TranscriptInput, answer: str, repeat: int) -> Dict[str, Any]:
+    """Time POST /api/extract with the provider replaced by the in-process stub."""
+    from backend.main import app
+
+    # The OpenAI SDK may bundle its own httpx flavour: use its ASGI transport
+    sdk_httpx = importlib.import_module(type(openai.DEFAULT_CONNECTION_LIMITS).__module__.split(".")[0])
+    extractor = OpenAIExtractor(
+        api_key="bench",
+        model_name="stub",
+        http_client=DefaultAsyncHttpxClient(transport=sdk_httpx.ASGITransport(app=stub_provider(answer))),
+        base_url="http://stub/v1",
+    )
+    app.state.extractor = extractor
+    payload = transcript_input.model_dump_json().encode("utf-8")
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            async def call() -> None:
+                response = await client.post(
+                    "/api/extract", content=payload, headers={"Content-Type": "application/json"}
+                )
+                response.raise_for_status()
+
+            return await measure_async(call, repeat)
+    finally:
+        app.state.extractor = None
+        await extractor.aclose()
+
+
+def run(segment_counts: List[int], stages: List[str], repeat: int) -> Dict[str, Dict[str, Any]]:
+    """Run the selected stages; keys are "<stage>" or "<stage>@<segments>"."""
+    artifacts = get_schema_registry().get()
+    document_schema = artifacts.document_schema
+    results: Dict[str, Dict[str, Any]] = {}
+
+    if "build_extraction_schema" in stages:
+        results["build_extraction_schema"] = measure(lambda: build_extraction_schema(document_schema), repeat)
+    if "make_schema_strict" in stages:
+        extraction_schema = build_extraction_schema(document_schema)
+        results["make_schema_strict"] = measure(
+            lambda: make_schema_strict(copy.deepcopy(extraction_schema)), repeat
+        )
+    if "build_system_prompt" in stages:
+        results["build_system_prompt"] = measure(lambda: build_system_prompt(artifacts.schema_str), repeat)
+
+    parser_extractor = BaseExtractor("bench")
+    for segments in segment_counts:
+        transcript = synthetic_transcript(segments)
+        transcript_input = TranscriptInput(transcript=transcript)
+        answer = fast_json.dumps(synthetic_answer(document_schema, segments)).decode("utf-8")
+        if "build_user_prompt" in stages:
+            results[f"build_user_prompt@{segments}"] = measure(lambda: build_user_prompt(transcript), repeat)
+        if "parse_response" in stages:
+            results[f"parse_response@{segments}"] = measure(
+                lambda: parser_extractor._parse_response(answer, transcript_input, record=False), repeat
+            )
+        if "extract_e2e" in stages:
+            results[f"extract_e2e@{segments}"] = asyncio.run(run_e2e(transcript_input, answer, repeat))
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    threshold: float,
+    min_delta_ms: float,
+    metric: str = "min_ms",
+) -> List[str]:
+    """Print the change of every stage against the baseline; return the regressed keys."""
+    regressions = []
+    print(f"{'stage':<32} {'baseline ms':>12} {'now ms':>10} {'change':>8}")
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f"{key:<32} {'-':>12} {result[metric]:>10.3f} {'new':>8}")
+            continue
+        change = result[metric] / base[metric] - 1 if base[metric] else 0.0
+        regressed = change > threshold and result[metric] - base[metric] > min_delta_ms
+        if regressed:
+            regressions.append(key)
+        print(
+            f"{key:<32} {base[metric]:>12.3f} {result[metric]:>10.3f} {change:>+7.0%}"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline extraction pipeline benchmark")
+    parser.add_argument("--segments", type=int, nargs="+", default=[15, 150, 1500, 15000])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Write the results JSON here (default: stdout)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline results JSON")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown")
+    parser.add_argument("--metric", choices=["min_ms", "median_ms", "mean_ms"], default="min_ms")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="Ignore slowdowns smaller than this")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "json_backend": fast_json.BACKEND,
+            "segments": args.segments,
+            "repeat": args.repeat,
+        },
+        "results": run(args.segments, args.stages, args.repeat),
+    }
+    rendered = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(rendered + "\n")
+    else:
+        print(rendered)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            f.write(rendered + "\n")
+        print(f"Baseline saved to {args.baseline}", file=sys.stderr)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline} (run with --save-baseline)", file=sys.stderr)
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(report["results"], baseline, args.threshold, args.min_delta_ms, args.metric)
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
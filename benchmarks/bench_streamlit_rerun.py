@@ -0,0 +1,120 @@
+"""Rerun latency of the Streamlit app with an extraction result on screen.
+
+Usage:
+    python -m benchmarks.bench_streamlit_rerun [--transcript full_test_request.json] [--repeat 20]
+        [--app streamlit_app.py]
+
+Runs the app headless with streamlit.testing (logged in, the transcript
+loaded and a schema-shaped result with one reference per segment) and
+times, per script run:
+- rerun: a plain rerun of the page,
+- card_click: a click on a statement card (highlighting its segments),
+- extract: "Užkrauti ir Analizuoti" with the mock provider (LLM_PROVIDER=mock,
+  replaying the schema-shaped answer at once from a temporary cassette),
+  i.e. the app's own overhead around an extraction.
+The first run of a session (imports, extractor construction) is reported
+separately as cold_start.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _summary(timings: List[float]) -> Dict[str, Any]:
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 1),
+        "min_ms": round(min(timings) * 1000, 1),
+        "repeat": len(timings),
+    }
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Wall time per call over ``repeat`` calls."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return _summary(timings)
+
+
+def write_cassette(path: str, answer: str) -> None:
+    """Mock provider cassette replaying the answer for any transcript."""
+    entry = {"key": "bench", "response": answer, "time_to_first_token": 0.0, "duration": 0.0, "output_tokens": 0}
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Streamlit rerun latency")
+    parser.add_argument("--transcript", default=os.path.join(ROOT, "full_test_request.json"))
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--app", default=os.path.join(ROOT, "streamlit_app.py"), type=os.path.abspath)
+    args = parser.parse_args(argv)
+
+    with open(args.transcript, "r", encoding="utf-8") as f:
+        transcript_text = f.read()
+    segments = len(json.loads(transcript_text)["transcript"])
+
+    workdir = tempfile.mkdtemp(prefix="bench_streamlit_")
+    cassette = os.path.join(workdir, "cassette.jsonl")
+    os.environ.update({
+        "LLM_PROVIDER": "mock",
+        "MOCK_CASSETTE_PATH": cassette,
+        "MOCK_REPLAY_MISS": "any",
+        "MOCK_TIME_TO_FIRST_TOKEN": "fixed:0",
+        "CACHE_ENABLED": "false",
+        "LEDGER_DB_PATH": "",
+        "JOBS_DB_PATH": os.path.join(workdir, "jobs.sqlite3"),
+    })
+
+    from streamlit.testing.v1 import AppTest
+
+    from backend.schemas.registry import get_schema_registry
+    from benchmarks.bench_validate import synthetic_answer
+
+    result = synthetic_answer(get_schema_registry().get().document_schema, segments)
+    write_cassette(cassette, json.dumps(result, ensure_ascii=False))
+
+    os.chdir(ROOT)
+    app = AppTest.from_file(args.app, default_timeout=60)
+    app.session_state.authenticated = True
+    app.session_state.transcript_text = transcript_text
+    started = time.perf_counter()
+    app.run()
+    cold_start = time.perf_counter() - started
+    app.session_state.extraction_result = result
+    app.run()
+
+    def click_card() -> None:
+        card = next(b for b in app.button if b.key and b.key.startswith("stmt_"))
+        card.click().run()
+
+    def extract() -> None:
+        next(b for b in app.button if b.label == "Užkrauti ir Analizuoti").click().run()
+        assert not app.exception and app.session_state.extraction_result, "extraction failed"
+
+    results = {
+        "cold_start": {"median_ms": round(cold_start * 1000, 1), "min_ms": round(cold_start * 1000, 1), "repeat": 1},
+        "rerun": measure(app.run, args.repeat),
+        "card_click": measure(click_card, args.repeat),
+        "extract": measure(extract, args.repeat),
+    }
+    print(f"{os.path.basename(args.app)}, {segments} segments")
+    print(f"{'run':<12} {'median ms':>10} {'min ms':>8}")
+    for name, summary in results.items():
+        print(f"{name:<12} {summary['median_ms']:>10.1f} {summary['min_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Microbenchmark of validating LLM answers against the flat schema.
+
+Usage:
+    python -m benchmarks.bench_validate [--segments 150 1500] [--repeat 50]
+
+Compares the CPU time per answer of
+- the current unvalidated paths: fast_json.loads of the provider text, and
+  repair_result (the default with JSON_REPAIR_ENABLED),
+- a two-pass validation: fast_json.loads followed by validate_python, and
+- the compiled single pass (RESULT_VALIDATION): validate_json of the text,
+on answers of the default schema version with one statement per few
+transcript segments and one reference per segment (Lithuanian text from
+full_test_request.json). Also prints the one-off compile time of the validator.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.schemas.registry import SCHEMA_DIR, SchemaRegistry  # noqa: E402
+from backend.schemas.validation import ResultValidator  # noqa: E402
+from backend.services import fast_json  # noqa: E402
+from backend.services.json_repair import repair_result  # noqa: E402
+from benchmarks.bench_json import SAMPLE_FILE, cpu_per_call  # noqa: E402
+
+
+def synthetic_answer(document_schema: Dict[str, Any], segments: int) -> Dict[str, Any]:
+    """Answer in the shape of the schema, sized like a transcript with the given number of segments."""
+    with open(SAMPLE_FILE, "r", encoding="utf-8") as f:
+        sample = [s["text"] for s in json.load(f)["transcript"]]
+    texts = [sample[i % len(sample)] for i in range(segments)]
+    properties = document_schema.get("properties", {})
+    array_fields = [name for name, prop in properties.items() if "array" in prop.get("type", [])]
+
+    document: Dict[str, Any] = {}
+    for name, prop in properties.items():
+        types = prop.get("type", [])
+        if "enum" in prop:
+            document[name] = prop["enum"][0]
+        elif "array" in types:
+            document[name] = [
+                {"statement": texts[i]}
+                for i in range(array_fields.index(name), segments, 3 * len(array_fields))
+            ]
+        elif "integer" in types:
+            document[name] = 120
+        elif "number" in types:
+            document[name] = 36.6
+        else:
+            document[name] = texts[0][:40]
+    return {
+        "document": document,
+        "references": [
+            {"field_name": array_fields[i % len(array_fields)], "value": text, "source_segments": [i]}
+            for i, text in enumerate(texts)
+        ],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Answer validation microbenchmark")
+    parser.add_argument("--segments", type=int, nargs="+", default=[150, 1500])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    artifacts = SchemaRegistry(SCHEMA_DIR).get()
+    fields = artifacts.document_schema.get("properties", {})
+    started = time.perf_counter()
+    validator = ResultValidator(artifacts.extraction_schema)
+    print(f"JSON backend: {fast_json.BACKEND}, validator compiled in {(time.perf_counter() - started) * 1000:.1f} ms")
+    print(
+        f"{'segments':>8} {'KiB':>7} {'loads ms':>9} {'repair ms':>10} "
+        f"{'loads+validate ms':>18} {'validate_json ms':>17} {'vs loads':>9}"
+    )
+    for segments in args.segments:
+        text = json.dumps(synthetic_answer(artifacts.document_schema, segments), ensure_ascii=False)
+        assert validator.validate_json(text) == fast_json.loads(text)
+        loads = cpu_per_call(lambda: fast_json.loads(text), args.repeat)
+        repair = cpu_per_call(lambda: repair_result(text, fields, record=False), args.repeat)
+        two_pass = cpu_per_call(lambda: validator.validate_python(fast_json.loads(text)), args.repeat)
+        single = cpu_per_call(lambda: validator.validate_json(text), args.repeat)
+        print(
+            f"{segments:>8} {len(text.encode('utf-8')) / 1024:>7.1f} {loads * 1000:>9.3f} {repair * 1000:>10.3f} "
+            f"{two_pass * 1000:>18.3f} {single * 1000:>17.3f} {single / loads:>8.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
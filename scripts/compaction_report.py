@@ -0,0 +1,68 @@
+"""Show what transcript compaction saves on sample transcripts.
+
+Usage:
+    python -m scripts.compaction_report [--transcript full_test_request.json test_request.json]
+        [--seconds-per-1k-tokens 0.04] [--merge-max-chars 400]
+
+For every transcript, prints segments, characters and estimated user prompt
+tokens before and after compaction, the CPU time of compaction plus mapping
+the references back, and the net latency effect: the estimated time to
+first token saved on the uncached prompt tokens (same linear model as
+scripts/stub_llm_provider.py; pass the rate measured for your provider)
+minus that CPU time.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.transcript import TranscriptInput  # noqa: E402
+from backend.prompts.extraction_prompt import build_user_prompt  # noqa: E402
+from backend.prompts.token_estimate import estimate_tokens, tokenizer_name  # noqa: E402
+from backend.services.compaction import DEFAULT_FILLERS, compact_transcript  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transcript", nargs="+", default=["full_test_request.json", "test_request.json"])
+    parser.add_argument("--seconds-per-1k-tokens", type=float, default=0.04, help="Prefill time per 1k uncached tokens")
+    parser.add_argument("--merge-max-chars", type=int, default=400)
+    args = parser.parse_args()
+
+    print(f"Tokenizer: {tokenizer_name()}")
+    print(
+        f"{'transcript':<26} {'segments':>13} {'chars':>15} {'prompt tokens':>15} {'saved':>7} "
+        f"{'cpu ms':>7} {'net saved ms':>13}"
+    )
+    for path in args.transcript:
+        with open(path, "r", encoding="utf-8") as f:
+            transcript_input = TranscriptInput.model_validate(json.load(f))
+        segments = transcript_input.transcript
+
+        started = time.perf_counter()
+        compact = compact_transcript(segments, DEFAULT_FILLERS, args.merge_max_chars)
+        # Mapping back: one reference per compact segment, citing it
+        compact.remap_references([
+            {"field_name": "notes", "value": s.text, "source_segments": [i]}
+            for i, s in enumerate(compact.segments)
+        ])
+        cpu_ms = (time.perf_counter() - started) * 1000
+
+        before = estimate_tokens(build_user_prompt(segments))
+        after = estimate_tokens(build_user_prompt(compact.segments))
+        chars_before = sum(len(s.text) for s in segments)
+        chars_after = sum(len(s.text) for s in compact.segments)
+        saved_ms = (before - after) / 1000 * args.seconds_per_1k_tokens * 1000
+        print(
+            f"{os.path.basename(path):<26} {len(segments):>6} -> {len(compact.segments):<4} "
+            f"{chars_before:>6} -> {chars_after:<6} {before:>6} -> {after:<6} "
+            f"{(1 - after / before) * 100 if before else 0.0:>6.1f}% {cpu_ms:>7.1f} {saved_ms - cpu_ms:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Compare system prompt sizes between prompt modes.
+
+Usage:
+    python -m scripts.prompt_token_report [--transcript test_request.json]
+
+For every flat schema version, prints characters and estimated input tokens of
+the system prompt in full mode, compact mode and compact mode with
+prose-described field descriptions stripped. With --transcript, the user
+prompt for that request is added to the totals.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.transcript import TranscriptInput  # noqa: E402
+from backend.prompts.extraction_prompt import build_user_prompt  # noqa: E402
+from backend.prompts.token_estimate import estimate_tokens, tokenizer_name  # noqa: E402
+from backend.schemas.registry import SCHEMA_DIR, SchemaRegistry  # noqa: E402
+
+VARIANTS = [
+    ("full", "full", False),
+    ("compact", "compact", False),
+    ("compact+strip", "compact", True),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transcript", help="TranscriptInput JSON file whose user prompt is added")
+    args = parser.parse_args()
+
+    user_tokens = 0
+    if args.transcript:
+        with open(args.transcript, "r", encoding="utf-8") as f:
+            transcript_input = TranscriptInput.model_validate(json.load(f))
+        user_tokens = estimate_tokens(build_user_prompt(transcript_input.transcript))
+
+    registries = {
+        name: SchemaRegistry(SCHEMA_DIR, prompt_mode=mode, strip_prose_described=strip)
+        for name, mode, strip in VARIANTS
+    }
+
+    print(f"Tokenizer: {tokenizer_name()}")
+    if args.transcript:
+        print(f"User prompt: {user_tokens} tokens ({args.transcript})")
+    print()
+    print(f"{'version':<22} {'mode':<14} {'chars':>8} {'tokens':>8} {'total':>8} {'saved':>7}")
+    for version in registries["full"].versions():
+        baseline = None
+        for name, _, _ in VARIANTS:
+            prompt = registries[name].get(version).system_prompt
+            tokens = estimate_tokens(prompt)
+            total = tokens + user_tokens
+            if baseline is None:
+                baseline = total
+            saved = f"{(1 - total / baseline) * 100:.1f}%"
+            print(f"{version:<22} {name:<14} {len(prompt):>8} {tokens:>8} {total:>8} {saved:>7}")
+
+
+if __name__ == "__main__":
+    main()
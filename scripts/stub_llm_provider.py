@@ -0,0 +1,254 @@
+"""Local stub of the OpenAI and Gemini APIs for testing prompt caching.
+
+Usage:
+    python scripts/stub_llm_provider.py [--port 8090] [--response-file result.json]
+
+Then point the backend at it:
+    OPENAI_BASE_URL=http://localhost:8090/v1
+    GEMINI_BASE_URL=http://localhost:8090
+    GEMINI_CONTEXT_CACHE=true
+
+Implements chat completions (plain and streaming, with usage), Gemini
+generateContent / streamGenerateContent and cachedContents. Prompt caching is
+emulated: OpenAI requests report the common prefix with earlier prompts as
+cached tokens (at least 1024 tokens, in 128 token steps), Gemini requests
+report the referenced cached content as cached tokens. Time to first token
+grows with the number of uncached input tokens, so the latency savings are
+visible in /api/usage/stats.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse, StreamingResponse  # noqa: E402
+
+from backend.prompts.token_estimate import estimate_tokens  # noqa: E402
+
+OPENAI_MIN_CACHED_TOKENS = 1024
+OPENAI_CACHE_STEP = 128
+
+app = FastAPI(title="Stub LLM provider")
+options = argparse.Namespace(base_latency=0.05, seconds_per_1k_tokens=0.04, response='{"document":{},"references":[]}')
+seen_prompts: "deque[str]" = deque(maxlen=64)
+cached_contents: Dict[str, Dict[str, Any]] = {}
+
+
+def _common_prefix_length(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _openai_cached_tokens(prompt: str) -> int:
+    best = max((_common_prefix_length(prompt, seen) for seen in seen_prompts), default=0)
+    seen_prompts.append(prompt)
+    tokens = estimate_tokens(prompt[:best]) if best else 0
+    if tokens < OPENAI_MIN_CACHED_TOKENS:
+        return 0
+    return tokens - tokens % OPENAI_CACHE_STEP
+
+
+async def _simulate_prefill(uncached_tokens: int) -> None:
+    await asyncio.sleep(options.base_latency + uncached_tokens / 1000 * options.seconds_per_1k_tokens)
+
+
+def _chunks(text: str, size: int = 40) -> List[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+# --- OpenAI ---
+
+@app.get("/v1/models")
+async def openai_models() -> dict:
+    return {"object": "list", "data": [{"id": "stub", "object": "model", "created": 0, "owned_by": "stub"}]}
+
+
+@app.post("/v1/chat/completions")
+async def openai_chat_completions(request: Request):
+    body = await request.json()
+    prompt = "".join(str(m.get("content", "")) for m in body.get("messages", []))
+    input_tokens = estimate_tokens(prompt)
+    cached_tokens = _openai_cached_tokens(prompt)
+    output_tokens = estimate_tokens(options.response)
+    usage = {
+        "prompt_tokens": input_tokens,
+        "completion_tokens": output_tokens,
+        "total_tokens": input_tokens + output_tokens,
+        "prompt_tokens_details": {"cached_tokens": cached_tokens},
+    }
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+    model = body.get("model", "stub")
+
+    await _simulate_prefill(input_tokens - cached_tokens)
+
+    if not body.get("stream"):
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": options.response},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        }
+
+    include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+    async def events():
+        for piece in _chunks(options.response):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(0.005)
+        if include_usage:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [],
+                "usage": usage,
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+# --- Gemini ---
+
+def _parts_text(content: Any) -> str:
+    if not content:
+        return ""
+    if isinstance(content, list):
+        return "".join(_parts_text(c) for c in content)
+    return "".join(part.get("text", "") for part in content.get("parts", []))
+
+
+def _gemini_error(code: int, message: str) -> JSONResponse:
+    return JSONResponse(status_code=code, content={"error": {"code": code, "message": message, "status": "NOT_FOUND"}})
+
+
+@app.get("/{api_version}/models/{model}")
+async def gemini_model(api_version: str, model: str) -> dict:
+    return {"name": f"models/{model}", "displayName": model}
+
+
+@app.post("/{api_version}/cachedContents")
+async def gemini_create_cache(api_version: str, request: Request) -> dict:
+    body = await request.json()
+    name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+    ttl = float(str(body.get("ttl", "3600s")).rstrip("s"))
+    text = _parts_text(body.get("systemInstruction")) + _parts_text(body.get("contents"))
+    cached_contents[name] = {"tokens": estimate_tokens(text), "expires_at": time.time() + ttl}
+    return {
+        "name": name,
+        "model": body.get("model"),
+        "displayName": body.get("displayName"),
+        "usageMetadata": {"totalTokenCount": cached_contents[name]["tokens"]},
+    }
+
+
+@app.patch("/{api_version}/cachedContents/{cache_id}")
+async def gemini_update_cache(api_version: str, cache_id: str, request: Request) -> dict:
+    body = await request.json()
+    name = f"cachedContents/{cache_id}"
+    entry = cached_contents.get(name)
+    if entry is None or entry["expires_at"] < time.time():
+        return _gemini_error(404, f"CachedContent not found: {name}")
+    entry["expires_at"] = time.time() + float(str(body.get("ttl", "3600s")).rstrip("s"))
+    return {"name": name}
+
+
+@app.delete("/{api_version}/cachedContents/{cache_id}")
+async def gemini_delete_cache(api_version: str, cache_id: str) -> dict:
+    cached_contents.pop(f"cachedContents/{cache_id}", None)
+    return {}
+
+
+@app.post("/{api_version}/models/{model_action}")
+async def gemini_generate(api_version: str, model_action: str, request: Request):
+    body = await request.json()
+    _, _, action = model_action.partition(":")
+    cached_tokens = 0
+    cache_name = body.get("cachedContent")
+    if cache_name:
+        entry = cached_contents.get(cache_name)
+        if entry is None or entry["expires_at"] < time.time():
+            return _gemini_error(404, f"CachedContent not found: {cache_name}")
+        cached_tokens = entry["tokens"]
+
+    uncached_tokens = estimate_tokens(_parts_text(body.get("systemInstruction")) + _parts_text(body.get("contents")))
+    output_tokens = estimate_tokens(options.response)
+    usage = {
+        "promptTokenCount": uncached_tokens + cached_tokens,
+        "cachedContentTokenCount": cached_tokens,
+        "candidatesTokenCount": output_tokens,
+        "totalTokenCount": uncached_tokens + cached_tokens + output_tokens,
+    }
+
+    await _simulate_prefill(uncached_tokens)
+
+    def response(text: str, last: bool) -> Dict[str, Any]:
+        candidate: Dict[str, Any] = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+        if last:
+            candidate["finishReason"] = "STOP"
+        return {"candidates": [candidate], "usageMetadata": usage}
+
+    if action != "streamGenerateContent":
+        return response(options.response, True)
+
+    async def events():
+        pieces = _chunks(options.response)
+        for i, piece in enumerate(pieces):
+            yield f"data: {json.dumps(response(piece, i == len(pieces) - 1))}\r\n\r\n"
+            await asyncio.sleep(0.005)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stub of the OpenAI and Gemini APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--base-latency", type=float, default=0.05, help="Seconds before the first token")
+    parser.add_argument(
+        "--seconds-per-1k-tokens", type=float, default=0.04,
+        help="Additional time to first token per 1000 uncached input tokens",
+    )
+    parser.add_argument("--response-file", help="JSON file returned as the model answer")
+    args = parser.parse_args()
+
+    options.base_latency = args.base_latency
+    options.seconds_per_1k_tokens = args.seconds_per_1k_tokens
+    if args.response_file:
+        with open(args.response_file, "r", encoding="utf-8") as f:
+            options.response = json.dumps(json.load(f), ensure_ascii=False)
+
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
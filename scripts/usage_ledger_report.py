@@ -0,0 +1,61 @@
+"""Aggregate the usage ledger: tokens, cost and time per day/model, or output tokens per field.
+
+Usage:
+    python -m scripts.usage_ledger_report [--group-by day model] [--since 2026-10-01] [--until 2026-10-31]
+        [--db .data/usage_ledger.sqlite3] [--json]
+
+Grouping by field (e.g. --group-by schema_version field) lists every document
+field and the references array with its estimated and attributed output
+tokens and its share of the output, largest first: the candidates for
+pruning or for local computation.
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.config import get_settings  # noqa: E402
+from backend.services.usage_ledger import GROUP_COLUMNS, UsageLedger  # noqa: E402
+
+
+def print_table(rows: List[Dict[str, Any]]) -> None:
+    """Print rows as an aligned text table."""
+    if not rows:
+        print("No extractions recorded")
+        return
+    columns = list(rows[0])
+    numeric = [isinstance(rows[0][c], (int, float)) or rows[0][c] is None for c in columns]
+    cells = [["-" if row[c] is None else str(row[c]) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    for r in [columns] + cells:
+        print("  ".join(v.rjust(w) if num else v.ljust(w) for v, w, num in zip(r, widths, numeric)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--group-by", nargs="+", choices=GROUP_COLUMNS, default=["day"])
+    parser.add_argument("--since", help="First day included (YYYY-MM-DD, UTC)")
+    parser.add_argument("--until", help="Last day included (YYYY-MM-DD, UTC)")
+    parser.add_argument("--db", default=get_settings().ledger_db_path, help="Ledger file (default LEDGER_DB_PATH)")
+    parser.add_argument("--json", action="store_true", help="Print the rows as JSON")
+    args = parser.parse_args()
+
+    if not args.db or not os.path.exists(args.db):
+        parser.error(f"No usage ledger at '{args.db}'")
+    ledger = UsageLedger(args.db)
+    try:
+        rows = ledger.summary(args.group_by, args.since, args.until)
+    finally:
+        ledger.close()
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Show what the vital-sign pre-extraction finds in transcripts.
+
+Usage:
+    python -m scripts.vitals_report --transcript full_test_request.json [more.json ...]
+
+For every transcript, prints the values found with their source segments and
+the estimated output tokens the model no longer writes ("confirm" and
+"remove" modes), plus the input tokens the <pre_extracted> block and the
+smaller "remove" schema add or save.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.transcript import PreExtraction, TranscriptInput  # noqa: E402
+from backend.prompts.extraction_prompt import build_user_prompt  # noqa: E402
+from backend.prompts.token_estimate import estimate_tokens, tokenizer_name  # noqa: E402
+from backend.schemas.registry import SCHEMA_DIR, SchemaRegistry  # noqa: E402
+from backend.services.vitals import (  # noqa: E402
+    MODE_CONFIRM,
+    MODE_REMOVE,
+    VITAL_FIELDS,
+    estimate_saved_output_tokens,
+    pre_extract_vitals,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transcript", nargs="+", required=True, help="TranscriptInput JSON files")
+    parser.add_argument("--schema-version", help="Schema version (default: the transcript's or the registry default)")
+    args = parser.parse_args()
+
+    registry = SchemaRegistry(SCHEMA_DIR)
+    print(f"Tokenizer: {tokenizer_name()}")
+    for path in args.transcript:
+        with open(path, "r", encoding="utf-8") as f:
+            transcript_input = TranscriptInput.model_validate(json.load(f))
+        artifacts = registry.get(args.schema_version or transcript_input.schema_version)
+        fields = tuple(name for name in VITAL_FIELDS if name in artifacts.document_schema.get("properties", {}))
+        matches = pre_extract_vitals(transcript_input.transcript, fields)
+
+        print()
+        print(f"{path}: {len(transcript_input.transcript)} segments, schema {artifacts.version}")
+        for name in fields:
+            match = matches.get(name)
+            found = f"{match.value!s:<8} segments {match.source_segments}" if match else "-"
+            print(f"  {name:<16} {found}")
+
+        base_prompt = build_user_prompt(transcript_input.transcript)
+        confirm_prompt = build_user_prompt(
+            transcript_input.transcript,
+            pre_extraction=PreExtraction(MODE_CONFIRM, {n: m.value for n, m in matches.items()}, {}),
+        )
+        removed_prompt = registry.get(artifacts.version, drop_fields=fields).system_prompt
+        print(
+            f"  confirm: output -{estimate_saved_output_tokens(matches, MODE_CONFIRM)} tokens, "
+            f"input +{estimate_tokens(confirm_prompt) - estimate_tokens(base_prompt)} tokens"
+        )
+        print(
+            f"  remove:  output -{estimate_saved_output_tokens(matches, MODE_REMOVE, fields)} tokens, "
+            f"input -{artifacts.system_prompt_tokens - estimate_tokens(removed_prompt)} tokens (system prompt)"
+        )
+
+
+if __name__ == "__main__":
+    main()
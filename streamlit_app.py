@@ -3,6 +3,7 @@ import asyncio
 import json
 import os
 import sys
+import threading
 import uuid
 import streamlit.components.v1 as components
 
@@ -10,8 +11,7 @@ import streamlit.components.v1 as components
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from backend.config import get_settings
-from backend.services.gemini_extractor import GeminiExtractor
-from backend.services.openai_extractor import OpenAIExtractor
+from backend.services.extractor_factory import ProviderNotConfiguredError, build_extractor
 from backend.models.transcript import TranscriptInput
 from backend.schemas.e025_flat import load_document_schema, SCHEMA_FILE_PATH
 
@@ -140,6 +140,20 @@ st.markdown("""
 # Load settings
 settings = get_settings()
 
+
+@st.cache_resource
+def load_cached_schema(path, mtime):
+    """Document schema, read again only when the file changes (its mtime is part of the cache key).
+
+    Shared, not copied per rerun (unlike st.cache_data): callers must not modify it.
+    """
+    return load_document_schema(path)
+
+
+def get_document_schema():
+    return load_cached_schema(SCHEMA_FILE_PATH, os.path.getmtime(SCHEMA_FILE_PATH))
+
+
 # --- Sidebar: Schema Viewer ---
 with st.sidebar:
     st.header("Schema")
@@ -148,7 +162,7 @@ with st.sidebar:
 
     if st.session_state.get("show_schema", False):
         try:
-            schema = load_document_schema()
+            schema = get_document_schema()
             schema_json = json.dumps(schema, indent=2, ensure_ascii=False)
             st.code(schema_json, language="json")
             st.caption(f"Failas: {SCHEMA_FILE_PATH}")
@@ -159,23 +173,35 @@ with st.sidebar:
             st.error(f"Nepavyko įkelti schemos: {e}")
 
 
+@st.cache_resource
+def get_shared_extractor():
+    """Extractor shared by all sessions and reruns (keeps its HTTP connection pool alive)."""
+    return build_extractor(settings)
+
+
+@st.cache_resource
+def get_event_loop():
+    """Event loop running on a background thread for the app's lifetime.
+
+    Pooled async connections are bound to one loop, so every extraction of
+    every session runs on this loop and reuses them.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="extraction-loop", daemon=True).start()
+    return loop
+
+
 def get_extractor():
-    if settings.llm_provider == "openai":
-        if not settings.openai_api_key:
-            st.error("OPENAI_API_KEY not configured in .env file")
-            return None
-        return OpenAIExtractor(
-            api_key=settings.openai_api_key,
-            model_name=settings.openai_model
-        )
-    else:
-        if not settings.google_api_key:
-            st.error("GOOGLE_API_KEY not configured in .env file")
-            return None
-        return GeminiExtractor(
-            api_key=settings.google_api_key,
-            model_name=settings.gemini_model
-        )
+    try:
+        return get_shared_extractor()
+    except ProviderNotConfiguredError as e:
+        st.error(f"{e} in .env file")
+        return None
+
+
+def run_extraction(extractor, transcript_input):
+    future = asyncio.run_coroutine_threadsafe(extractor.extract(transcript_input), get_event_loop())
+    return future.result()
 
 # Helper for highlighting
 def highlight_segments(segment_ids):
@@ -245,10 +271,7 @@ with left_col:
                 if extractor:
                     with st.spinner("Analizuojama..."):
                         transcript_input = TranscriptInput(transcript=st.session_state.transcript_data)
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                        result = loop.run_until_complete(extractor.extract(transcript_input))
-                        loop.close()
+                        result = run_extraction(extractor, transcript_input)
                         st.session_state.extraction_result = result
                 st.rerun()
                 
@@ -336,7 +359,7 @@ with right_col:
     result = st.session_state.extraction_result
 
     # Load current schema to determine which fields exist
-    current_schema = load_document_schema()
+    current_schema = get_document_schema()
     schema_fields = set(current_schema.get("properties", {}).keys())
 
     if result:
@@ -572,10 +595,7 @@ with right_col:
                 with st.spinner("Analizuojama..."):
                     try:
                         transcript_input = TranscriptInput(transcript=st.session_state.transcript_data)
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                        result = loop.run_until_complete(extractor.extract(transcript_input))
-                        loop.close()
+                        result = run_extraction(extractor, transcript_input)
                         st.session_state.extraction_result = result
                     except Exception as e:
                         st.error(f"Klaida: {str(e)}")
@@ -0,0 +1,120 @@
+"""Result cache: which results are cached, and under which key."""
+
+import asyncio
+from typing import Any, AsyncIterator, Dict, List
+
+from backend.models.transcript import TranscriptInput
+from backend.services import fast_json
+from backend.services.hedging import HedgedExtractor, HedgingStats
+from backend.services.result_cache import CachedExtractor, ExtractionCache, MemoryLRUCache
+from backend.services.streaming import stream_extraction_events
+
+RAW_ANSWER = '{"document": {"complaints": "gerklės skausmas"}}'
+
+
+class PostProcessingExtractor:
+    """Streams a raw answer that finish_stream post-processes (like references alignment)."""
+
+    provider = "fake"
+    model_name = "fake-model"
+
+    def __init__(self):
+        self.extract_calls = 0
+        self.finish_calls = 0
+
+    def _post_process(self, response_text: str) -> Dict[str, Any]:
+        result = fast_json.loads(response_text)
+        result["references"] = [{"field_name": "complaints", "value": "gerklės skausmas", "source_segments": [1]}]
+        return result
+
+    async def extract(self, transcript_input: TranscriptInput) -> Dict[str, Any]:
+        self.extract_calls += 1
+        return self._post_process(RAW_ANSWER)
+
+    async def extract_stream(self, transcript_input: TranscriptInput) -> AsyncIterator[str]:
+        yield RAW_ANSWER[:20]
+        yield RAW_ANSWER[20:]
+
+    async def finish_stream(self, transcript_input: TranscriptInput, response_text: str) -> Dict[str, Any]:
+        self.finish_calls += 1
+        return self._post_process(response_text)
+
+
+class ProviderExtractor:
+    """Answers after a delay, as a named provider and model."""
+
+    def __init__(self, provider: str, delay: float):
+        self.provider = provider
+        self.model_name = f"{provider}-model"
+        self.delay = delay
+        self.calls = 0
+
+    async def extract(self, transcript_input: TranscriptInput) -> Dict[str, Any]:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {"document": {"complaints": self.provider}, "references": []}
+
+
+def _transcript() -> TranscriptInput:
+    return TranscriptInput(
+        transcript=[
+            {"time": "00:00:05", "speaker": "Gydytojas", "text": "Kas jus atvedė?"},
+            {"time": "00:00:10", "speaker": "Pacientas", "text": "Gerklės skausmas."},
+        ]
+    )
+
+
+async def _stream_done(extractor: Any, transcript_input: TranscriptInput) -> Dict[str, Any]:
+    events: List = [event async for event in stream_extraction_events(extractor, transcript_input)]
+    name, data = events[-1]
+    assert name == "done", events
+    return data
+
+
+def test_stream_then_extract_returns_post_processed_result():
+    inner = PostProcessingExtractor()
+    extractor = CachedExtractor(inner, ExtractionCache(MemoryLRUCache(16)))
+
+    async def run():
+        done = await _stream_done(extractor, _transcript())
+        return done, await extractor.extract(_transcript())
+
+    done, result = asyncio.run(run())
+
+    assert inner.extract_calls == 0
+    assert result == done
+    assert result["references"], "the cached result must be the post-processed one, not the raw stream"
+
+
+def test_cache_hit_stream_is_not_post_processed_again():
+    inner = PostProcessingExtractor()
+    extractor = CachedExtractor(inner, ExtractionCache(MemoryLRUCache(16)))
+
+    async def run():
+        expected = await extractor.extract(_transcript())
+        return expected, await _stream_done(extractor, _transcript())
+
+    expected, done = asyncio.run(run())
+
+    assert inner.extract_calls == 1
+    assert inner.finish_calls == 0
+    assert done == expected
+
+
+def test_hedged_win_is_cached_under_the_winning_provider():
+    primary = ProviderExtractor("slow", delay=1.0)
+    secondary = ProviderExtractor("fast", delay=0.0)
+    hedged = HedgedExtractor(primary, secondary, min_delay_seconds=0.01, initial_delay_seconds=0.01, stats=HedgingStats())
+    cache = ExtractionCache(MemoryLRUCache(16))
+
+    async def run():
+        result = await CachedExtractor(hedged, cache).extract(_transcript())
+        # Same transcript: the hedged chain (primary's key) misses, the winner's own chain hits
+        await CachedExtractor(hedged, cache).extract(_transcript())
+        return result, await CachedExtractor(secondary, cache).extract(_transcript())
+
+    result, secondary_result = asyncio.run(run())
+
+    assert result["document"]["complaints"] == "fast"
+    assert secondary_result == result
+    assert secondary.calls == 2